@@ -19,9 +19,121 @@ class Config:
     UPLOAD_FOLDER = os.path.join(basedir, 'uploads')
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 MB max file size
     ALLOWED_EXTENSIONS = {'pdf', 'txt', 'md'}
+    TEXT_INLINE_MAX_BYTES = int(os.getenv("TEXT_INLINE_MAX_BYTES", str(256 * 1024)))  # indexed in the request, no job
+    BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "100"))  # per /api/upload/batch, zip members included
+    BULK_MAX_BYTES = int(os.getenv("BULK_MAX_BYTES", str(200 * 1024 * 1024)))  # total after unzipping
 
     # CHROMA_DB_PATH = os.path.join(basedir, 'chroma_db') # development
     CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db") # production
+    # "per_user": one PersistentClient directory per user under CHROMA_DB_PATH (default)
+    # "shared": one client at CHROMA_SHARED_PATH, one collection per tenant (see scripts/migrate_store.py)
+    CHROMA_STORAGE = os.getenv("CHROMA_STORAGE", "per_user")
+    CHROMA_SHARED_PATH = os.getenv("CHROMA_SHARED_PATH", "./chroma_shared")
+    CHROMA_SHARED_CACHE_MB = int(os.getenv("CHROMA_SHARED_CACHE_MB", "1024"))  # HNSW indexes kept in memory, 0 = no limit
+
+    # Embeddings — one model per process, shared by every user
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")  # "cpu", "cuda", "mps"
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    # "torch" (sentence-transformers), "onnx" or "onnx-int8" (ONNX Runtime, no torch — for CPU-only hosts);
+    # onnx-int8 quantizes with the `onnx` package and falls back to fp32 if it is not installed
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+    EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "")  # model.onnx + tokenizer.json, "" = Chroma's MiniLM export
+    EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # ONNX intra-op threads, 0 = all cores
+    # Content-hash vector cache — re-uploads and shared documents skip the model ("" = off)
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.sqlite3")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))  # ~0.8 GB at 384 dims
+
+    # LLM router — shared provider health, circuit breakers, deadlines, hedging
+    LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "30"))  # seconds per call / to first streamed token
+    LLM_STREAM_TIMEOUT = float(os.getenv("LLM_STREAM_TIMEOUT", "120"))  # seconds for a whole streamed answer
+    LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))  # start the next provider after N s, 0 = off
+    LLM_ROUTING = os.getenv("LLM_ROUTING", "latency")  # "latency" (fastest p95 first) or "priority"
+    LLM_HEALTH_WINDOW = int(os.getenv("LLM_HEALTH_WINDOW", "100"))  # recent calls kept per provider
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))  # consecutive failures that open it
+    LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))  # ...or this error rate
+    LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))  # seconds before a probe call
+    LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "16"))  # concurrent requests per provider
+    LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))  # callers waiting per provider, beyond = busy
+    LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))  # seconds to wait for a slot
+
+    # Retrieval — dense (Chroma) and BM25 keyword results fused by reciprocal rank
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # "hybrid" or "dense"
+    RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))  # chunks handed to the prompt
+    RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))  # per retriever, before fusion
+    RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))  # higher = flatter rank weighting
+    RETRIEVAL_DENSE_WEIGHT = float(os.getenv("RETRIEVAL_DENSE_WEIGHT", "1.0"))
+    RETRIEVAL_KEYWORD_WEIGHT = float(os.getenv("RETRIEVAL_KEYWORD_WEIGHT", "1.0"))
+    KEYWORD_INDEX_PATH = os.getenv("KEYWORD_INDEX_PATH", "./keyword_index.sqlite3")
+
+    # Rerank — a local cross-encoder rescores RERANK_CANDIDATES chunks; only relevant ones reach the prompt
+    RERANK_MODEL = os.getenv("RERANK_MODEL", "")  # e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2", "" = off
+    RERANK_DEVICE = os.getenv("RERANK_DEVICE", "cpu")
+    RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "24"))  # retrieved and scored per question
+    RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE", "0.1"))  # relevance (0..1) a passage needs
+    RERANK_MIN_KEEP = int(os.getenv("RERANK_MIN_KEEP", "1"))  # best passages kept even below the cutoff
+    # Most passages kept per mode (modes not listed: RETRIEVAL_TOP_K)
+    RERANK_KEEP = os.getenv("RERANK_KEEP", "study:6,quick:3,quiz:5,roadmap:4,doubt:5,strategy:3")
+
+    # Relevance gate — study / quick / quiz answer "Not in notes yet" without the LLM when nothing is
+    # retrieved or no dense chunk is within the mode's cosine distance (keyword-only hybrid hits are
+    # ignored). Off by default: set "study:<limit>,quick:<limit>,quiz:<limit>" to the limit that
+    # benchmarks/relevance_gate.py suggests for your notes and embedding model
+    RELEVANCE_MAX_DISTANCE = os.getenv("RELEVANCE_MAX_DISTANCE", "")
+
+    # Prompt context — retrieved chunks are merged/deduplicated, then packed up to a token budget per mode
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))  # modes not listed below
+    CONTEXT_TOKEN_BUDGETS = os.getenv(
+        "CONTEXT_TOKEN_BUDGETS", "study:2000,quick:700,quiz:1500,roadmap:1000,doubt:1500,strategy:1000"
+    )
+    CONTEXT_DEDUP_SIMILARITY = float(os.getenv("CONTEXT_DEDUP_SIMILARITY", "0.8"))  # shared 3-gram share
+
+    # Semantic answer cache — repeated questions over unchanged notes skip the LLM
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))  # 0 = off
+    ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))  # seconds, 0 = never expire
+    ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.9"))  # cosine between questions
+
+    # Per-user RAG registry — bounded LRU with idle eviction
+    RAG_REGISTRY_MAX_USERS = int(os.getenv("RAG_REGISTRY_MAX_USERS", "200"))
+    RAG_REGISTRY_IDLE_TTL = float(os.getenv("RAG_REGISTRY_IDLE_TTL", "1800"))  # seconds, 0 = never
+    RAG_REGISTRY_WARM_POOL = int(os.getenv("RAG_REGISTRY_WARM_POOL", "1000"))  # closed instances kept for fast re-open
+
+    # Cold start — heavy libraries load on first use; PREWARM loads them in the background once the
+    # server accepts connections. Comma-separated: chroma, embeddings, reranker, llm, loaders ("" = off)
+    PREWARM = os.getenv("PREWARM", "")
+
+    # Observability — /metrics (Prometheus) and structured logs tagged with the request id
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" (one object per line) or "text"
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+    # Request profiles — cProfile of one ask / upload, downloadable from /api/profiles (admin token)
+    PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")  # X-Profile-Token; "" = header switch off
+    PROFILE_USERS = os.getenv("PROFILE_USERS", "")  # comma separated user ids profiled on every ask / upload
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+    PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+    PROFILE_RETENTION_HOURS = float(os.getenv("PROFILE_RETENTION_HOURS", "72"))  # 0 = keep until MAX_FILES
+
+    # Execution pools — blocking work never runs on the event loop
+    EXECUTOR_IO_WORKERS = int(os.getenv("EXECUTOR_IO_WORKERS", "16"))  # Chroma, embedding, SQLite
+    EXECUTOR_CPU_WORKERS = int(os.getenv("EXECUTOR_CPU_WORKERS", "2"))  # PDF parsing processes, 0 = use threads
+
+    # Ingestion
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))  # chunks per embed + Chroma write
+    INGEST_PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", "8"))  # PDF pages parsed per worker task
+    INGEST_PAGES_IN_FLIGHT = int(os.getenv("INGEST_PAGES_IN_FLIGHT", "4"))  # page batches parsed ahead of indexing
+
+    # File catalog — one row per uploaded file, read by /api/files
+    FILE_CATALOG_PATH = os.getenv("FILE_CATALOG_PATH", "./file_catalog.sqlite3")
+    FILES_PAGE_SIZE = int(os.getenv("FILES_PAGE_SIZE", "200"))  # default /api/files page
+    FILES_PAGE_MAX = int(os.getenv("FILES_PAGE_MAX", "1000"))
+
+    # Background ingestion jobs — state lives in SQLite so queued work survives a restart
+    JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "./jobs.sqlite3")
+    JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+    JOBS_PER_USER_LIMIT = int(os.getenv("JOBS_PER_USER_LIMIT", "1"))  # concurrent ingests per user
+    JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))  # restarts a job may survive
+    JOBS_RETENTION_HOURS = float(os.getenv("JOBS_RETENTION_HOURS", "72"))
 
     @staticmethod
     def init_app(app):
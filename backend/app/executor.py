@@ -0,0 +1,81 @@
+# backend/app/executor.py
+# Execution layer — keeps blocking work (parsing, embedding, Chroma) off the asyncio event loop
+import asyncio
+import contextvars
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.config import Config
+
+T = TypeVar("T")
+
+_io_pool: Optional[ThreadPoolExecutor] = None
+_cpu_pool: Optional[Executor] = None
+_lock = threading.Lock()
+
+
+def get_io_pool() -> ThreadPoolExecutor:
+    """Threads for blocking I/O and GIL-releasing work (Chroma, SQLite, torch encode)."""
+    global _io_pool
+    if _io_pool is None:
+        with _lock:
+            if _io_pool is None:
+                _io_pool = ThreadPoolExecutor(
+                    max_workers=Config.EXECUTOR_IO_WORKERS,
+                    thread_name_prefix="ff-io"
+                )
+    return _io_pool
+
+
+def get_cpu_pool() -> Executor:
+    """
+    Processes for pure-Python CPU work (PDF parsing). Functions sent here must be
+    picklable module-level functions. EXECUTOR_CPU_WORKERS=0 falls back to the I/O threads
+    (useful on tiny instances where extra processes cost too much RAM).
+    """
+    global _cpu_pool
+    if Config.EXECUTOR_CPU_WORKERS <= 0:
+        return get_io_pool()
+    if _cpu_pool is None:
+        with _lock:
+            if _cpu_pool is None:
+                # spawn, not fork: the parent already runs torch / gRPC threads
+                _cpu_pool = ProcessPoolExecutor(
+                    max_workers=Config.EXECUTOR_CPU_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _cpu_pool
+
+
+async def run_in_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context (request id, stage timings) into the worker thread
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(get_io_pool(), partial(ctx.run, fn, *args, **kwargs))
+
+
+async def run_in_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_pool(), partial(fn, *args, **kwargs))
+
+
+def shutdown() -> None:
+    global _io_pool, _cpu_pool
+    with _lock:
+        if _cpu_pool is not None and _cpu_pool is not _io_pool:
+            _cpu_pool.shutdown(wait=False, cancel_futures=True)
+        if _io_pool is not None:
+            _io_pool.shutdown(wait=False, cancel_futures=True)
+        _io_pool = None
+        _cpu_pool = None
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "io_workers": Config.EXECUTOR_IO_WORKERS,
+        "cpu_workers": Config.EXECUTOR_CPU_WORKERS,
+        "io_queue": _io_pool._work_queue.qsize() if _io_pool is not None else 0
+    }
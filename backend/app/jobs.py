@@ -0,0 +1,338 @@
+# backend/app/jobs.py
+# Background ingestion jobs — /api/upload returns a job id, workers do the heavy lifting
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app import metrics
+from app.config import Config
+from app.executor import run_in_io
+from app.logs import get_logger, request_id_var
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_PROGRESS_FIELDS = ("pages_parsed", "pages_total", "chunks_embedded", "chunks_total", "files_done", "files_total")
+
+log = get_logger(__name__)
+
+
+class JobStore:
+    """SQLite-backed job table. Thread-safe and blocking — async callers go through run_in_io."""
+
+    def __init__(self, path: str = Config.JOBS_DB_PATH):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    temp_path TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    pages_parsed INTEGER NOT NULL DEFAULT 0,
+                    pages_total INTEGER NOT NULL DEFAULT 0,
+                    chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                    chunks_total INTEGER NOT NULL DEFAULT 0,
+                    files_done INTEGER NOT NULL DEFAULT 0,
+                    files_total INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            # Databases from before bulk uploads
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column in ("files_done", "files_total"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+
+    def create(self, user_id: str, filename: str, temp_path: str) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, user_id, filename, temp_path, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, user_id, filename, temp_path, QUEUED, now, now)
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def claim_next(self, running_per_user: Dict[str, int], per_user_limit: int) -> Optional[Dict[str, Any]]:
+        """Oldest queued job whose user is below the concurrency limit → marked running."""
+        busy = [user for user, n in running_per_user.items() if n >= per_user_limit]
+        placeholders = ",".join("?" for _ in busy)
+        query = f"SELECT * FROM jobs WHERE status = ? {f'AND user_id NOT IN ({placeholders})' if busy else ''} " \
+                "ORDER BY created_at LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, (QUEUED, *busy)).fetchone()
+            if row is None:
+                return None
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ? AND status = ?",
+                (RUNNING, time.time(), row["id"], QUEUED)
+            ).rowcount
+            if not claimed:
+                return None  # another process got it first
+        job = self._to_dict(row)
+        job["status"] = RUNNING
+        return job
+
+    def update_progress(self, job_id: str, progress: Dict[str, Any]) -> None:
+        fields = [f for f in _PROGRESS_FIELDS if f in progress]
+        if not fields:
+            return
+        assignments = ", ".join(f"{f} = ?" for f in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ?",
+                (*(int(progress[f]) for f in fields), time.time(), job_id)
+            )
+
+    def finish(self, job_id: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, updated_at = ? WHERE id = ?",
+                (DONE, json.dumps(result), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (FAILED, error, time.time(), job_id)
+            )
+
+    def recover(self, max_attempts: int) -> List[Dict[str, Any]]:
+        """
+        After a restart: jobs left 'running' go back to the queue (their upload is still on disk).
+        Jobs whose file is gone or that already crashed too often are failed.
+        Returns the jobs that were failed so their temp files can be cleaned up.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?)", (RUNNING, QUEUED)
+            ).fetchall()
+
+        failed = []
+        for row in rows:
+            job = self._to_dict(row)
+            if not os.path.exists(job["temp_path"]):
+                self.fail(job["id"], "Upload was lost during a restart. Please upload again.")
+                failed.append(job)
+            elif job["status"] == RUNNING and job["attempts"] >= max_attempts:
+                self.fail(job["id"], "Ingestion crashed repeatedly. Please upload again.")
+                failed.append(job)
+            elif job["status"] == RUNNING:
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                        (QUEUED, time.time(), job["id"])
+                    )
+        return failed
+
+    def purge(self, older_than_s: float) -> int:
+        cutoff = time.time() - older_than_s
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (DONE, FAILED, cutoff)
+            )
+        return cur.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+# Runs one job: (user_id, temp_path, filename, progress_callback) → result dict.
+# temp_path is one uploaded file, or a directory of files for a bulk upload.
+IngestFn = Callable[[str, str, str, Callable[[Dict[str, Any]], None]], Awaitable[Dict[str, Any]]]
+
+
+class JobQueue:
+    """
+    asyncio worker pool over a JobStore.
+    - At most `workers` ingests run at once, and at most `per_user_limit` per user
+    - Progress is written through to SQLite, so /api/jobs/{id} works from any worker
+    Every JobStore call runs on the I/O pool: a slow disk must not stall request handling.
+    """
+
+    def __init__(self, ingest: IngestFn, store: Optional[JobStore] = None,
+                 workers: int = Config.JOBS_WORKERS,
+                 per_user_limit: int = Config.JOBS_PER_USER_LIMIT):
+        self.ingest = ingest
+        self.store = store or JobStore()
+        self.workers = workers
+        self.per_user_limit = per_user_limit
+
+        self._running: Dict[str, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._claim_lock: Optional[asyncio.Lock] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        for job in await run_in_io(self.store.recover, Config.JOBS_MAX_ATTEMPTS):
+            _remove_quietly(job["temp_path"])
+        await run_in_io(self.store.purge, Config.JOBS_RETENTION_HOURS * 3600)
+
+        self._wakeup = asyncio.Event()
+        self._claim_lock = asyncio.Lock()
+        self._wakeup.set()  # pick up recovered jobs straight away
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, user_id: str, filename: str, temp_path: str) -> str:
+        job_id = await run_in_io(self.store.create, user_id, filename, temp_path)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def stats(self) -> Dict[str, Any]:
+        """Blocking (counts jobs in SQLite)."""
+        return {
+            "workers": self.workers,
+            "per_user_limit": self.per_user_limit,
+            "running": sum(self._running.values()),
+            "by_status": self.store.counts()
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            # One claim at a time: the per-user count must include the previous claim
+            async with self._claim_lock:
+                job = await run_in_io(self.store.claim_next, dict(self._running), self.per_user_limit)
+                if job is not None:
+                    self._running[job["user_id"]] = self._running.get(job["user_id"], 0) + 1
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self._run(job)
+            self._wakeup.set()  # a per-user slot freed up — let idle workers look again
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        """Run a claimed job (already counted in _running)."""
+        user_id = job["user_id"]
+        # Workers are long-lived tasks: tag this job's logs and stage timings with its id
+        request_id_var.set(job["id"])
+        stages = metrics.begin_stages()
+        start = time.perf_counter()
+        progress = _ProgressWriter(self.store, job["id"], asyncio.get_running_loop())
+
+        try:
+            result = await self.ingest(user_id, job["temp_path"], job["filename"], progress)
+        except asyncio.CancelledError:
+            # Shutdown mid-ingest: leave it 'running' so recover() re-queues it on the next start
+            raise
+        except Exception as e:
+            log.warning("job failed", extra={"user_id": user_id, "source": job["filename"], "error": str(e)})
+            await progress.drained()
+            await run_in_io(self.store.fail, job["id"], f"Processing failed: {e}")
+            _remove_quietly(job["temp_path"])
+        else:
+            await progress.drained()
+            await run_in_io(self.store.finish, job["id"], result)
+            _remove_quietly(job["temp_path"])
+            log.info("job done", extra={
+                "user_id": user_id,
+                "source": job["filename"],
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                "stages_ms": {name: round(s * 1000, 1) for name, s in stages.items()}
+            })
+        finally:
+            self._running[user_id] -= 1
+            if not self._running[user_id]:
+                del self._running[user_id]
+
+
+class _ProgressWriter:
+    """
+    The progress callback handed to ingest. Called from the event loop or from pool threads;
+    it only merges the update and schedules one writer on the loop, which saves the newest
+    values through run_in_io — so the loop never waits on SQLite and writes stay in order.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, loop: asyncio.AbstractEventLoop):
+        self.store = store
+        self.job_id = job_id
+        self._loop = loop
+        self._pending: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._writer: Optional["asyncio.Future[None]"] = None
+        self._scheduled = False
+
+    def __call__(self, update: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.update(update)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._loop.call_soon_threadsafe(self._start)
+
+    async def drained(self) -> None:
+        """Wait until every update so far is in SQLite."""
+        while self._writer is not None and not self._writer.done():
+            await asyncio.shield(self._writer)
+
+    def _start(self) -> None:
+        self._writer = asyncio.ensure_future(self._write())
+
+    async def _write(self) -> None:
+        while True:
+            with self._lock:
+                update, self._pending = self._pending, {}
+                if not update:
+                    self._scheduled = False
+                    return
+            try:
+                await run_in_io(self.store.update_progress, self.job_id, update)
+            except Exception as e:
+                log.warning("job progress not saved", extra={"job_id": self.job_id, "error": str(e)})
+
+
+def _remove_quietly(path: str) -> None:
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
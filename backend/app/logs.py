@@ -0,0 +1,139 @@
+# backend/app/logs.py
+# Structured logs — one JSON object per line (LOG_FORMAT=json) or "key=value" text, each tagged with
+# the request id (X-Request-ID, or generated) or the background job id being processed
+import json
+import logging
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict
+
+from app import metrics
+from app.config import Config
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has — anything else came in through extra={...}
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+_RECORD_ATTRS = _RESERVED | {"request_id"}
+
+
+class _Logger(logging.LoggerAdapter):
+    """
+    Passes extra={...} through, renaming keys a LogRecord already has ("filename" → "extra_filename"):
+    the stdlib raises KeyError for those, which would kill whatever task was logging.
+    """
+
+    def process(self, msg, kwargs):
+        extra = kwargs.get("extra")
+        if extra:
+            kwargs["extra"] = {(f"extra_{k}" if k in _RECORD_ATTRS else k): v for k, v in extra.items()}
+        return msg, kwargs
+
+
+def get_logger(name: str) -> logging.LoggerAdapter:
+    return _Logger(logging.getLogger(name), {})
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+            **record_fields(record)
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+def configure() -> None:
+    """Route the "app" loggers to stdout in LOG_FORMAT at LOG_LEVEL. Safe to call twice."""
+    root = logging.getLogger("app")
+    if any(isinstance(h.formatter, (JsonFormatter, TextFormatter)) for h in root.handlers):
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.addFilter(RequestIdFilter())
+    handler.setFormatter(JsonFormatter() if Config.LOG_FORMAT == "json" else TextFormatter())
+    root.addHandler(handler)
+    root.setLevel(Config.LOG_LEVEL.upper())
+    root.propagate = False
+
+
+access_log = get_logger("app.access")
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI (so it also sees the end of streamed responses): sets the request id, echoes it in
+    X-Request-ID, records focusforge_http_request_seconds and logs one access line with the time
+    each pipeline stage took for this request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or new_request_id()
+        request_id_var.set(request_id)
+        stages = metrics.begin_stages()
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Route template, not the raw path, so /api/jobs/<id> stays one series
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            metrics.HTTP_REQUEST_SECONDS.observe(elapsed, method=scope["method"], route=route, status=status)
+            if route not in ("/metrics", "/health"):
+                access_log.info("request", extra={
+                    "method": scope["method"],
+                    "route": route,
+                    "status": status,
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "stages_ms": {name: round(s * 1000, 1) for name, s in stages.items()}
+                })
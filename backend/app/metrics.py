@@ -0,0 +1,224 @@
+# backend/app/metrics.py
+# Prometheus metrics without the client library — histograms / counters / gauges rendered in the
+# text exposition format at /metrics, plus per-request stage timings for the access log.
+# Numbers are per process (like /health): with several gunicorn workers, scrape each one.
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds — from a cached retrieval (~1 ms) to a long PDF ingest or slow LLM answer
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Current values; most are filled in just before rendering by an on_collect() callback."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [per-bucket counts..., sum, count]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+_collectors: List[Callable[[], None]] = []
+
+
+def on_collect(callback: Callable[[], None]) -> None:
+    """Run `callback` before every render — for gauges read from stats() snapshots."""
+    _collectors.append(callback)
+
+
+def render() -> str:
+    """Every metric in the Prometheus text format (version 0.0.4). Blocking: collectors may hit SQLite."""
+    for callback in _collectors:
+        try:
+            callback()
+        except Exception:
+            pass  # a broken collector must not take the whole scrape down
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# Pipeline stages
+# -----------------------------
+
+STAGE_SECONDS = Histogram(
+    "focusforge_stage_seconds",
+    "Time spent per pipeline stage (upload_receive, pdf_parse, split, embed, chroma_write, retrieval, llm, format, ...)",
+    ["stage"]
+)
+LLM_CALL_SECONDS = Histogram(
+    "focusforge_llm_call_seconds",
+    "LLM calls per provider and outcome (ok, error, timeout); call=\"stream\" measures time to first token",
+    ["provider", "outcome", "call"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "focusforge_http_request_seconds", "HTTP requests by route, method and status", ["method", "route", "status"]
+)
+LLM_CALLS_SKIPPED = Counter(
+    "focusforge_llm_calls_skipped_total",
+    "Questions answered \"Not in notes yet\" by the relevance gate, by mode and reason (empty, distance)",
+    ["mode", "reason"]
+)
+UPLOADS_REJECTED = Counter("focusforge_uploads_rejected_total", "Uploads refused while receiving, by HTTP status", ["status"])
+
+# Gauges — set from the stats() snapshots by the collector main.py registers
+ACTIVE_USERS = Gauge("focusforge_active_users", "Per-user RAG instances open (state=active) or parked (state=warm)", ["state"])
+QUEUE_DEPTH = Gauge("focusforge_queue_depth", "Work waiting: ingest jobs, I/O executor tasks, callers queued per LLM provider", ["queue"])
+IN_FLIGHT = Gauge("focusforge_in_flight", "Work running: ingest jobs, requests per LLM provider", ["kind"])
+CACHE_ENTRIES = Gauge("focusforge_cache_entries", "Entries in the embedding, answer and keyword caches", ["cache"])
+
+# Stage seconds of the request (or background job) being served — read by the access log
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+
+def begin_stages() -> Dict[str, float]:
+    """Start collecting stage timings for the current request / job; returns the (live) dict."""
+    stages: Dict[str, float] = {}
+    _request_stages.set(stages)
+    return stages
+
+
+def current_stages() -> Optional[Dict[str, float]]:
+    return _request_stages.get()
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def timed(fn: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    """(fn(*args), seconds) — for work sent to the CPU process pool, where observe_stage() would land
+    in the worker's registry; the caller records the seconds instead."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
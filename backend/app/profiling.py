@@ -0,0 +1,218 @@
+# backend/app/profiling.py
+# Opt-in request profiles — one /api/ask or /api/upload call run under cProfile, saved with its
+# stage timings and context / prompt sizes as a downloadable artifact (bounded by count and age).
+#
+# Switched on per request by an admin (X-Profile: 1 + X-Profile-Token: $PROFILE_ADMIN_TOKEN) or for
+# every request of the users in PROFILE_USERS. Off (the default) it costs a header lookup and a
+# ContextVar read per note().
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from app import metrics
+from app.config import Config
+from app.logs import get_logger, request_id_var
+
+TOP_FUNCTIONS = 40
+_ID = re.compile(r"^[0-9a-f]{32}$")
+
+log = get_logger(__name__)
+
+# Sizes and counts noted by the pipeline while a profiled call runs (None = not profiling)
+_notes: ContextVar[Optional[Dict[str, Any]]] = ContextVar("profile_notes", default=None)
+
+# One profiled call at a time: on Python 3.12+ cProfile sits on sys.monitoring, which takes one
+# profiler per process — a second Profile.enable() raises ValueError
+_profiling = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another profiled call is running (the API answers 409)."""
+
+
+def allowlisted_users() -> set:
+    return {u.strip() for u in Config.PROFILE_USERS.split(",") if u.strip()}
+
+
+_allowlist = allowlisted_users()
+
+
+def is_admin(headers: Mapping[str, str]) -> bool:
+    token = Config.PROFILE_ADMIN_TOKEN
+    return bool(token) and hmac.compare_digest(headers.get("x-profile-token", ""), token)
+
+
+def requested(headers: Mapping[str, str], user_id: str) -> bool:
+    """Should this request be profiled?"""
+    if user_id in _allowlist:
+        return True
+    return headers.get("x-profile") == "1" and is_admin(headers)
+
+
+def note(key: str, value: Any) -> None:
+    """Attach a value to the running profile; a no-op when nothing is being profiled."""
+    notes = _notes.get()
+    if notes is not None:
+        notes[key] = value
+
+
+def top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{func} ({os.path.basename(filename)}:{line})",
+            "calls": calls,
+            "self_s": round(self_s, 4),
+            "cumulative_s": round(cumulative_s, 4)
+        }
+        for (filename, line, func), (_, calls, self_s, cumulative_s, _) in rows
+    ]
+
+
+class ProfileStore:
+    """<id>.prof (pstats, for snakeviz / pstats) + <id>.json (summary) per profile in PROFILE_DIR."""
+
+    def __init__(self, directory: str = Config.PROFILE_DIR, max_files: int = Config.PROFILE_MAX_FILES,
+                 retention_hours: float = Config.PROFILE_RETENTION_HOURS):
+        self.directory = directory
+        self.max_files = max(1, max_files)
+        self.retention_s = retention_hours * 3600
+        self._lock = threading.Lock()
+
+    def save(self, profiler: cProfile.Profile, summary: Dict[str, Any]) -> str:
+        profile_id = uuid.uuid4().hex
+        stats = pstats.Stats(profiler)
+        summary = {"id": profile_id, **summary, "top_cumulative": top_functions(stats)}
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            stats.dump_stats(self._path(profile_id, "prof"))
+            with open(self._path(profile_id, "json"), "w") as f:
+                json.dump(summary, f, indent=2, default=str)
+            self._prune_locked()
+        return profile_id
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Newest first, without the function table."""
+        entries = []
+        for profile_id in self._ids():
+            summary = self.get(profile_id)
+            if summary:
+                summary.pop("top_cumulative", None)
+                entries.append(summary)
+        return sorted(entries, key=lambda s: s.get("created_at", 0), reverse=True)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not _ID.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id, "json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def prof_path(self, profile_id: str) -> Optional[str]:
+        if not _ID.match(profile_id):
+            return None
+        path = self._path(profile_id, "prof")
+        return path if os.path.exists(path) else None
+
+    def _path(self, profile_id: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{ext}")
+
+    def _ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [name[:-5] for name in names if name.endswith(".json") and _ID.match(name[:-5])]
+
+    def _prune_locked(self) -> None:
+        """Drop profiles past the retention age, then the oldest beyond max_files."""
+        aged = []
+        for profile_id in self._ids():
+            try:
+                aged.append((os.path.getmtime(self._path(profile_id, "json")), profile_id))
+            except OSError:
+                continue
+        aged.sort(reverse=True)
+        cutoff = time.time() - self.retention_s
+        for position, (mtime, profile_id) in enumerate(aged):
+            if position >= self.max_files or (self.retention_s > 0 and mtime < cutoff):
+                for ext in ("json", "prof"):
+                    try:
+                        os.remove(self._path(profile_id, ext))
+                    except OSError:
+                        pass
+
+
+_shared: Optional[ProfileStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_profile_store() -> ProfileStore:
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = ProfileStore()
+    return _shared
+
+
+def run_profiled(kind: str, label: str, user_id: str, fn: Callable[..., Any], *args: Any) -> Tuple[Any, str]:
+    """
+    fn(*args) under cProfile, then saved. Blocking: call it through run_in_io with the synchronous
+    ask() / add_or_replace_file(), so the whole call — Chroma, embedding, LLM wait, formatting —
+    runs in the profiled thread. Before Python 3.12 the profile holds only that thread; from 3.12
+    cProfile is process-wide, so other requests running meanwhile show up in it too.
+    Raises ProfilerBusy if another profiled call is running. Returns (fn's result, profile id).
+    """
+    if not _profiling.acquire(blocking=False):
+        raise ProfilerBusy("another profiled request is running — retry when it is done")
+    try:
+        return _run_profiled(kind, label, user_id, fn, *args)
+    finally:
+        _profiling.release()
+
+
+def _run_profiled(kind: str, label: str, user_id: str, fn: Callable[..., Any], *args: Any) -> Tuple[Any, str]:
+    notes: Dict[str, Any] = {}
+    notes_token = _notes.set(notes)
+    stages = metrics.current_stages()
+    before = dict(stages) if stages is not None else {}
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            result = fn(*args)
+        finally:
+            profiler.disable()
+    finally:
+        _notes.reset(notes_token)
+    elapsed = time.perf_counter() - start
+
+    after = metrics.current_stages() or {}
+    profile_id = get_profile_store().save(profiler, {
+        "kind": kind,
+        "label": label,
+        "user_id": user_id,
+        "request_id": request_id_var.get(),
+        "created_at": time.time(),
+        "duration_ms": round(elapsed * 1000, 1),
+        # Stages of the whole request; the profiled call's own share is `after - before`
+        "stages_ms": {name: round(s * 1000, 1) for name, s in after.items()},
+        "profiled_stages_ms": {name: round((s - before.get(name, 0.0)) * 1000, 1) for name, s in after.items()
+                               if s - before.get(name, 0.0) > 0},
+        "notes": notes
+    })
+    log.info("profile saved", extra={"profile_id": profile_id, "kind": kind, "user_id": user_id,
+                                     "duration_ms": round(elapsed * 1000, 1)})
+    return result, profile_id
@@ -0,0 +1,171 @@
+# backend/app/rag/answer_cache.py
+# Semantic answer cache — near-identical questions over the same notes skip the LLM
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.config import Config
+
+# (user_id, mode, retrieved chunk ids)
+_Key = Tuple[str, str, FrozenSet[str]]
+
+# Paraphrases kept per key — lookups scan them linearly, so keep it small
+_VARIANTS_PER_KEY = 4
+
+
+def _unit(vector: Any) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
+
+
+class _Entry:
+    __slots__ = ("vector", "response", "created")
+
+    def __init__(self, vector: np.ndarray, response: Dict[str, Any]):
+        self.vector = vector
+        self.response = response
+        self.created = time.monotonic()
+
+
+class AnswerCache:
+    """
+    In-memory answer cache keyed by (user, mode, set of retrieved chunk ids).
+    - Inside one key, a hit needs cosine(question, cached question) >= `similarity`,
+      so "explain normalization" and "what is normalisation?" share an answer
+    - Entries expire after `ttl` seconds; at most `max_entries` keys, least recently used first out
+    - invalidate_user() drops everything for a user (upload / delete). The per-user generation
+      makes sure an answer computed before an upload is never stored after it
+    """
+
+    def __init__(self, max_entries: int = Config.ANSWER_CACHE_MAX_ENTRIES,
+                 ttl: float = Config.ANSWER_CACHE_TTL,
+                 similarity: float = Config.ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+
+        self._entries: "OrderedDict[_Key, List[_Entry]]" = OrderedDict()
+        self._user_keys: Dict[str, Set[_Key]] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def generation(self, user_id: str) -> int:
+        """Read before retrieval, pass to put() — stale answers are then dropped."""
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def get(self, user_id: str, mode: str, chunk_ids: Sequence[str],
+            query_vector: Any) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        key = (user_id, mode, frozenset(chunk_ids))
+        vector = _unit(query_vector)
+        now = time.monotonic()
+
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries:
+                fresh = [e for e in entries if self.ttl <= 0 or now - e.created < self.ttl]
+                if len(fresh) != len(entries):
+                    self._replace_locked(key, fresh)
+                for entry in fresh:
+                    if float(np.dot(entry.vector, vector)) >= self.similarity:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return dict(entry.response)
+            self.misses += 1
+        return None
+
+    def put(self, user_id: str, mode: str, chunk_ids: Sequence[str], query_vector: Any,
+            response: Dict[str, Any], generation: int) -> None:
+        if not self.enabled:
+            return
+        key = (user_id, mode, frozenset(chunk_ids))
+        entry = _Entry(_unit(query_vector), dict(response))
+
+        with self._lock:
+            if self._generations.get(user_id, 0) != generation:
+                return  # notes changed while this answer was being generated
+            entries = self._entries.get(key, [])
+            entries.append(entry)
+            self._replace_locked(key, entries[-_VARIANTS_PER_KEY:])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget_key_locked(old_key)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Drop every cached answer of one user. Returns how many keys were removed."""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            keys = self._user_keys.pop(user_id, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            if keys:
+                self.invalidations += 1
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            for user_id in self._user_keys:
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl,
+            "similarity": self.similarity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
+
+    def _replace_locked(self, key: _Key, entries: List[_Entry]) -> None:
+        if entries:
+            self._entries[key] = entries
+            self._user_keys.setdefault(key[0], set()).add(key)
+        else:
+            self._entries.pop(key, None)
+            self._forget_key_locked(key)
+
+    def _forget_key_locked(self, key: _Key) -> None:
+        keys = self._user_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[key[0]]
+
+
+_shared: Optional[AnswerCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Return the process-wide answer cache (created on first call)."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = AnswerCache()
+    return _shared
@@ -0,0 +1,174 @@
+# backend/app/rag/catalog.py
+# Per-user file catalog — /api/files reads one indexed table instead of every chunk's metadata
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import pytz
+
+from app.config import Config
+
+IST = pytz.timezone('Asia/Kolkata')
+UPLOADED_AT_FORMAT = "%d %b %Y, %I:%M %p"
+
+_FIELDS = ("filename", "uploaded_at", "uploaded_ts", "chunks", "size_bytes", "content_hash")
+
+
+def file_fingerprint(path: str) -> Tuple[int, str]:
+    """(size in bytes, sha256) of an uploaded file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest()
+
+
+def parse_uploaded_at(value: str) -> float:
+    """Timestamp of a stored "18 Nov 2025, 03:10 PM" (IST) string; 0 if it cannot be parsed."""
+    try:
+        return IST.localize(datetime.strptime(value, UPLOADED_AT_FORMAT)).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def now_uploaded_at() -> Tuple[str, float]:
+    """("18 Nov 2025, 03:10 PM" in IST, unix timestamp) for a new upload."""
+    ts = time.time()
+    return datetime.fromtimestamp(ts, IST).strftime(UPLOADED_AT_FORMAT), ts
+
+
+class FileCatalog:
+    """
+    SQLite table of (user, filename) → upload time, chunk count, size, content hash.
+    - Written by ingest (IndexSession.finish) and delete_file, read by /api/files
+    - Ordered by a numeric timestamp, so "newest first" is real time order
+    - Users whose files predate the catalog are backfilled once from Chroma (see rebuild())
+    - Thread-safe (one connection behind a lock, same as the job store)
+    """
+
+    def __init__(self, path: str = Config.FILE_CATALOG_PATH):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    user_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    uploaded_at TEXT NOT NULL,
+                    uploaded_ts REAL NOT NULL,
+                    chunks INTEGER NOT NULL DEFAULT 0,
+                    size_bytes INTEGER NOT NULL DEFAULT 0,
+                    content_hash TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (user_id, filename)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS files_recent ON files (user_id, uploaded_ts)")
+            # Users whose catalog is complete (new users, or backfilled from Chroma)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS catalog_users (user_id TEXT PRIMARY KEY)")
+
+        self._indexed: set = set()
+
+    def upsert(self, user_id: str, filename: str, uploaded_at: str, uploaded_ts: float,
+               chunks: int, size_bytes: int = 0, content_hash: str = "") -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files "
+                "(user_id, filename, uploaded_at, uploaded_ts, chunks, size_bytes, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (user_id, filename, uploaded_at, uploaded_ts, chunks, size_bytes, content_hash)
+            )
+
+    def remove(self, user_id: str, filename: str) -> bool:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM files WHERE user_id = ? AND filename = ?", (user_id, filename))
+            return cur.rowcount > 0
+
+    def get(self, user_id: str, filename: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM files WHERE user_id = ? AND filename = ?",
+                (user_id, filename)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def page(self, user_id: str, offset: int = 0, limit: int = Config.FILES_PAGE_SIZE) -> Dict[str, Any]:
+        """Newest first. Returns {"files": [...], "total", "offset", "limit"}."""
+        offset = max(0, offset)
+        limit = max(1, min(limit, Config.FILES_PAGE_MAX))
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM files WHERE user_id = ?", (user_id,)).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM files WHERE user_id = ? "
+                "ORDER BY uploaded_ts DESC, filename LIMIT ? OFFSET ?",
+                (user_id, limit, offset)
+            ).fetchall()
+        return {"files": [dict(row) for row in rows], "total": total, "offset": offset, "limit": limit}
+
+    def is_indexed(self, user_id: str) -> bool:
+        if user_id in self._indexed:
+            return True
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT 1 FROM catalog_users WHERE user_id = ?", (user_id,)
+            ).fetchone() is not None
+        if found:
+            self._indexed.add(user_id)
+        return found
+
+    def rebuild(self, user_id: str, files: Iterable[Dict[str, Any]]) -> None:
+        """
+        One-time backfill from chunk metadata. Rows written by a newer ingest win
+        (INSERT OR IGNORE), then the user is marked as indexed.
+        """
+        rows = [
+            (user_id, f["filename"], f["uploaded_at"], f["uploaded_ts"], f["chunks"],
+             f.get("size_bytes", 0), f.get("content_hash", ""))
+            for f in files
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO files "
+                "(user_id, filename, uploaded_at, uploaded_ts, chunks, size_bytes, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute("INSERT OR IGNORE INTO catalog_users (user_id) VALUES (?)", (user_id,))
+            self._conn.execute("COMMIT")
+        self._indexed.add(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            files = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            users = self._conn.execute("SELECT COUNT(*) FROM catalog_users").fetchone()[0]
+        return {"path": self.path, "files": files, "users": users}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_shared: Optional[FileCatalog] = None
+_shared_lock = threading.Lock()
+
+
+def get_file_catalog() -> FileCatalog:
+    """Return the process-wide file catalog (created on first call)."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = FileCatalog()
+    return _shared
@@ -0,0 +1,231 @@
+# backend/app/rag/context.py
+# Prompt context assembly — merge overlapping neighbours, drop near-duplicates, pack to a per-mode token budget
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.config import Config
+
+# Overlap between consecutive chunks of one page (the splitter uses chunk_overlap=100; whole words are kept, so allow more)
+MIN_OVERLAP = 20
+MAX_OVERLAP = 400
+
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"[.!?]\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token for English prose (no tokenizer dependency; close enough for budgeting)."""
+    return (len(text) + 3) // 4
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """"study:3000,quick:800" → {"study": 3000, "quick": 800}; malformed entries are ignored."""
+    budgets = {}
+    for item in spec.split(","):
+        mode, _, value = item.partition(":")
+        if mode.strip() and value.strip().isdigit():
+            budgets[mode.strip()] = int(value)
+    return budgets
+
+
+_BUDGETS = parse_budgets(Config.CONTEXT_TOKEN_BUDGETS)
+
+
+def token_budget(mode: str) -> int:
+    return _BUDGETS.get(mode, Config.CONTEXT_TOKEN_BUDGET)
+
+
+def overlap_length(first: str, second: str) -> int:
+    """Length of the longest suffix of `first` that is a prefix of `second` (0 if under MIN_OVERLAP)."""
+    if len(first) < MIN_OVERLAP or len(second) < MIN_OVERLAP:
+        return 0
+    probe = second[:MIN_OVERLAP]
+    pos = first.find(probe, max(0, len(first) - MAX_OVERLAP))
+    while pos != -1:
+        if second.startswith(first[pos:]):
+            return len(first) - pos
+        pos = first.find(probe, pos + 1)
+    return 0
+
+
+def _shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = _WORD.findall(text.lower())
+    if len(words) < 3:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+class _Passage:
+    __slots__ = ("text", "rank", "key", "members")
+
+    def __init__(self, text: str, rank: int, key: Tuple[Any, Any]):
+        self.text = text
+        self.rank = rank  # best retrieval rank among the merged chunks
+        self.key = key
+        self.members = 1
+
+
+def merge_neighbours(docs: Sequence[str], metadatas: Sequence[Optional[Dict[str, Any]]]) -> List[_Passage]:
+    """
+    Chunks of the same (source, page) whose end overlaps the next one's start are joined into one
+    passage, so the shared text appears once. Result is ordered by best retrieval rank.
+    """
+    groups: Dict[Tuple[Any, Any], List[_Passage]] = {}
+    for rank, doc in enumerate(docs):
+        if not doc:
+            continue
+        meta = (metadatas[rank] if rank < len(metadatas) else None) or {}
+        key = (meta.get("source"), meta.get("page"))
+        groups.setdefault(key, []).append(_Passage(doc, rank, key))
+
+    passages: List[_Passage] = []
+    for group in groups.values():
+        merged = True
+        while merged and len(group) > 1:
+            merged = False
+            for a in group:
+                for b in group:
+                    if a is b:
+                        continue
+                    length = overlap_length(a.text, b.text)
+                    if length:
+                        a.text += b.text[length:]
+                        a.rank = min(a.rank, b.rank)
+                        a.members += b.members
+                        group.remove(b)
+                        merged = True
+                        break
+                if merged:
+                    break
+        passages.extend(group)
+    passages.sort(key=lambda p: p.rank)
+    return passages
+
+
+def drop_near_duplicates(passages: List[_Passage], threshold: float) -> Tuple[List[_Passage], int]:
+    """Drop a passage when `threshold` of its word 3-grams already appear in a better-ranked kept passage."""
+    kept: List[Tuple[_Passage, Set[Tuple[str, ...]]]] = []
+    dropped = 0
+    for passage in passages:
+        shingles = _shingles(passage.text)
+        duplicate = False
+        for other, other_shingles in kept:
+            smaller = min(len(shingles), len(other_shingles))
+            if smaller and len(shingles & other_shingles) / smaller >= threshold:
+                duplicate = True
+                # Keep the longer text in the better-ranked slot
+                if len(passage.text) > len(other.text) and len(shingles) > len(other_shingles):
+                    other.text = passage.text
+                    other_shingles |= shingles
+                break
+        if duplicate:
+            dropped += 1
+        else:
+            kept.append((passage, shingles))
+    return [p for p, _ in kept], dropped
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut to about `max_tokens`, at the last sentence end (or space) before the limit."""
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    ends = [m.end() for m in _SENTENCE_END.finditer(cut)]
+    if ends and ends[-1] > limit // 2:
+        return cut[:ends[-1]].rstrip()
+    space = cut.rfind(" ")
+    return (cut[:space] if space > limit // 2 else cut).rstrip()
+
+
+def build_context(docs: Sequence[str], metadatas: Sequence[Optional[Dict[str, Any]]],
+                  budget: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    The prompt's "Context from notes" block and a report of what it cost:
+    1. neighbours of the same source/page are merged (chunk overlap counted once)
+    2. near-duplicate passages are dropped
+    3. passages are packed best-rank first until `budget` tokens; one that does not fit is
+       skipped (a later, shorter one may still fit), and the best one is truncated if alone too long
+    """
+    raw_tokens = estimate_tokens("\n\n".join(d for d in docs if d)) if docs else 0
+    passages = merge_neighbours(docs, metadatas)
+    merged = sum(p.members - 1 for p in passages)
+    passages, duplicates = drop_near_duplicates(passages, Config.CONTEXT_DEDUP_SIMILARITY)
+
+    packed: List[str] = []
+    used = skipped = 0
+    for passage in passages:
+        cost = estimate_tokens(passage.text) + (1 if packed else 0)  # separator
+        if used + cost <= budget:
+            packed.append(passage.text)
+            used += cost
+        elif not packed and budget > 0:
+            packed.append(_truncate(passage.text, budget))
+            used = estimate_tokens(packed[0])
+        else:
+            skipped += 1
+
+    context = "\n\n".join(packed)
+    tokens = estimate_tokens(context) if context else 0
+    return context, {
+        "budget": budget,
+        "chunks": sum(1 for d in docs if d),
+        "passages": len(packed),
+        "merged": merged,
+        "duplicates": duplicates,
+        "skipped": skipped,
+        "tokens_raw": raw_tokens,
+        "tokens": tokens,
+        "tokens_saved": max(0, raw_tokens - tokens)
+    }
+
+
+class ContextStats:
+    """Running totals of what context assembly saved, for /health."""
+
+    def __init__(self):
+        self.requests = 0
+        self.tokens_raw = 0
+        self.tokens = 0
+        self.merged = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def record(self, report: Dict[str, Any]) -> None:
+        with self._lock:
+            self.requests += 1
+            self.tokens_raw += report["tokens_raw"]
+            self.tokens += report["tokens"]
+            self.merged += report["merged"]
+            self.duplicates += report["duplicates"]
+            self.skipped += report["skipped"]
+
+    def stats(self) -> Dict[str, Any]:
+        saved = self.tokens_raw - self.tokens
+        return {
+            "budgets": {**_BUDGETS, "default": Config.CONTEXT_TOKEN_BUDGET},
+            "requests": self.requests,
+            "tokens_raw": self.tokens_raw,
+            "tokens_sent": self.tokens,
+            "tokens_saved": saved,
+            "saved_ratio": round(saved / self.tokens_raw, 3) if self.tokens_raw else 0.0,
+            "merged_chunks": self.merged,
+            "duplicates_dropped": self.duplicates,
+            "skipped_for_budget": self.skipped
+        }
+
+
+_shared: Optional[ContextStats] = None
+_shared_lock = threading.Lock()
+
+
+def get_context_stats() -> ContextStats:
+    """Return the process-wide context assembly stats."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = ContextStats()
+    return _shared
@@ -0,0 +1,144 @@
+# backend/app/rag/embedding_cache.py
+# Persistent content-hash → vector cache, shared by every user of the process
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+# SQLite caps bound parameters per statement; stay well below the oldest default (999)
+_SQL_CHUNK = 500
+
+
+def cache_key(model_name: str, text: str) -> str:
+    """sha256 of model name + chunk text — the same text under another model is a different entry."""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed vector cache keyed by cache_key().
+    - Vectors are stored as raw float32 bytes
+    - Bounded by `max_entries`: once over, the least recently used ~10% are evicted
+    - Thread-safe (one connection behind a lock, same as the job store)
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings (last_used)")
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for the given keys (missing keys are simply absent). Touches hits."""
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(keys))
+        now = time.time()
+
+        with self._lock:
+            for start in range(0, len(unique), _SQL_CHUNK):
+                part = unique[start:start + _SQL_CHUNK]
+                placeholders = ",".join("?" for _ in part)
+                rows = self._conn.execute(
+                    f"SELECT key, dim, vector FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall()
+                for key, dim, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' for _ in rows)})",
+                        (now, *(row[0] for row in rows))
+                    )
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        return found
+
+    def put_many(self, items: Dict[str, Any]) -> None:
+        """Store vectors, then evict least-recently-used entries if over capacity."""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            array = np.asarray(vector, dtype=np.float32)
+            rows.append((key, int(array.shape[0]), array.tobytes(), now))
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, dim, vector, last_used) VALUES (?, ?, ?, ?)", rows
+            )
+            self._entries += self._conn.total_changes - before
+            self._conn.execute("COMMIT")
+            if self._entries > self.max_entries:
+                self._evict_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._entries = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        size_bytes = sum(
+            os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p)
+        )
+        return {
+            "path": self.path,
+            "entries": self._entries,
+            "max_entries": self.max_entries,
+            "size_mb": round(size_bytes / (1024 * 1024), 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _evict_locked(self) -> None:
+        # Trim to 90% so eviction runs once per burst of inserts, not on every batch
+        target = int(self.max_entries * 0.9)
+        excess = self._entries - target
+        if excess <= 0:
+            return
+        removed = self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+        ).rowcount
+        self._entries -= removed
+        self.evictions += removed
+
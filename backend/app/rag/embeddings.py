@@ -0,0 +1,197 @@
+# backend/app/rag/embeddings.py
+# Process-wide embedding engine — the model is loaded ONCE and shared by every user
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config import Config
+from app.logs import get_logger
+from app.rag.embedding_cache import EmbeddingCache, cache_key
+
+
+def process_rss_mb() -> float:
+    """Current resident memory of this process in MB (best effort)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+        # ru_maxrss is KB on Linux (peak, not current — good enough as a fallback)
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except Exception:
+        return 0.0
+
+
+# Same shapes as chromadb.Documents / chromadb.Embeddings
+Documents = List[str]
+Embeddings = List[Any]
+
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+log = get_logger(__name__)
+
+
+class SharedEmbeddingFunction:
+    """
+    Chroma embedding function backed by a single model, shared by every user.
+    - backend "torch": SentenceTransformer; "onnx" / "onnx-int8": ONNX Runtime, no torch at all
+      (app/rag/onnx_encoder.py) — same vectors within tolerance, so collections need no re-embed
+    - Duck-typed: Chroma only checks the __call__(self, input) signature, so this module
+      (and /health) does not import chromadb; Chroma still validates the returned vectors
+    - Model is loaded lazily on first use (double-checked lock)
+    - encode() is serialized: HF fast tokenizers are not re-entrant
+      ("Already borrowed"), and torch already uses every core per call
+    - With a cache, texts embedded before (by any user) are served from disk
+      and only the misses reach the model
+    """
+
+    def __init__(self, model_name: str, device: str = "cpu", batch_size: int = 64,
+                 cache: Optional[EmbeddingCache] = None, backend: str = "torch"):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+        self.model_name = model_name
+        self.device = device if backend == "torch" else "cpu"
+        self.backend = backend
+        # fp32 ONNX reproduces the torch vectors, so they share cache entries; int8 ones are kept apart
+        self.cache_model = f"{model_name}@int8" if backend == "onnx-int8" else model_name
+        self.batch_size = batch_size
+        self.cache = cache
+
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+
+        self.load_time_s: Optional[float] = None
+        self.rss_before_load_mb: Optional[float] = None
+        self.rss_after_load_mb: Optional[float] = None
+        self.calls = 0
+        self.texts_embedded = 0
+
+    def _load(self):
+        if self._model is not None:
+            return self._model
+
+        with self._load_lock:
+            if self._model is None:
+                self.rss_before_load_mb = process_rss_mb()
+                start = time.perf_counter()
+                model = self._build()
+                self.load_time_s = round(time.perf_counter() - start, 3)
+                self.rss_after_load_mb = process_rss_mb()
+                log.info("embedding model loaded", extra={
+                    "model": self.model_name, "backend": self.backend, "device": self.device,
+                    "load_s": self.load_time_s
+                })
+                self._model = model
+
+        return self._model
+
+    def _build(self):
+        if self.backend == "torch":
+            from sentence_transformers import SentenceTransformer
+
+            return SentenceTransformer(self.model_name, device=self.device)
+
+        from app.rag.onnx_encoder import OnnxEncoder, default_model_dir
+
+        model_dir = Config.EMBEDDING_ONNX_DIR or default_model_dir(self.model_name)
+        return OnnxEncoder(model_dir, quantized=self.backend == "onnx-int8", threads=Config.EMBEDDING_THREADS)
+
+    def __call__(self, input: Documents) -> Embeddings:
+        texts = list(input)
+        if not texts:
+            return []
+
+        if self.cache is None:
+            return [vector for vector in self._encode(texts)]
+
+        keys = [cache_key(self.cache_model, text) for text in texts]
+        found = self.cache.get_many(keys)
+        missing = [i for i, key in enumerate(keys) if key not in found]
+
+        if missing:
+            # Duplicate texts inside one call are embedded once
+            todo = list(dict.fromkeys(keys[i] for i in missing))
+            first_text = {keys[i]: texts[i] for i in reversed(missing)}
+            fresh = self._encode([first_text[key] for key in todo])
+            new = dict(zip(todo, fresh))
+            self.cache.put_many(new)
+            found.update(new)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> Any:
+        """
+        One question's vector, straight from the model: the persistent cache is for chunks —
+        question vectors would cost a SQLite write per ask and push chunk vectors out of the LRU.
+        """
+        return self._encode([text])[0]
+
+    def _encode(self, texts: List[str]):
+        model = self._load()
+        with self._encode_lock:
+            vectors = model.encode(
+                texts,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+            self.calls += 1
+            self.texts_embedded += len(texts)
+        return vectors
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot for /health — never triggers a model load."""
+        loaded = self._model is not None
+        param_mb = None
+        if loaded and self.backend == "torch":
+            param_mb = round(
+                sum(p.numel() * p.element_size() for p in self._model.parameters()) / (1024 * 1024), 1
+            )
+        elif loaded:
+            param_mb = self._model.model_mb  # ONNX file size (int8 ≈ 1/4 of fp32)
+
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "device": self.device,
+            "batch_size": self.batch_size,
+            "loaded": loaded,
+            "load_time_s": self.load_time_s,
+            "model_params_mb": param_mb,
+            "rss_load_delta_mb": (
+                round(self.rss_after_load_mb - self.rss_before_load_mb, 1) if loaded else None
+            ),
+            "process_rss_mb": process_rss_mb(),
+            "calls": self.calls,
+            "texts_embedded": self.texts_embedded,
+            "cache": self.cache.stats() if self.cache is not None else None
+        }
+
+
+_shared: Optional[SharedEmbeddingFunction] = None
+_shared_lock = threading.Lock()
+
+
+def get_embedding_function() -> SharedEmbeddingFunction:
+    """Return the process-wide embedding function (created on first call)."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                cache = None
+                if Config.EMBEDDING_CACHE_PATH and Config.EMBEDDING_CACHE_MAX_ENTRIES > 0:
+                    cache = EmbeddingCache(Config.EMBEDDING_CACHE_PATH, Config.EMBEDDING_CACHE_MAX_ENTRIES)
+                _shared = SharedEmbeddingFunction(
+                    model_name=Config.EMBEDDING_MODEL,
+                    device=Config.EMBEDDING_DEVICE,
+                    batch_size=Config.EMBEDDING_BATCH_SIZE,
+                    cache=cache,
+                    backend=Config.EMBEDDING_BACKEND
+                )
+    return _shared
@@ -0,0 +1,557 @@
+# backend/app/rag/formatter.py
+# Answer formatter — same output as the old two-step
+#   markdown_to_readable_v2(format_gemini_response(text))
+# (kept as the reference in benchmarks/format_answer.py), either one-shot (format_answer)
+# or fed token by token (StreamingFormatter) while the LLM is still writing.
+import re
+from textwrap import TextWrapper
+from typing import Callable, List, Optional
+
+# -----------------------------
+# Patterns (compiled once)
+# -----------------------------
+_LINE_BREAK = re.compile(r"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")  # same breaks as str.splitlines()
+
+# format_gemini_response — per line
+_HR_DASHES = re.compile(r'^[-]{3,}$')
+_MD_HEADING = re.compile(r'^\s*#{1,3}\s+')
+_NUMBERED = re.compile(r'^\s*\d+[\.\)]\s')
+_NUMBER_PREFIX = re.compile(r'^[\s\d\.\)]+\s*')
+_QUESTION_PREFIX = re.compile(r'.*?(question|q)[:\s]+', re.I)
+_MCQ_OPTION = re.compile(r'^[ABCD]\)')
+_BULLET = re.compile(r'^\s*[-*•]\s+')
+_BULLET_PREFIX = re.compile(r'^\s*[-*•]+\s+')
+
+# markdown_to_readable_v2 — inline
+_BOLD_STARS = re.compile(r"\*\*(.*?)\*\*")
+_ITALIC_STAR = re.compile(r"\*(.*?)\*")
+_BOLD_UNDERSCORES = re.compile(r"__(.*?)__")
+_ITALIC_UNDERSCORE = re.compile(r"_(.*?)_")
+
+# markdown_to_readable_v2 — whole-text block rewrites (one-shot path only)
+_CODE_FENCE = re.compile(r"```(.*?)```", re.S)
+_TABLE_ROWS = re.compile(r"((?:\|.*\n)+)")
+_BLANK_RUN = re.compile(r"\n{3,}")
+
+# markdown_to_readable_v2 — line-anchored rewrites (their \s can run across blank lines)
+_HEADING = re.compile(r"^(#{1,6})(\s+)(.*)$", re.M)
+_RULE = re.compile(r"^\s*[-*_]{3,}\s*$", re.M)
+_ORDERED = re.compile(r"^\s*(\d+)[\.\)]\s+", re.M)
+_UNORDERED = re.compile(r"^(\s*)[-*+]\s+", re.M)
+_QUOTE = re.compile(r"^\s*>\s?", re.M)
+
+# Lines after which one of the rewrites above may continue onto the next line
+_OPEN_HEADING = re.compile(r"#{1,6}\s*")
+_OPEN_RULE = re.compile(r"\s*[-*_]{3,}\s*")
+_OPEN_ORDERED = re.compile(r"\s*\d+[\.\)]\s*")
+_OPEN_UNORDERED = re.compile(r"\s*[-*+]\s*")
+_OPEN_QUOTE = re.compile(r"\s*>")
+
+_NO_WRAP_PREFIXES = ("•", "◦", "CODE BLOCK", "TABLE")
+_ODD_SPACE = re.compile(r"[^\S ]")  # whitespace other than a plain space
+
+Emit = Callable[[str], None]
+
+
+def _has_text(line: str) -> bool:
+    return bool(line) and not line.isspace()
+
+
+def _heading_to_title(match) -> str:
+    return "\n" + match.group(2).strip().upper() + "\n"
+
+
+def _convert_bullet(match) -> str:
+    indent = len(match.group(1)) // 2
+    symbol = "•" if indent == 0 else "  " * indent + "◦"
+    return f"{symbol} "
+
+
+def _fill(wrapper: TextWrapper, line: str) -> str:
+    """
+    wrapper.fill(line), without the wrapper for plain prose:
+    - a line that already fits only loses its trailing spaces
+    - words separated by single spaces (no hyphens, tabs or other whitespace) are wrapped
+      greedily with str.rfind — the same breaks TextWrapper picks, without building chunks
+    """
+    width = wrapper.width
+    if "\t" in line:
+        return wrapper.fill(line)
+    if len(line) <= width:
+        body = line.rstrip(" ")
+        if not body or not body[-1].isspace():
+            return body
+        return wrapper.fill(line)
+    if "-" in line or "  " in line or line[0] == " " or _ODD_SPACE.search(line):
+        return wrapper.fill(line)
+
+    rest = line.rstrip(" ")
+    parts = []
+    while len(rest) > width:
+        if rest[width] == " ":
+            parts.append(rest[:width])
+            rest = rest[width + 1:]
+            continue
+        cut = rest.rfind(" ", 0, width)
+        if cut < 0:
+            return wrapper.fill(line)  # a word longer than the line — let TextWrapper break it
+        parts.append(rest[:cut])
+        rest = rest[cut + 1:]
+    parts.append(rest)
+    return "\n".join(parts)
+
+
+# -----------------------------
+# Stages — each takes complete lines and pushes lines downstream
+# -----------------------------
+class _Stage:
+    def __init__(self, emit: Emit, finish: Callable[[], None]):
+        self.emit = emit
+        self.finish_next = finish
+
+    def finish(self) -> None:
+        self.finish_next()
+
+
+class _GeminiLines(_Stage):
+    """format_gemini_response: per-line rules, blank-line collapse, '##' spacing, trimming."""
+
+    def __init__(self, emit: Emit, finish: Callable[[], None]):
+        super().__init__(emit, finish)
+        self.in_code_block = False
+        # "\n{3,}" collapse
+        self.seen_text = False
+        self.blank_run = 0
+        # "([^\n])(\n##)" spacing
+        self.index = 0
+        self.prev_line: Optional[str] = None
+        self.prev_consumed = False
+        # final .strip()
+        self.started = False
+        self.trailing_blanks = 0
+
+    def feed(self, line: str) -> None:
+        formatted = self._format_line(line)
+        if formatted == "":
+            self.blank_run += 1
+            return
+
+        if self.seen_text:
+            blanks = 1 if self.blank_run else 0
+        else:
+            blanks = self.blank_run if self.blank_run < 3 else 2
+        self.seen_text = True
+        self.blank_run = 0
+
+        for _ in range(blanks):
+            self._space_headings("")
+        self._space_headings(formatted)
+
+    def finish(self) -> None:
+        m = self.blank_run
+        if self.seen_text:
+            blanks = m if m < 3 else 2
+        else:
+            blanks = 3 if m - 1 >= 3 else m
+        for _ in range(blanks):
+            self._space_headings("")
+        self.finish_next()
+
+    def _format_line(self, line: str) -> str:
+        stripped = line.strip()
+
+        if not stripped and not self.in_code_block:
+            return ""
+
+        if stripped.startswith("```"):
+            self.in_code_block = not self.in_code_block
+            return line
+        if self.in_code_block:
+            return line
+
+        if _HR_DASHES.match(stripped):
+            return "---"
+
+        if _MD_HEADING.match(stripped):
+            return stripped
+
+        if stripped.endswith(":") and len(stripped) < 80:
+            return f"## {stripped[:-1].strip()}"
+
+        if _NUMBERED.match(stripped):
+            return f"**{_NUMBER_PREFIX.sub('', stripped)}**"
+
+        lowered = stripped.lower()
+        if "question:" in lowered or "q:" in lowered or "que." in lowered:
+            cleaned = _QUESTION_PREFIX.sub('', stripped).strip()
+            if cleaned:
+                return f"**{cleaned}**"
+
+        if _MCQ_OPTION.match(stripped):
+            return f"**{stripped[0:2]}** {stripped[2:].strip()}"
+
+        if _BULLET.match(stripped):
+            return f"- {_BULLET_PREFIX.sub('', stripped)}"
+
+        return stripped
+
+    def _space_headings(self, line: str) -> None:
+        matched = (
+            self.index > 0
+            and line.startswith("##")
+            and bool(self.prev_line)
+            and not self.prev_consumed
+        )
+        if matched:
+            self._trim("")
+        self._trim(line)
+
+        self.prev_consumed = matched and len(line) == 2
+        self.prev_line = line
+        self.index += 1
+
+    def _trim(self, line: str) -> None:
+        line = line.rstrip()
+        if not line:
+            if self.started:
+                self.trailing_blanks += 1
+            return
+
+        if not self.started:
+            self.started = True
+            line = line.lstrip()
+        for _ in range(self.trailing_blanks):
+            self.emit("")
+        self.trailing_blanks = 0
+        self.emit(line)
+
+
+class _CodeBlocks(_Stage):
+    """```code``` → CODE BLOCK: + indented lines. Buffers only while inside a fence."""
+
+    def __init__(self, emit: Emit, finish: Callable[[], None]):
+        super().__init__(emit, finish)
+        self.first = True
+        self.in_block = False
+        self.current: List[str] = []
+        self.content: List[str] = []
+
+    def feed(self, line: str) -> None:
+        if not self.first and self.in_block:
+            self.content.append("\n")
+        self.first = False
+
+        pos = 0
+        while True:
+            if not self.in_block:
+                i = line.find("```", pos)
+                if i < 0:
+                    self.current.append(line[pos:])
+                    break
+                self.current.append(line[pos:i])
+                self.in_block = True
+                self.content = []
+                pos = i + 3
+            else:
+                j = line.find("```", pos)
+                if j < 0:
+                    self.content.append(line[pos:])
+                    break
+                self.content.append(line[pos:j])
+                self.in_block = False
+                pos = j + 3
+
+                code = "".join(self.content)
+                indented = "\n".join("    " + l for l in code.splitlines())
+                parts = f"\nCODE BLOCK:\n{indented}\n\n".split("\n")
+                self.current.append(parts[0])
+                self.emit("".join(self.current))
+                for part in parts[1:-1]:
+                    self.emit(part)
+                self.current = [parts[-1]]
+
+        if not self.in_block:
+            self.emit("".join(self.current))
+            self.current = []
+
+    def finish(self) -> None:
+        if self.in_block:
+            # Unclosed fence — the regex never matched, so the text stays as it was
+            parts = ("```" + "".join(self.content)).split("\n")
+            self.current.append(parts[0])
+            self.emit("".join(self.current))
+            for part in parts[1:]:
+                self.emit(part)
+        elif self.current:
+            self.emit("".join(self.current))
+        self.finish_next()
+
+
+class _Tables(_Stage):
+    """Pipe rows → 'a | b'. A row is only converted when a newline follows it."""
+
+    def __init__(self, emit: Emit, finish: Callable[[], None]):
+        super().__init__(emit, finish)
+        self.held: Optional[str] = None
+
+    def feed(self, line: str) -> None:
+        if self.held is not None:
+            self.emit(self._convert(self.held))
+            self.held = None
+        if "|" in line:
+            self.held = line
+        else:
+            self.emit(line)
+
+    def finish(self) -> None:
+        if self.held is not None:
+            self.emit(self.held)
+            self.held = None
+        self.finish_next()
+
+    @staticmethod
+    def _convert(line: str) -> str:
+        i = line.index("|")
+        row = line[i:].strip()
+        return line[:i] + " | ".join(c.strip() for c in row.strip("|").split("|"))
+
+
+class _Inline(_Stage):
+    """Bold / italic markers → plain text."""
+
+    def feed(self, line: str) -> None:
+        if "*" in line:
+            line = _BOLD_STARS.sub(r"\1", line)
+            line = _ITALIC_STAR.sub(r"\1", line)
+        if "_" in line:
+            line = _BOLD_UNDERSCORES.sub(r"\1", line)
+            line = _ITALIC_UNDERSCORE.sub(r"\1", line)
+        self.emit(line)
+
+
+class _Rewrite(_Stage):
+    """
+    One line-anchored regex rewrite. Lines are buffered until a boundary where no match
+    can cross: a line with text that the pattern cannot continue past. The rule pattern
+    also looks past its line, so it additionally waits for the next line to start with text.
+    `can_start(c)` tells whether a match may begin with character `c` (after leading whitespace) —
+    a single buffered line starting with anything else is passed through without the regex.
+    """
+
+    def __init__(self, emit: Emit, finish: Callable[[], None], pattern, repl, open_line,
+                 can_start: Callable[[str], bool], lookahead: bool = False):
+        super().__init__(emit, finish)
+        self.pattern = pattern
+        self.repl = repl
+        self.open_line = open_line
+        self.can_start = can_start
+        self.lookahead = lookahead
+        self.buffer: List[str] = []
+
+    def feed(self, line: str) -> None:
+        if self.lookahead and self.buffer and line[:1] and not line[0].isspace():
+            last = self.buffer[-1]
+            if _has_text(last):
+                self._flush()
+
+        self.buffer.append(line)
+        if _has_text(line) and not self.open_line.fullmatch(line):
+            self._flush()
+
+    def finish(self) -> None:
+        if self.buffer:
+            self._flush()
+        self.finish_next()
+
+    def _flush(self) -> None:
+        if len(self.buffer) == 1:
+            line = self.buffer[0]
+            first = line.lstrip()[:1]
+            if not first or not self.can_start(first):
+                self.buffer = []
+                self.emit(line)
+                return
+        text = "\n".join(self.buffer)
+        self.buffer = []
+        for part in self.pattern.sub(self.repl, text).split("\n"):
+            self.emit(part)
+
+
+class _Wrap(_Stage):
+    """Wrap paragraphs to 70 columns (list items and code stay as they are)."""
+
+    def __init__(self, emit: Emit, finish: Callable[[], None]):
+        super().__init__(emit, finish)
+        self.wrapper = TextWrapper(width=70)
+
+    def feed(self, line: str) -> None:
+        if line.strip().startswith(_NO_WRAP_PREFIXES):
+            self.emit(line)
+            return
+        for part in _fill(self.wrapper, line).split("\n"):
+            self.emit(part)
+
+
+class _Tidy(_Stage):
+    """Collapse 3+ newlines to 2 and strip the whole answer, without seeing its end first."""
+
+    def __init__(self, emit: Emit, finish: Callable[[], None]):
+        super().__init__(emit, finish)
+        self.started = False
+        self.pending: List[str] = []
+        self.held_tail = ""
+
+    def feed(self, line: str) -> None:
+        if not _has_text(line):
+            if self.started:
+                self.pending.append(line)
+            return
+
+        if not self.started:
+            self.started = True
+            line = line.lstrip()
+            out = []
+        else:
+            out = [self.held_tail, "\n"]
+            run = 0
+            for p in self.pending:
+                if p == "":
+                    run += 1
+                    continue
+                if run:
+                    out.append("\n")
+                run = 0
+                out.append(p + "\n")
+            if run:
+                out.append("\n")
+        self.pending = []
+
+        body = line.rstrip()
+        self.held_tail = line[len(body):]
+        out.append(body)
+        self.emit("".join(out))
+
+    def finish(self) -> None:
+        self.pending = []
+        self.held_tail = ""
+        self.finish_next()
+
+
+# -----------------------------
+# Public API
+# -----------------------------
+class StreamingFormatter:
+    """
+    Feed raw LLM text in any chunk sizes, get formatted text back as soon as each line
+    is settled. Concatenating every feed() result plus finish() gives exactly
+    markdown_to_readable_v2(format_gemini_response(full_text)).
+    """
+
+    def __init__(self):
+        self._out: List[str] = []
+        self._buffer = ""
+        self._done = False
+
+        def end() -> None:
+            pass
+
+        tidy = _Tidy(self._out.append, end)
+        wrap = _Wrap(tidy.feed, tidy.finish)
+        quote = _Rewrite(wrap.feed, wrap.finish, _QUOTE, "", _OPEN_QUOTE, ">".__eq__)
+        bullets = _Rewrite(quote.feed, quote.finish, _UNORDERED, _convert_bullet, _OPEN_UNORDERED, "-*+".__contains__)
+        ordered = _Rewrite(bullets.feed, bullets.finish, _ORDERED, r"\1. ", _OPEN_ORDERED, str.isdecimal)
+        rules = _Rewrite(ordered.feed, ordered.finish, _RULE, "\n", _OPEN_RULE, "-*_".__contains__, lookahead=True)
+        headings = _Rewrite(rules.feed, rules.finish, _HEADING, _heading_to_title, _OPEN_HEADING, "#".__eq__)
+        inline = _Inline(headings.feed, headings.finish)
+        tables = _Tables(inline.feed, inline.finish)
+        code = _CodeBlocks(tables.feed, tables.finish)
+        self._head = _GeminiLines(code.feed, code.finish)
+
+    def feed(self, chunk: str) -> str:
+        if not chunk:
+            return ""
+        buffer = self._buffer + chunk
+        start = 0
+        for m in _LINE_BREAK.finditer(buffer):
+            if m.end() == len(buffer) and m.group() == "\r":
+                break  # may be the first half of "\r\n"
+            self._head.feed(buffer[start:m.start()])
+            start = m.end()
+        self._buffer = buffer[start:]
+        return self._drain()
+
+    def finish(self) -> str:
+        if self._done:
+            return ""
+        self._done = True
+        for line in self._buffer.splitlines():
+            self._head.feed(line)
+        self._buffer = ""
+        self._head.finish()
+        return self._drain()
+
+    def _drain(self) -> str:
+        text = "".join(self._out)
+        self._out.clear()
+        return text
+
+
+def _code_block(match) -> str:
+    indented = "\n".join("    " + line for line in match.group(1).splitlines())
+    return f"\nCODE BLOCK:\n{indented}\n\n"
+
+
+def _table(match) -> str:
+    rows = [r.strip() for r in match.group(1).strip().split("\n") if "|" in r]
+    if not rows:
+        return match.group(1)
+    return "\n".join(" | ".join(c.strip() for c in row.strip("|").split("|")) for row in rows) + "\n"
+
+
+def format_answer(text: str) -> str:
+    """
+    One-shot formatting of a complete answer — same output as StreamingFormatter, faster
+    when the whole text is already here. Not a single pass: the per-line rules run in one
+    loop, then each cross-line rewrite is one precompiled regex over the whole text (skipped
+    when its marker character does not occur), then one wrap loop. The regexes stay because
+    their leading-whitespace match can swallow the blank line before a list item or quote;
+    matching that line by line is what the StreamingFormatter stages do, and they are slower.
+    About 1.4-2x faster than the old two-step formatter, depending on the machine
+    (benchmarks/format_answer.py); output is pinned by tests/test_formatter.py.
+    """
+    if not text or not isinstance(text, str):
+        return ""
+
+    # format_gemini_response
+    lines: List[str] = []
+    gemini = _GeminiLines(lines.append, lambda: None)
+    for line in text.splitlines():
+        gemini.feed(line)
+    gemini.finish()
+    text = "\n".join(lines)
+
+    # markdown_to_readable_v2
+    if "```" in text:
+        text = _CODE_FENCE.sub(_code_block, text)
+    if "|" in text:
+        text = _TABLE_ROWS.sub(_table, text)
+    if "*" in text:
+        text = _BOLD_STARS.sub(r"\1", text)
+        text = _ITALIC_STAR.sub(r"\1", text)
+    if "_" in text:
+        text = _BOLD_UNDERSCORES.sub(r"\1", text)
+        text = _ITALIC_UNDERSCORE.sub(r"\1", text)
+    if "#" in text:
+        text = _HEADING.sub(_heading_to_title, text)
+    text = _RULE.sub("\n", text)
+    text = _ORDERED.sub(r"\1. ", text)
+    text = _UNORDERED.sub(_convert_bullet, text)
+    if ">" in text:
+        text = _QUOTE.sub("", text)
+
+    wrapper = TextWrapper(width=70)
+    wrapped = [
+        line if line.strip().startswith(_NO_WRAP_PREFIXES) else _fill(wrapper, line)
+        for line in text.split("\n")
+    ]
+    return _BLANK_RUN.sub("\n\n", "\n".join(wrapped)).strip()
@@ -0,0 +1,265 @@
+# backend/app/rag/keyword_index.py
+# Per-user BM25 keyword index — exact terms (acronyms, formula names) that dense search misses
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.config import Config
+
+# Words plus the joiners notes use inside one term: "3NF", "O(n)", "k-means", "f1_score", "tf-idf"
+_TOKEN = re.compile(r"\w+(?:[-_.']\w+)*")
+
+_STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have how i if in into is
+it its me my no not of on or our so than that the their them then there these they this to was we
+were what when where which who why will with would you your explain tell about give please
+""".split())
+
+# Standard Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_SQL_BATCH = 500  # SQLite host-parameter limit is 999 on older builds
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms without stopwords. Joined terms also index their parts ("k-means" → k-means, k, means)."""
+    terms = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        parts = re.split(r"[-_.']", token) if len(token) > 1 and not token.isalnum() else ()
+        for term in (token, *parts):
+            if term and term not in _STOPWORDS and (len(term) > 1 or term.isdigit()):
+                terms.append(term)
+    return terms
+
+
+def _batches(items: Sequence[Any], size: int = _SQL_BATCH) -> Iterable[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class KeywordIndex:
+    """
+    SQLite inverted index: (user, term) → chunk ids with term frequencies, plus per-user
+    chunk count and total length for BM25 length normalisation.
+    - Kept in step with Chroma by IndexSession (added / removed chunk ids) and delete_file
+    - Adds are idempotent per chunk id, so an ingest racing a backfill cannot double-count
+    - Users whose chunks predate the index are backfilled once from Chroma (see rebuild())
+    - Thread-safe (one connection behind a lock, same as the file catalog)
+    """
+
+    def __init__(self, path: str = Config.KEYWORD_INDEX_PATH):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS kw_chunks (
+                    user_id TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    length INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, chunk_id)
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS kw_postings (
+                    user_id TEXT NOT NULL,
+                    term TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, term, chunk_id)
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS kw_postings_chunk ON kw_postings (user_id, chunk_id)")
+            # Per-user totals for BM25; `indexed` = every chunk in Chroma is in here (new user or backfilled)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS kw_users (
+                    user_id TEXT PRIMARY KEY,
+                    chunks INTEGER NOT NULL DEFAULT 0,
+                    total_length INTEGER NOT NULL DEFAULT 0,
+                    indexed INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+        self._indexed: set = set()
+        self.searches = 0
+
+    def add(self, user_id: str, source: str, chunks: Sequence[Tuple[str, str]]) -> int:
+        """Index (chunk_id, text) pairs of one file. Already indexed ids are skipped. Returns the number added."""
+        if not chunks:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                known = self._existing_locked(user_id, [cid for cid, _ in chunks])
+                added = total_length = 0
+                for cid, text in chunks:
+                    if cid in known:
+                        continue
+                    known.add(cid)
+                    counts = Counter(tokenize(text))
+                    length = sum(counts.values())
+                    self._conn.execute(
+                        "INSERT INTO kw_chunks (user_id, chunk_id, source, length) VALUES (?, ?, ?, ?)",
+                        (user_id, cid, source, length)
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO kw_postings (user_id, term, chunk_id, tf) VALUES (?, ?, ?, ?)",
+                        [(user_id, term, cid, tf) for term, tf in counts.items()]
+                    )
+                    added += 1
+                    total_length += length
+                self._bump_locked(user_id, added, total_length)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def remove(self, user_id: str, chunk_ids: Sequence[str]) -> int:
+        """Drop chunks (replaced or deleted). Unknown ids are ignored. Returns the number removed."""
+        if not chunk_ids:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                removed = total_length = 0
+                for batch in _batches(list(chunk_ids)):
+                    marks = ",".join("?" * len(batch))
+                    row = self._conn.execute(
+                        f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM kw_chunks "
+                        f"WHERE user_id = ? AND chunk_id IN ({marks})", (user_id, *batch)
+                    ).fetchone()
+                    removed += row[0]
+                    total_length += row[1]
+                    self._conn.execute(
+                        f"DELETE FROM kw_postings WHERE user_id = ? AND chunk_id IN ({marks})", (user_id, *batch)
+                    )
+                    self._conn.execute(
+                        f"DELETE FROM kw_chunks WHERE user_id = ? AND chunk_id IN ({marks})", (user_id, *batch)
+                    )
+                self._bump_locked(user_id, -removed, -total_length)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def remove_source(self, user_id: str, source: str) -> int:
+        """Drop every chunk of one file."""
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT chunk_id FROM kw_chunks WHERE user_id = ? AND source = ?", (user_id, source)
+            )]
+        return self.remove(user_id, ids)
+
+    def search(self, user_id: str, query: str, limit: int) -> List[Tuple[str, float]]:
+        """Top `limit` (chunk_id, BM25 score) pairs, best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            self.searches += 1
+            user = self._conn.execute(
+                "SELECT chunks, total_length FROM kw_users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if not user or not user[0]:
+                return []
+            n_chunks, total_length = user
+            marks = ",".join("?" * len(terms))
+            rows = self._conn.execute(
+                f"SELECT p.term, p.chunk_id, p.tf, c.length FROM kw_postings p "
+                f"JOIN kw_chunks c ON c.user_id = p.user_id AND c.chunk_id = p.chunk_id "
+                f"WHERE p.user_id = ? AND p.term IN ({marks})", (user_id, *terms)
+            ).fetchall()
+
+        df = Counter(term for term, _, _, _ in rows)
+        avg_length = total_length / n_chunks or 1.0
+        scores: Dict[str, float] = {}
+        for term, cid, tf, length in rows:
+            idf = math.log(1 + (n_chunks - df[term] + 0.5) / (df[term] + 0.5))
+            norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+            scores[cid] = scores.get(cid, 0.0) + idf * norm
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def is_indexed(self, user_id: str) -> bool:
+        if user_id in self._indexed:
+            return True
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT 1 FROM kw_users WHERE user_id = ? AND indexed = 1", (user_id,)
+            ).fetchone() is not None
+        if found:
+            self._indexed.add(user_id)
+        return found
+
+    def mark_indexed(self, user_id: str) -> None:
+        """A user with no chunks yet — everything they upload from now on goes through add()."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO kw_users (user_id, indexed) VALUES (?, 1) "
+                "ON CONFLICT(user_id) DO UPDATE SET indexed = 1", (user_id,)
+            )
+        self._indexed.add(user_id)
+
+    def rebuild(self, user_id: str, chunks: Iterable[Tuple[str, str, str]]) -> int:
+        """One-time backfill from Chroma: (chunk_id, source, text) triples. Returns the number added."""
+        by_source: Dict[str, List[Tuple[str, str]]] = {}
+        for cid, source, text in chunks:
+            by_source.setdefault(source, []).append((cid, text))
+        added = sum(self.add(user_id, source, items) for source, items in by_source.items())
+        self.mark_indexed(user_id)
+        return added
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            users, chunks = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunks), 0) FROM kw_users"
+            ).fetchone()
+        return {"path": self.path, "users": users, "chunks": chunks, "searches": self.searches}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _existing_locked(self, user_id: str, chunk_ids: List[str]) -> set:
+        known = set()
+        for batch in _batches(chunk_ids):
+            marks = ",".join("?" * len(batch))
+            known.update(row[0] for row in self._conn.execute(
+                f"SELECT chunk_id FROM kw_chunks WHERE user_id = ? AND chunk_id IN ({marks})", (user_id, *batch)
+            ))
+        return known
+
+    def _bump_locked(self, user_id: str, chunks: int, total_length: int) -> None:
+        self._conn.execute(
+            "INSERT INTO kw_users (user_id, chunks, total_length) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET chunks = MAX(0, chunks + excluded.chunks), "
+            "total_length = MAX(0, total_length + excluded.total_length)",
+            (user_id, chunks, total_length)
+        )
+
+
+_shared: Optional[KeywordIndex] = None
+_shared_lock = threading.Lock()
+
+
+def get_keyword_index() -> KeywordIndex:
+    """Return the process-wide keyword index (created on first call)."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = KeywordIndex()
+    return _shared
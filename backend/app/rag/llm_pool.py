@@ -0,0 +1,193 @@
+# backend/app/rag/llm_pool.py
+# Process-wide LLM clients — built once, shared by every user, with per-provider admission control
+import asyncio
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.config import Config
+
+
+def build_llm_clients() -> List[Any]:
+    """The provider list, in priority order. Each client keeps its own HTTP/gRPC connections alive."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return [
+        # Gemini 2.5 Flash — Latest stable model
+        ChatGoogleGenerativeAI(
+            model="gemini-2.5-flash",
+            google_api_key=os.getenv("GOOGLE_API_KEY"),
+            temperature=0.3
+        ),
+        # Groq Mixtral - Fast & Efficient (from langchain_groq import ChatGroq)
+        # ChatGroq(
+        #     model="mixtral-8x7b-32768",
+        #     groq_api_key=os.getenv("GROQ_API_KEY"),
+        #     temperature=0.3
+        # ),
+        # OpenRouter - Additional Backup (from langchain_openai import ChatOpenAI)
+        # ChatOpenAI(
+        #     model="mistralai/mistral-7b-instruct",
+        #     openai_api_key=os.getenv("OPENAI_API_KEY"),
+        #     openai_api_base="https://openrouter.ai/api/v1",
+        #     temperature=0.3
+        # )
+        # You can add more models here...
+    ]
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "event", "granted")
+
+    def __init__(self, loop=None, future=None, event=None):
+        self.loop = loop
+        self.future = future
+        self.event = event
+        self.granted = False
+
+
+def _wake(future: "asyncio.Future") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class ProviderSlots:
+    """
+    At most `max_in_flight` concurrent requests to one provider; up to `max_queue` callers wait
+    in FIFO order, anyone beyond that is turned away at once (backpressure, not an ever-growing
+    backlog). Works for event-loop callers (acquire) and plain threads (acquire_blocking):
+    a freed slot is handed straight to the next waiter.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int):
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+
+        self.in_flight = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+        self.queued = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+
+    async def acquire(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a slot. False = queue full or timed out."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = self._enter_locked(lambda: _Waiter(loop=loop, future=loop.create_future()))
+        if waiter is None or waiter is True:
+            return waiter is True
+
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._leave(waiter)
+        except asyncio.CancelledError:
+            if self._leave(waiter):
+                self.release()
+            raise
+
+    def acquire_blocking(self, timeout: float) -> bool:
+        """acquire() for threads outside the event loop."""
+        with self._lock:
+            waiter = self._enter_locked(lambda: _Waiter(event=threading.Event()))
+        if waiter is None or waiter is True:
+            return waiter is True
+
+        if waiter.event.wait(timeout):
+            return True
+        return self._leave(waiter)
+
+    def release(self) -> None:
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True  # the slot changes hands, in_flight stays the same
+                if waiter.event is not None:
+                    waiter.event.set()
+                else:
+                    waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+                return
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued_now": len(self._waiters),
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "queue_timeouts": self.queue_timeouts
+        }
+
+    def _enter_locked(self, make_waiter):
+        """True = slot taken now, None = rejected, otherwise the queued waiter."""
+        if not self._waiters and self.in_flight < self.max_in_flight:
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return None
+        waiter = make_waiter()
+        self._waiters.append(waiter)
+        self.queued += 1
+        return waiter
+
+    def _leave(self, waiter: _Waiter) -> bool:
+        """Give up waiting. True if the slot was handed over in the meantime (caller owns it)."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            self.queue_timeouts += 1
+            return False
+
+
+class LLMPool:
+    """The shared clients plus one ProviderSlots per provider (keyed by model name)."""
+
+    def __init__(self, clients: Optional[List[Any]] = None,
+                 max_in_flight: int = Config.LLM_MAX_IN_FLIGHT,
+                 max_queue: int = Config.LLM_MAX_QUEUE):
+        self.clients = clients if clients is not None else build_llm_clients()
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._slots: Dict[str, ProviderSlots] = {}
+        self._lock = threading.Lock()
+
+    def slots(self, name: str) -> ProviderSlots:
+        slots = self._slots.get(name)
+        if slots is None:
+            with self._lock:
+                slots = self._slots.get(name)
+                if slots is None:
+                    slots = self._slots[name] = ProviderSlots(name, self.max_in_flight, self.max_queue)
+        return slots
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: slots.stats() for name, slots in list(self._slots.items())}
+
+
+_shared: Optional[LLMPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_pool() -> LLMPool:
+    """Return the process-wide LLM pool (clients are built on first call)."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = LLMPool()
+    return _shared
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Slot stats of the shared pool, {} until something built it — never imports the LLM clients."""
+    pool = _shared
+    return pool.stats() if pool is not None else {}
@@ -0,0 +1,487 @@
+# backend/app/rag/llm_router.py
+# Process-wide LLM router — provider health, circuit breakers, deadlines and hedged requests
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence, Tuple
+
+from app.config import Config
+from app.logs import get_logger
+from app.metrics import LLM_CALL_SECONDS
+from app.rag.llm_pool import get_llm_pool, pool_stats
+
+log = get_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Upper bounds (seconds) of the latency histogram exposed per provider
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, float("inf"))
+
+
+class StreamInterrupted(Exception):
+    """A provider failed after it had already streamed text — no fallback is possible."""
+
+
+def provider_name(llm: Any) -> str:
+    return getattr(llm, "model", getattr(llm, "model_name", "Unknown Model"))
+
+
+def response_text(response: Any) -> str:
+    """Text of one invoke() result."""
+    return getattr(response, "content", None) or getattr(response, "text", None) or str(response)
+
+
+def chunk_text(chunk: Any) -> str:
+    """Text of one streamed message chunk (content may be a str or a list of parts)."""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for part in content
+            if isinstance(part, (str, dict))
+        )
+    return ""
+
+
+class ProviderHealth:
+    """
+    Rolling health of one provider (model name) plus its circuit breaker.
+    - closed: calls go through
+    - open: calls are skipped for `cooldown` seconds after too many failures
+    - half_open: after the cooldown, exactly one probe call decides whether to close again
+    """
+
+    def __init__(self, name: str, window: int, failures: int, error_rate: float, cooldown: float):
+        self.name = name
+        self.failures_to_open = failures
+        self.error_rate_to_open = error_rate
+        self.cooldown = cooldown
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.consecutive_failures = 0
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.histogram = [0] * len(LATENCY_BUCKETS)
+
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.times_opened = 0
+
+    def acquire(self, now: float) -> bool:
+        """May a call start now? Claims the probe slot when half-open."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """The call was abandoned (e.g. lost a hedge) — no verdict on the provider."""
+        self.probing = False
+
+    def record_success(self, latency: float) -> None:
+        self.calls += 1
+        self.outcomes.append(True)
+        self.latencies.append(latency)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.histogram[i] += 1
+                break
+        self.consecutive_failures = 0
+        self.probing = False
+        self.state = CLOSED
+
+    def record_failure(self, now: float, timeout: bool = False) -> None:
+        self.calls += 1
+        self.errors += 1
+        if timeout:
+            self.timeouts += 1
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self.probing = False
+
+        too_many = self.consecutive_failures >= self.failures_to_open
+        too_often = len(self.outcomes) >= 10 and self.error_rate >= self.error_rate_to_open
+        if self.state == HALF_OPEN or too_many or too_often:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = now
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+        return ordered[k]
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "error_rate": round(self.error_rate, 3),
+            "p50_s": round(p50, 3) if p50 is not None else None,
+            "p95_s": round(p95, 3) if p95 is not None else None,
+            "times_opened": self.times_opened,
+            "latency_histogram": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS, self.histogram)
+            }
+        }
+
+
+class LLMRouter:
+    """
+    Shared by every user: one ProviderHealth per model name, whichever user's client made the call.
+    - Providers with an open breaker are skipped instead of costing a timeout each request
+    - Every call has a deadline (`call_timeout`); streams must produce their first token within it
+      and finish within `stream_timeout`
+    - Each call first takes a slot from the provider's ProviderSlots (app/rag/llm_pool.py);
+      a full queue or `queue_timeout` moves on to the next provider
+    - With `hedge_after` > 0, a second provider is started when the first has not answered
+      after that many seconds; the first good answer wins and the other call is cancelled
+    - routing="latency" tries providers by expected wait (p95 + error rate × timeout), untried
+      ones first so they get measured; routing="priority" keeps the configured order
+    """
+
+    def __init__(self, call_timeout: float = Config.LLM_CALL_TIMEOUT,
+                 stream_timeout: float = Config.LLM_STREAM_TIMEOUT,
+                 hedge_after: float = Config.LLM_HEDGE_AFTER,
+                 queue_timeout: float = Config.LLM_QUEUE_TIMEOUT,
+                 routing: str = Config.LLM_ROUTING,
+                 window: int = Config.LLM_HEALTH_WINDOW,
+                 breaker_failures: int = Config.LLM_BREAKER_FAILURES,
+                 breaker_error_rate: float = Config.LLM_BREAKER_ERROR_RATE,
+                 breaker_cooldown: float = Config.LLM_BREAKER_COOLDOWN):
+        self.call_timeout = call_timeout
+        self.stream_timeout = stream_timeout
+        self.hedge_after = hedge_after
+        self.queue_timeout = queue_timeout
+        self.routing = routing
+        self._health_args = (window, breaker_failures, breaker_error_rate, breaker_cooldown)
+
+        self._providers: Dict[str, ProviderHealth] = {}
+        self._lock = threading.Lock()
+        # Sync callers only: lets invoke() give up at the deadline (the thread itself runs on)
+        self._sync_pool: Optional[ThreadPoolExecutor] = None
+
+        self.decisions = {
+            "primary": 0,        # answered by the first provider tried
+            "fallback": 0,       # answered by a later provider
+            "hedged": 0,         # a hedge request was started
+            "hedge_won": 0,      # ...and answered first
+            "skipped_open": 0,   # provider skipped because its breaker was open
+            "busy": 0,           # provider skipped because its in-flight limit and queue were full
+            "all_failed": 0
+        }
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def invoke(self, llms: Sequence[Any], prompt: str) -> Optional[str]:
+        """Blocking call with breakers and deadlines (no hedging). None when every provider failed."""
+        for position, llm in enumerate(self.route(llms)):
+            health = self._claim(llm)
+            if health is None:
+                continue
+            slots = get_llm_pool().slots(health.name)
+            if not slots.acquire_blocking(self.queue_timeout):
+                self._busy(health)
+                continue
+            start = time.monotonic()
+            try:
+                log.info("llm call", extra={"provider": health.name, "position": position + 1})
+                future = self._get_sync_pool().submit(llm.invoke, prompt)
+                # The slot is held until the call really ends, even if we stop waiting for it
+                future.add_done_callback(lambda _: slots.release())
+                content = response_text(future.result(timeout=self.call_timeout))
+            except FutureTimeout:
+                log.warning("llm timeout", extra={"provider": health.name, "timeout_s": self.call_timeout})
+                self._failure(health, timeout=True, latency=time.monotonic() - start)
+                continue
+            except Exception as e:
+                log.warning("llm error", extra={"provider": health.name, "error": str(e)})
+                self._failure(health, latency=time.monotonic() - start)
+                continue
+
+            if content:
+                self._success(health, time.monotonic() - start, position)
+                return content
+            self._failure(health, latency=time.monotonic() - start)
+
+        self._decide("all_failed")
+        return None
+
+    async def ainvoke(self, llms: Sequence[Any], prompt: str) -> Optional[str]:
+        """Async call with breakers, deadlines and optional hedging. None when every provider failed."""
+        order = self.route(llms)
+        position = 0
+        while position < len(order):
+            llm = order[position]
+            backup = order[position + 1] if self.hedge_after > 0 and position + 1 < len(order) else None
+            if backup is not None:
+                content, used = await self._ahedged(llm, backup, prompt, position)
+                position += used
+            else:
+                content = await self._aattempt(llm, prompt, position)
+                position += 1
+            if content:
+                return content
+
+        self._decide("all_failed")
+        return None
+
+    async def astream(self, llms: Sequence[Any], prompt: str) -> AsyncIterator[str]:
+        """
+        Stream text deltas. Fallback only happens before the first token; a failure after it
+        raises StreamInterrupted. Yields nothing when every provider failed.
+        """
+        for position, llm in enumerate(self.route(llms)):
+            health = self._claim(llm)
+            if health is None:
+                continue
+
+            slots = get_llm_pool().slots(health.name)
+            admitted = False
+            first_token: Optional[float] = None
+            settled = False
+            stream = None
+            start = time.monotonic()
+            try:
+                admitted = await slots.acquire(self.queue_timeout)
+                if not admitted:
+                    self._busy(health)
+                    settled = True
+                    continue
+
+                log.info("llm stream", extra={"provider": health.name, "position": position + 1})
+                start = time.monotonic()
+                stream = llm.astream(prompt)
+                while True:
+                    if first_token is None:
+                        timeout = self.call_timeout
+                    else:
+                        timeout = max(0.0, start + self.stream_timeout - time.monotonic())
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    text = chunk_text(chunk)
+                    if text:
+                        if first_token is None:
+                            first_token = time.monotonic() - start
+                        yield text
+            except asyncio.TimeoutError as e:
+                settled = True
+                self._failure(health, timeout=True, latency=time.monotonic() - start, call="stream")
+                if first_token is not None:
+                    raise StreamInterrupted(f"{health.name} exceeded {self.stream_timeout}s") from e
+                log.warning("llm timeout", extra={"provider": health.name, "timeout_s": self.call_timeout})
+                continue
+            except Exception as e:
+                settled = True
+                self._failure(health, latency=time.monotonic() - start, call="stream")
+                log.warning("llm stream error", extra={"provider": health.name, "error": str(e)})
+                if first_token is not None:
+                    raise StreamInterrupted(str(e)) from e
+                continue
+            finally:
+                if not settled:
+                    # No verdict yet (finished, or the consumer went away) — free a half-open probe
+                    with self._lock:
+                        health.release()
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    try:
+                        await aclose()
+                    except Exception:
+                        pass
+                if admitted:
+                    slots.release()
+
+            if first_token is not None:
+                # Latency of a stream = time to first token, the part the user waits for
+                self._success(health, first_token, position, call="stream")
+                return
+            self._failure(health, latency=time.monotonic() - start, call="stream")
+
+        self._decide("all_failed")
+
+    def route(self, llms: Sequence[Any]) -> List[Any]:
+        """Order in which providers will be tried (open breakers are filtered later, at call time)."""
+        if self.routing != "latency":
+            return list(llms)
+        with self._lock:
+            def key(item: Tuple[int, Any]) -> Tuple[float, int]:
+                # Expected wait: p95 latency plus a full timeout for every call likely to fail
+                health = self._providers.get(provider_name(item[1]))
+                if health is None or not health.calls:
+                    return (0.0, item[0])
+                p95 = health.percentile(95)
+                latency = p95 if p95 is not None else self.call_timeout
+                return (latency + health.error_rate * self.call_timeout, item[0])
+            return [llm for _, llm in sorted(enumerate(llms), key=key)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "routing": self.routing,
+                "call_timeout_s": self.call_timeout,
+                "hedge_after_s": self.hedge_after,
+                "decisions": dict(self.decisions),
+                "providers": {name: health.stats() for name, health in self._providers.items()},
+                "capacity": pool_stats()
+            }
+
+    # -----------------------------
+    # Internals
+    # -----------------------------
+    async def _aattempt(self, llm: Any, prompt: str, position: int) -> Optional[str]:
+        health = self._claim(llm)
+        if health is None:
+            return None
+
+        slots = get_llm_pool().slots(health.name)
+        admitted = False
+        settled = False
+        start = time.monotonic()
+        try:
+            admitted = await slots.acquire(self.queue_timeout)
+            if not admitted:
+                self._busy(health)
+                settled = True
+                return None
+
+            start = time.monotonic()
+            log.info("llm call", extra={"provider": health.name, "position": position + 1})
+            response = await asyncio.wait_for(llm.ainvoke(prompt), self.call_timeout)
+            content = response_text(response)
+            settled = True
+            if content:
+                self._success(health, time.monotonic() - start, position)
+                return content
+            self._failure(health, latency=time.monotonic() - start)
+        except asyncio.TimeoutError:
+            settled = True
+            log.warning("llm timeout", extra={"provider": health.name, "timeout_s": self.call_timeout})
+            self._failure(health, timeout=True, latency=time.monotonic() - start)
+        except Exception as e:
+            settled = True
+            log.warning("llm error", extra={"provider": health.name, "error": str(e)})
+            self._failure(health, latency=time.monotonic() - start)
+        finally:
+            if not settled:  # cancelled — lost a hedge, or the request went away
+                with self._lock:
+                    health.release()
+            if admitted:
+                slots.release()
+        return None
+
+    async def _ahedged(self, llm: Any, backup: Any, prompt: str, position: int) -> Tuple[Optional[str], int]:
+        """Run `llm`, hedging with `backup` after hedge_after seconds. Returns (content, providers used)."""
+        first = asyncio.ensure_future(self._aattempt(llm, prompt, position))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+        if done:
+            content = first.result()
+            if content:
+                return content, 1
+            # Failed fast — the backup is a plain fallback, not a hedge
+            return await self._aattempt(backup, prompt, position + 1), 2
+
+        self._decide("hedged")
+        second = asyncio.ensure_future(self._aattempt(backup, prompt, position + 1))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    content = task.result()
+                    if content:
+                        if task is second:
+                            self._decide("hedge_won")
+                        return content, 2
+            return None, 2
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _claim(self, llm: Any) -> Optional[ProviderHealth]:
+        name = provider_name(llm)
+        with self._lock:
+            health = self._providers.get(name)
+            if health is None:
+                health = self._providers[name] = ProviderHealth(name, *self._health_args)
+            if health.acquire(time.monotonic()):
+                return health
+            self.decisions["skipped_open"] += 1
+        log.info("llm skipped, circuit open", extra={"provider": name})
+        return None
+
+    def _busy(self, health: ProviderHealth) -> None:
+        """No slot within queue_timeout — backpressure, not a provider failure."""
+        log.warning("llm at capacity, trying the next provider", extra={"provider": health.name})
+        with self._lock:
+            health.release()
+            self.decisions["busy"] += 1
+
+    def _success(self, health: ProviderHealth, latency: float, position: int, call: str = "invoke") -> None:
+        """`latency` is the whole call, or the time to first token for a stream (call="stream")."""
+        LLM_CALL_SECONDS.observe(latency, provider=health.name, outcome="ok", call=call)
+        log.info("llm ok", extra={"provider": health.name, "call": call, "latency_ms": round(latency * 1000, 1)})
+        with self._lock:
+            health.record_success(latency)
+            self.decisions["primary" if position == 0 else "fallback"] += 1
+
+    def _failure(self, health: ProviderHealth, timeout: bool = False, latency: Optional[float] = None,
+                 call: str = "invoke") -> None:
+        if latency is not None:
+            LLM_CALL_SECONDS.observe(latency, provider=health.name, outcome="timeout" if timeout else "error", call=call)
+        with self._lock:
+            health.record_failure(time.monotonic(), timeout)
+
+    def _decide(self, decision: str) -> None:
+        with self._lock:
+            self.decisions[decision] += 1
+
+    def _get_sync_pool(self) -> ThreadPoolExecutor:
+        if self._sync_pool is None:
+            with self._lock:
+                if self._sync_pool is None:
+                    self._sync_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ff-llm")
+        return self._sync_pool
+
+
+_shared: Optional[LLMRouter] = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_router() -> LLMRouter:
+    """Return the process-wide LLM router (created on first call)."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = LLMRouter()
+    return _shared
@@ -0,0 +1,113 @@
+# backend/app/rag/loaders.py
+# File parsing — kept free of Chroma / LLM imports so it is cheap to run in worker processes;
+# langchain and pypdf are imported on first parse, not at API start
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, List, Tuple
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+# PDFs kept open per worker process (a reader holds the file's bytes plus the objects parsed so far)
+_OPEN_PDFS_MAX = 2
+
+
+def is_pdf(file_path: str) -> bool:
+    return file_path.lower().endswith(".pdf")
+
+
+def load_documents(file_path: str) -> List["Document"]:
+    """Parse a PDF (one Document per page) or a text/markdown file."""
+    from langchain_community.document_loaders import PyPDFLoader, TextLoader
+
+    loader = PyPDFLoader(file_path) if is_pdf(file_path) else TextLoader(file_path, encoding="utf-8")
+    return loader.load()
+
+
+def text_document(text: str, filename: str) -> "Document":
+    """The Document TextLoader would produce for a text/markdown upload received in memory."""
+    from langchain_core.documents import Document
+
+    return Document(page_content=text, metadata={"source": filename})
+
+
+class _OpenPdf:
+    __slots__ = ("reader", "total", "labels", "lock")
+
+    def __init__(self, reader: Any):
+        self.reader = reader
+        self.total = len(reader.pages)
+        self.labels = reader.page_labels
+        self.lock = threading.Lock()  # PdfReader is not thread-safe (EXECUTOR_CPU_WORKERS=0)
+
+
+_open_pdfs: "OrderedDict[Tuple[str, int, int], _OpenPdf]" = OrderedDict()
+_open_pdfs_lock = threading.Lock()
+
+
+def _open_pdf(file_path: str) -> _OpenPdf:
+    """
+    The file's reader and page labels, shared by every page batch this process parses.
+    Re-opening per batch walked the page tree and computed every label again: O(pages²) per PDF.
+    Keyed by size + mtime, so a re-upload to the same path is read afresh.
+    """
+    st = os.stat(file_path)
+    key = (os.path.abspath(file_path), st.st_size, st.st_mtime_ns)
+    with _open_pdfs_lock:
+        pdf = _open_pdfs.get(key)
+        if pdf is not None:
+            _open_pdfs.move_to_end(key)
+            return pdf
+
+    from pypdf import PdfReader
+
+    opened = _OpenPdf(PdfReader(file_path))
+    with _open_pdfs_lock:
+        pdf = _open_pdfs.setdefault(key, opened)
+        _open_pdfs.move_to_end(key)
+        while len(_open_pdfs) > _OPEN_PDFS_MAX:
+            _open_pdfs.popitem(last=False)
+    return pdf
+
+
+def pdf_page_count(file_path: str) -> int:
+    return _open_pdf(file_path).total
+
+
+def page_ranges(total: int, size: int) -> List[Tuple[int, int]]:
+    """[(0, size), (size, 2*size), ...] covering `total` pages."""
+    size = max(1, size)
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def load_pdf_pages(file_path: str, start: int, stop: int) -> List["Document"]:
+    """
+    Parse pages [start, stop) only — the unit of work for parallel, streaming ingestion.
+    Text and page metadata match PyPDFLoader's default page mode.
+    """
+    from langchain_core.documents import Document
+
+    pdf = _open_pdf(file_path)
+    docs = []
+    with pdf.lock:
+        for number in range(start, min(stop, pdf.total)):
+            docs.append(Document(
+                page_content=pdf.reader.pages[number].extract_text().strip(),
+                metadata={
+                    "source": file_path,
+                    "total_pages": pdf.total,
+                    "page": number,
+                    "page_label": pdf.labels[number]
+                }
+            ))
+    if stop >= pdf.total:
+        _close_pdf(file_path)  # last batch: don't hold the parsed document until LRU eviction
+    return docs
+
+
+def _close_pdf(file_path: str) -> None:
+    path = os.path.abspath(file_path)
+    with _open_pdfs_lock:
+        for key in [key for key in _open_pdfs if key[0] == path]:
+            del _open_pdfs[key]
@@ -0,0 +1,115 @@
+# backend/app/rag/onnx_encoder.py
+# Torch-free sentence embeddings — ONNX Runtime (fp32 or int8-quantized) with the same pooling as sentence-transformers
+import os
+import threading
+from typing import Any, List, Optional
+
+import numpy as np
+
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+# Same limit as all-MiniLM-L6-v2's max_seq_length in sentence-transformers
+MAX_TOKENS = 256
+CHROMA_MINILM = "all-MiniLM-L6-v2"
+INT8_FILE = "model_int8.onnx"
+
+
+def default_model_dir(model_name: str) -> str:
+    """
+    Directory holding model.onnx + tokenizer.json. For all-MiniLM-L6-v2 this is the export
+    Chroma already downloads for its default embedding function (no extra dependency).
+    """
+    if model_name.split("/")[-1] != CHROMA_MINILM:
+        raise ValueError(
+            f"No bundled ONNX export for '{model_name}' — export it (model.onnx + tokenizer.json) "
+            "and set EMBEDDING_ONNX_DIR"
+        )
+    from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+    ef = ONNXMiniLM_L6_V2()
+    ef._download_model_if_not_exists()
+    return os.path.join(str(ef.DOWNLOAD_PATH), ef.EXTRACTED_FOLDER_NAME)
+
+
+def quantized_model(model_dir: str) -> str:
+    """
+    int8 weights (dynamic quantization) next to model.onnx, created once and reused.
+    Quantizing needs the `onnx` package (not a dependency of onnxruntime itself) — without it
+    this returns the fp32 model.onnx so the backend still starts.
+    """
+    target = os.path.join(model_dir, INT8_FILE)
+    if os.path.exists(target):
+        return target
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as e:
+        log.warning("int8 quantization unavailable, using fp32 ONNX model", extra={
+            "model_dir": model_dir, "error": str(e), "hint": "pip install onnx"
+        })
+        return os.path.join(model_dir, "model.onnx")
+
+    tmp = f"{target}.{os.getpid()}.tmp"
+    quantize_dynamic(os.path.join(model_dir, "model.onnx"), tmp, weight_type=QuantType.QInt8)
+    os.replace(tmp, target)  # atomic: concurrent workers never load a half-written file
+    return target
+
+
+class OnnxEncoder:
+    """
+    Drop-in for SentenceTransformer.encode(): tokenizes with the model's tokenizer.json, runs the
+    ONNX graph, mean-pools over the attention mask and L2-normalizes (MiniLM's Pooling + Normalize),
+    so vectors match the torch model within float tolerance (int8: cosine ≳ 0.99).
+    Batches are sorted by length so padding stays short.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_path = quantized_model(model_dir) if quantized else os.path.join(model_dir, "model.onnx")
+        self.quantized = self.model_path.endswith(INT8_FILE)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_TOKENS)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        self._lock = threading.Lock()  # the Rust tokenizer's padding state is not re-entrant
+
+    @property
+    def model_mb(self) -> float:
+        return round(os.path.getsize(self.model_path) / (1024 * 1024), 1)
+
+    def encode(self, texts: List[str], batch_size: int = 64, convert_to_numpy: bool = True,
+               show_progress_bar: Optional[bool] = None, **_: Any) -> np.ndarray:
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(order), max(1, batch_size)):
+            batch = order[start:start + batch_size]
+            vectors = self._forward([texts[i] for i in batch])
+            if out.shape[1] == 0:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[batch] = vectors
+        return out
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        with self._lock:
+            encoded = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        feed = {"input_ids": input_ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feed["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feed)[0]
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
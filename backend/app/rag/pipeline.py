@@ -1,455 +1,733 @@
 # backend/app/rag/pipeline.py
 # FINAL VERSION — Nov 18, 2025 | Duplicate Replace + IST Time + File History
+# Imports stay light: Chroma, langchain and the LLM SDKs load on first use (see app/startup.py)
 import os
-import chromadb
-from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from datetime import datetime
-import pytz
-from typing import List, Dict, Any
-import requests
-import re
-from time import sleep
-from random import uniform
-
-# Indian Standard Time
-IST = pytz.timezone('Asia/Kolkata')
-
-class FocusForgeRAG:
-    def __init__(self, user_id: str = "demo"):
-        self.user_id = user_id
-        self.db_path = f"./chroma_db/{user_id}"
-        # Use persistent path in production, local fallback in dev
-        # self.db_path = os.getenv("CHROMA_DB_PATH", f"./chroma_db/{user_id}")
-        os.makedirs(self.db_path, exist_ok=True)
-
-        # Chroma Collection
-        self.client = chromadb.PersistentClient(path=self.db_path)
-        self.collection = self.client.get_or_create_collection(
-            name="notes",
-            embedding_function=SentenceTransformerEmbeddingFunction(
-                model_name="all-MiniLM-L6-v2"
-            ),
-            metadata={"hnsw:space": "cosine"}
-        )
-
-        # Gemini 2.5 Flash — Latest stable model
-        # self.llm = ChatGoogleGenerativeAI(
-        #     model="gemini-2.5-flash",
-        #     temperature=0.3,
-        #     google_api_key=os.getenv("GOOGLE_API_KEY"),
-        #     convert_system_prompt_to_human=True
-        # )
-        self.llms = [
-            ChatGoogleGenerativeAI(
-                model="gemini-2.5-flash",
-                google_api_key=os.getenv("GOOGLE_API_KEY"),
-                temperature=0.3
-            ),
-            # Groq Mixtral - Fast & Efficient
-            # ChatGroq(
-            #     model="mixtral-8x7b-32768",
-            #     groq_api_key=os.getenv("GROQ_API_KEY"),
-            #     temperature=0.3
-            # ),
-            # OpenRouter - Additional Backup (example: Mistral or GPT-4)
-            # ChatOpenAI(
-            #     model="mistralai/mistral-7b-instruct",
-            #     openai_api_key=os.getenv("OPENAI_API_KEY"),        # ← ADD THIS
-            #     openai_api_base="https://openrouter.ai/api/v1",    # ← ADD THIS
-            #     temperature=0.3
-            # )
-            # You can add more models here...
-        ]
-
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=800,
-            chunk_overlap=100,
-            separators=["\n\n", "\n", " ", ""]
-        )
-    def run_llm(self, prompt: str) -> str:
-        """Execute prompt using available LLMs with fallback."""
-        for idx, llm in enumerate(self.llms):
-            # Get the model name safely
-            model_name = getattr(llm, "model", getattr(llm, "model_name", "Unknown Model"))
-
-            try:
-                print(f"🟢 Trying model {idx + 1}: {model_name}")
-
-                response = llm.invoke(prompt)
-
-                # Handle content safely
-                content = getattr(response, "content", None) or getattr(response, "text", None) or str(response)
-
-                if content:
-                    print(f"✔ Success with: {model_name}")
-                    return content
-
-            except Exception as e:
-                print(f"⚠ Model {model_name} failed with error: {e}")
-
-                continue  # Try next model
-
-        return "❌ All models failed. Please try again later."
-
-    def add_or_replace_file(self, file_path: str, original_filename: str) -> Dict[str, Any]:
-        """Add new file or REPLACE existing one with same name"""
-        source_name = original_filename
-        upload_time_ist = datetime.now(IST).strftime("%d %b %Y, %I:%M %p")
-
-        existing = self.collection.get(
-            where={"source": source_name},
-            include=["metadatas"]  # Only need metadatas to get IDs
-        )
-
-        old_ids = existing["ids"] if existing["ids"] else []
-        if old_ids:
-            self.collection.delete(ids=old_ids)
-            print(f"Replaced old version of '{source_name}' ({len(old_ids)} chunks removed)")
-
-        # Load & process new file
-        loader = PyPDFLoader(file_path) if file_path.lower().endswith(".pdf") else TextLoader(file_path, encoding="utf-8")
-        docs = loader.load()
-
+import asyncio
+import hashlib
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, List, Dict, Any, AsyncIterator, Callable, Deque, Iterator, Optional, Set, Tuple
+from app.rag.embeddings import get_embedding_function
+from app.rag.store import close_client, open_store
+from app.rag.answer_cache import get_answer_cache
+from app.rag.keyword_index import get_keyword_index
+from app.rag.retrieval import get_retrieval_stats, rrf_fuse
+from app.rag.rerank import get_reranker
+from app.rag.relevance import NOT_IN_NOTES, STRICT_CONTEXT_MODES, best_distance, check as relevance_check
+from app.rag.context import build_context, estimate_tokens, get_context_stats, token_budget
+from app.rag.catalog import file_fingerprint, get_file_catalog, now_uploaded_at, parse_uploaded_at
+from app.rag.loaders import is_pdf, load_documents, load_pdf_pages, page_ranges, pdf_page_count, text_document
+from app.rag.formatter import StreamingFormatter, format_answer
+from app.rag.llm_pool import get_llm_pool
+from app.rag.llm_router import StreamInterrupted, get_llm_router
+from app.executor import run_in_cpu, run_in_io
+from app.logs import get_logger
+from app.metrics import observe_stage, stage, timed
+from app import profiling
+from app.config import Config
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Progress callback for long ingests: receives partial counters, e.g. {"chunks_embedded": 512}
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+ALL_MODELS_FAILED = "❌ All models failed. Please try again later."
+ANSWER_INTERRUPTED = "\n\n⚠ Answer interrupted. Please try again."
+
+log = get_logger(__name__)
+
+
+def chunk_id(user_id: str, source: str, text: str) -> str:
+    """
+    Content-addressed chunk id: the same text in the same file always gets the same id,
+    so an edit only changes the ids of the chunks it touched.
+    Repeats of an identical chunk inside one file get a "-<n>" suffix (see IndexSession).
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+    return f"{user_id}_{source}_{digest}"
+
+
+_splitter: Optional["RecursiveCharacterTextSplitter"] = None
+_splitter_lock = threading.Lock()
+
+
+def get_splitter() -> "RecursiveCharacterTextSplitter":
+    """The chunker — stateless, so one instance serves every user (langchain is imported on first use)."""
+    global _splitter
+    if _splitter is None:
+        with _splitter_lock:
+            if _splitter is None:
+                from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+                _splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=800,
+                    chunk_overlap=100,
+                    separators=["\n\n", "\n", " ", ""]
+                )
+    return _splitter
+
+
+class IndexSession:
+    """
+    One file's (re-)index, fed page batch by page batch.
+    Chunk ids are content-addressed, so a re-upload is a diff:
+    - new chunks are embedded and added
+    - unchanged chunks are kept (only their metadata is refreshed, no re-embedding)
+    - chunks that disappeared are deleted in finish()
+    Chunks are flushed to Chroma every INGEST_BATCH_SIZE, so memory does not grow with the file.
+    With auto_flush=False the caller flushes instead (bulk upload batches chunks across files).
+    """
+
+    def __init__(self, rag: "FocusForgeRAG", source_name: str,
+                 progress: Optional[ProgressCallback] = None,
+                 size_bytes: int = 0, content_hash: str = "",
+                 old_ids: Optional[Set[str]] = None, auto_flush: bool = True):
+        self.rag = rag
+        self.source_name = source_name
+        self.progress = progress
+        self.size_bytes = size_bytes
+        self.content_hash = content_hash
+        self.auto_flush = auto_flush
+        self.upload_time_ist, self.upload_ts = now_uploaded_at()
+
+        if old_ids is None:
+            existing = rag.collection.get(
+                where={"source": source_name},
+                include=[]  # ids only
+            )
+            old_ids = set(existing["ids"] or [])
+        self.old_ids = old_ids
+        keywords = get_keyword_index()
+        if not keywords.is_indexed(rag.user_id) and rag.collection.count() == 0:
+            keywords.mark_indexed(rag.user_id)  # nothing to backfill for a brand-new user
+        self.new_ids: Set[str] = set()
+        self.occurrences: Dict[str, int] = {}
+
+        self.pending: List[Tuple[str, "Document"]] = []
+        self.chunks = 0
+        self.added = 0
+        self.kept = 0
+
+    def add(self, docs: List["Document"]) -> None:
         for doc in docs:
             doc.metadata.update({
-                "source": source_name,
-                "uploaded_at": upload_time_ist,
-                "user_id": self.user_id
+                "source": self.source_name,
+                "uploaded_at": self.upload_time_ist,
+                "user_id": self.rag.user_id
             })
 
-        chunks = self.splitter.split_documents(docs)
-        self.collection.add(
-            documents=[chunk.page_content for chunk in chunks],
-            metadatas=[chunk.metadata for chunk in chunks],
-            ids=[f"{self.user_id}_{source_name}_{i}" for i in range(len(chunks))]
+        with stage("split"):
+            chunks = self.rag.splitter.split_documents(docs)
+        for chunk in chunks:
+            base = chunk_id(self.rag.user_id, self.source_name, chunk.page_content)
+            occurrence = self.occurrences.get(base, 0)
+            self.occurrences[base] = occurrence + 1
+            cid = f"{base}-{occurrence}" if occurrence else base
+
+            self.new_ids.add(cid)
+            self.pending.append((cid, chunk))
+            self.chunks += 1
+            if self.auto_flush and len(self.pending) >= Config.INGEST_BATCH_SIZE:
+                self._flush()
+
+    def finish(self) -> Dict[str, Any]:
+        self._flush()
+
+        # Removed last, so the file is never missing from search mid-update
+        removed = [cid for cid in self.old_ids if cid not in self.new_ids]
+        with stage("chroma_write"):
+            for start in range(0, len(removed), Config.INGEST_BATCH_SIZE):
+                self.rag.collection.delete(ids=removed[start:start + Config.INGEST_BATCH_SIZE])
+        get_keyword_index().remove(self.rag.user_id, removed)
+        get_answer_cache().invalidate_user(self.rag.user_id)
+        get_file_catalog().upsert(
+            self.rag.user_id, self.source_name, self.upload_time_ist, self.upload_ts,
+            self.chunks, self.size_bytes, self.content_hash
         )
 
-        print(f"Indexed {len(chunks)} chunks → {source_name} at {upload_time_ist}")
+        source_name = self.source_name
+        log.info("indexed", extra={
+            "user_id": self.rag.user_id, "source": source_name, "chunks": self.chunks,
+            "added": self.added, "kept": self.kept, "removed": len(removed), "replaced": bool(self.old_ids)
+        })
         return {
             "message": f"Updated: {source_name}",
             "filename": source_name,
-            "uploaded_at": upload_time_ist,
-            "chunks": len(chunks),
-            "action": "replaced" if old_ids else "added"
+            "uploaded_at": self.upload_time_ist,
+            "chunks": self.chunks,
+            "added": self.added,
+            "kept": self.kept,
+            "removed": len(removed),
+            "action": "replaced" if self.old_ids else "added"
         }
 
-    def get_file_history(self) -> List[Dict[str, str]]:
-        """Get unique list of uploaded files with latest upload time"""
-        results = self.collection.get(include=["metadatas"])
-        if not results["metadatas"]:
-            return []
-
-        file_map = {}
-        for meta in results["metadatas"]:
-            filename = meta.get("source")
-            uploaded_at = meta.get("uploaded_at", "Unknown")
-            if filename and (filename not in file_map or uploaded_at > file_map[filename]["uploaded_at"]):
-                file_map[filename] = {
-                    "filename": filename,
-                    "uploaded_at": uploaded_at
-                }
+    def take_pending(self) -> Tuple[List[Tuple[str, "Document"]], List[Tuple[str, "Document"]]]:
+        """Buffered chunks split into (unchanged, new); the buffer is cleared."""
+        kept = [(cid, chunk) for cid, chunk in self.pending if cid in self.old_ids]
+        to_add = [(cid, chunk) for cid, chunk in self.pending if cid not in self.old_ids]
+        self.pending = []
+        return kept, to_add
 
-        return sorted(file_map.values(), key=lambda x: x["uploaded_at"], reverse=True)
-    
+    def _flush(self) -> None:
+        if self.pending:
+            write_chunks(self.rag, [self])
 
-    import re
-
-    def format_gemini_response(self, text: str) -> str:
+    def rollback(self) -> None:
         """
-        UNIVERSAL MARKDOWN FORMATTER (Upgraded)
-        - Supports Headings (#, ##, ###)
-        - Converts lines ending with ":" into headings (##)
-        - Cleans bullets, numbers, spacing
-        - Preserves code blocks
-        - Converts — and --- to horizontal rules
-        - Supports bold (**text**)
-        - Mobile-friendly output
+        Undo a failed index: delete the chunks this session added (earlier flushes may have
+        landed), so the file is left with its old chunks only, not a mix of old and new.
+        Unchanged chunks stay — they belong to the old version too. Best effort: a failure here
+        is logged, never raised, so the caller's original error is the one reported.
         """
+        added = [cid for cid in self.new_ids if cid not in self.old_ids]
+        self.pending = []
+        try:
+            with stage("chroma_write"):
+                for start in range(0, len(added), Config.INGEST_BATCH_SIZE):
+                    self.rag.collection.delete(ids=added[start:start + Config.INGEST_BATCH_SIZE])
+            get_keyword_index().remove(self.rag.user_id, added)
+            get_answer_cache().invalidate_user(self.rag.user_id)
+        except Exception as e:
+            log.error("rollback failed", extra={
+                "user_id": self.rag.user_id, "source": self.source_name, "error": str(e)
+            })
 
-        import re
-
-        if not text or not isinstance(text, str):
-            return text or ""
-
-        lines = text.splitlines()
-        result = []
-        in_code_block = False
-
-        for line in lines:
-            stripped = line.strip()
-
-            # Handle blank lines
-            if not stripped and not in_code_block:
-                result.append("")
-                continue
 
-            # Preserve code blocks
-            if stripped.startswith("```"):
-                in_code_block = not in_code_block
-                result.append(line)
-                continue
-            if in_code_block:
-                result.append(line)
-                continue
+def write_chunks(rag: "FocusForgeRAG", sessions: List[IndexSession]) -> None:
+    """
+    Write the buffered chunks of one or more files: one metadata update for unchanged chunks and
+    one add (= one embedding pass) for new ones, however many files they came from.
+    """
+    batches = [(session, *session.take_pending()) for session in sessions]
+    kept = [item for _, items, _ in batches for item in items]
+    to_add = [item for _, _, items in batches for item in items]
+
+    # Unchanged chunks: refresh upload time / page numbers, vectors stay as they are
+    if kept:
+        with stage("chroma_write"):
+            rag.collection.update(
+                ids=[cid for cid, _ in kept],
+                metadatas=[chunk.metadata for _, chunk in kept]
+            )
+    if to_add:
+        documents = [chunk.page_content for _, chunk in to_add]
+        # Embedded here rather than inside collection.add, so the two stages are timed apart
+        with stage("embed"):
+            embeddings = get_embedding_function()(documents)
+        with stage("chroma_write"):
+            rag.collection.add(
+                documents=documents,
+                embeddings=embeddings,
+                metadatas=[chunk.metadata for _, chunk in to_add],
+                ids=[cid for cid, _ in to_add]
+            )
 
-            # -------------------------------------------
-            # 0. Normalize Horizontal Rules
-            # -------------------------------------------
-            if re.match(r'^[-]{3,}$', stripped):
-                result.append("---")
-                continue
+    keywords = get_keyword_index()
+    for session, session_kept, session_added in batches:
+        if session_added:
+            keywords.add(
+                rag.user_id, session.source_name, [(cid, chunk.page_content) for cid, chunk in session_added]
+            )
+        session.kept += len(session_kept)
+        session.added += len(session_added)
+        if session.progress:
+            session.progress({"chunks_total": session.chunks, "chunks_embedded": session.kept + session.added})
 
-            # -------------------------------------------
-            # 1. True Markdown Headings (#, ##, ###)
-            # -------------------------------------------
-            if re.match(r'^\s*#{1,3}\s+', stripped):
-                result.append(stripped)
-                continue
 
-            # -------------------------------------------
-            # 2. Convert lines ending with ":" → H2 heading
-            # Example: "Key Components:" → "## Key Components"
-            # -------------------------------------------
-            if stripped.endswith(":") and len(stripped) < 80:
-                heading = stripped[:-1].strip()
-                result.append(f"## {heading}")
-                continue
+class FocusForgeRAG:
+    def __init__(self, user_id: str = "demo"):
+        self.user_id = user_id
+        # Chroma Collection
+        self.client = None
+        self.collection = None
+        self.open()
+
+    @property
+    def llms(self) -> List[Any]:
+        """Shared, process-wide clients (app/rag/llm_pool.py) — built on the first LLM call, not per user."""
+        return get_llm_pool().clients
+
+    @property
+    def splitter(self) -> "RecursiveCharacterTextSplitter":
+        return get_splitter()
+
+    @property
+    def is_open(self) -> bool:
+        return self.collection is not None
+
+    def open(self) -> None:
+        """Open (or re-open) the Chroma store. Cheap: the embedding model is shared process-wide,
+        and in CHROMA_STORAGE=shared mode so is the client (only the tenant's collection is opened)."""
+        if self.is_open:
+            return
+        self.client, self.collection = open_store(self.user_id)
+
+    def close(self) -> None:
+        """Release the Chroma client (SQLite handles + HNSW index). Safe to call twice."""
+        if self.client is None:
+            return
+        try:
+            close_client(self.client)
+        except Exception as e:
+            log.warning("closing chroma failed", extra={"user_id": self.user_id, "error": str(e)})
+        finally:
+            self.client = None
+            self.collection = None
 
-            # -------------------------------------------
-            # 3. Question Number Headings → **Chemical Bonding**
-            # -------------------------------------------
-            if re.match(r'^\s*\d+[\.\)]\s', stripped):
-                clean = re.sub(r'^[\s\d\.\)]+\s*', '', stripped)
-                result.append(f"**{clean}**")
-                continue
+    def run_llm(self, prompt: str) -> str:
+        """Execute prompt using available LLMs with fallback (routed, see app/rag/llm_router.py)."""
+        with stage("llm"):
+            return get_llm_router().invoke(self.llms, prompt) or ALL_MODELS_FAILED
+
+    async def arun_llm(self, prompt: str) -> str:
+        """Async twin of run_llm — awaits ainvoke so the event loop stays free (and may hedge)."""
+        with stage("llm"):
+            return await get_llm_router().ainvoke(self.llms, prompt) or ALL_MODELS_FAILED
+
+    async def astream_llm(self, prompt: str) -> AsyncIterator[str]:
+        """Stream raw text deltas (astream) with the same model fallback as run_llm.
+        Fallback only happens before the first token — a half-written answer is never spliced."""
+        started = False
+        try:
+            async for text in get_llm_router().astream(self.llms, prompt):
+                started = True
+                yield text
+        except StreamInterrupted:
+            yield ANSWER_INTERRUPTED
+            return
+
+        if not started:
+            yield ALL_MODELS_FAILED
+
+    def add_or_replace_file(self, file_path: str, original_filename: str,
+                            progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        Add new file or REPLACE existing one with same name (page batches, in-process).
+        On any failure the chunks already flushed are rolled back, so the old version stays whole.
+        """
+        session = IndexSession(self, original_filename, progress, *file_fingerprint(file_path))
 
-            # -------------------------------------------
-            # 4. Explicit question lines
-            # -------------------------------------------
-            if any(kw in stripped.lower() for kw in ["question:", "q:", "que."]):
-                cleaned = re.sub(r'.*?(question|q)[:\s]+', '', stripped, flags=re.I).strip()
-                if cleaned:
-                    result.append(f"**{cleaned}**")
+        try:
+            if is_pdf(file_path):
+                with stage("pdf_parse"):
+                    total = pdf_page_count(file_path)
+                if progress:
+                    progress({"pages_total": total, "pages_parsed": 0})
+                for start, stop in page_ranges(total, Config.INGEST_PAGES_PER_TASK):
+                    with stage("pdf_parse"):
+                        docs = load_pdf_pages(file_path, start, stop)
+                    session.add(docs)
+                    if progress:
+                        progress({"pages_parsed": stop})
+            else:
+                with stage("text_parse"):
+                    docs = load_documents(file_path)
+                if progress:
+                    progress({"pages_total": len(docs), "pages_parsed": len(docs)})
+                session.add(docs)
+
+            return session.finish()
+        except BaseException:
+            session.rollback()
+            raise
+
+    async def aadd_or_replace_file(self, file_path: str, original_filename: str,
+                                   progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        Streaming ingest: PDF page batches are parsed in parallel on the CPU pool while
+        earlier batches are split, embedded and written on the I/O pool.
+        At most INGEST_PAGES_IN_FLIGHT batches are parsed ahead, so memory stays flat.
+        On any failure (or cancellation) the chunks already flushed are rolled back.
+        """
+        size_bytes, content_hash = await run_in_io(file_fingerprint, file_path)
+        session = await run_in_io(IndexSession, self, original_filename, progress, size_bytes, content_hash)
+        try:
+            return await self._aindex_file(session, file_path, progress)
+        except BaseException:
+            # Shielded: a second cancel must not leave the rollback half done
+            await asyncio.shield(run_in_io(session.rollback))
+            raise
+
+    async def _aindex_file(self, session: IndexSession, file_path: str,
+                           progress: Optional[ProgressCallback]) -> Dict[str, Any]:
+        if not is_pdf(file_path):
+            docs, seconds = await run_in_cpu(timed, load_documents, file_path)
+            observe_stage("text_parse", seconds)
+            if progress:
+                progress({"pages_total": len(docs), "pages_parsed": len(docs)})
+            await run_in_io(session.add, docs)
+            return await run_in_io(session.finish)
+
+        total, seconds = await run_in_cpu(timed, pdf_page_count, file_path)
+        observe_stage("pdf_parse", seconds)
+        if progress:
+            progress({"pages_total": total, "pages_parsed": 0})
+
+        ranges = deque(page_ranges(total, Config.INGEST_PAGES_PER_TASK))
+        in_flight: Deque[Tuple[int, asyncio.Future]] = deque()
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) < Config.INGEST_PAGES_IN_FLIGHT:
+                    start, stop = ranges.popleft()
+                    in_flight.append((stop, asyncio.ensure_future(
+                        run_in_cpu(timed, load_pdf_pages, file_path, start, stop)
+                    )))
+                # Consume in page order so chunk order matches the document
+                stop, future = in_flight.popleft()
+                docs, seconds = await future
+                observe_stage("pdf_parse", seconds)
+                if progress:
+                    progress({"pages_parsed": stop})
+                await run_in_io(session.add, docs)
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+
+        return await run_in_io(session.finish)
+
+    def add_or_replace_text(self, text: str, original_filename: str, size_bytes: int = 0,
+                            content_hash: str = "") -> Dict[str, Any]:
+        """Small text/markdown upload received in memory — straight to the splitter, no temp file."""
+        session = IndexSession(self, original_filename, None, size_bytes, content_hash)
+        session.add([text_document(text, original_filename)])
+        return session.finish()
+
+    async def aadd_or_replace_text(self, text: str, original_filename: str, size_bytes: int = 0,
+                                   content_hash: str = "") -> Dict[str, Any]:
+        return await run_in_io(self.add_or_replace_text, text, original_filename, size_bytes, content_hash)
+
+    async def aadd_or_replace_files(self, files: List[Tuple[str, str]],
+                                    progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        Bulk ingest of (file_path, original_filename) pairs. Files are parsed in parallel on the
+        CPU pool; their chunks are embedded and written in shared INGEST_BATCH_SIZE batches across
+        files (write_chunks), so 50 small notes cost a few embedding calls and Chroma writes, not 50.
+        A file that fails to parse or write gets an error result; the other files still go in.
+        """
+        names = [name for _, name in files]
+        old_ids = await run_in_io(self.ids_by_source, names)
+        results: Dict[str, Dict[str, Any]] = {}
+        open_sessions: List[IndexSession] = []
+        counters = {"files_total": len(files), "files_done": 0, "pages_parsed": 0, "chunks_total": 0}
+
+        def report(sessions: List[IndexSession]) -> None:
+            if progress:
+                progress({**counters, "chunks_embedded": sum(s.kept + s.added for s in sessions)})
+
+        async def flush() -> None:
+            """
+            Write every buffered chunk; if the shared write fails, every file in it fails and
+            is rolled back to its old chunks (its earlier flushes may already be in Chroma).
+            """
+            batch = [session for session in open_sessions if session.pending]
+            if not batch:
+                return
+            try:
+                await run_in_io(write_chunks, self, batch)
+            except Exception as e:
+                for session in batch:
+                    open_sessions.remove(session)
+                    await run_in_io(session.rollback)
+                    results[session.source_name] = {"filename": session.source_name, "status": "failed",
+                                                    "error": f"Indexing failed: {e}"}
+
+        parse_slots = asyncio.Semaphore(max(1, Config.INGEST_PAGES_IN_FLIGHT))
+
+        async def parse(path: str, name: str) -> Tuple[str, Any]:
+            async with parse_slots:
+                try:
+                    fingerprint = await run_in_io(file_fingerprint, path)
+                    docs, seconds = await run_in_cpu(timed, load_documents, path)
+                    observe_stage("pdf_parse" if is_pdf(path) else "text_parse", seconds)
+                    return name, (fingerprint, docs)
+                except Exception as e:
+                    return name, e
+
+        tasks = [asyncio.ensure_future(parse(path, name)) for path, name in files]
+        try:
+            for next_parsed in asyncio.as_completed(tasks):
+                name, parsed = await next_parsed
+                counters["files_done"] += 1
+                if isinstance(parsed, Exception):
+                    results[name] = {"filename": name, "status": "failed",
+                                     "error": f"Could not read file: {parsed}"}
                     continue
+                (size_bytes, content_hash), docs = parsed
+                try:
+                    session = await run_in_io(
+                        IndexSession, self, name, None, size_bytes, content_hash, old_ids.get(name, set()), False
+                    )
+                    await run_in_io(session.add, docs)
+                except Exception as e:
+                    results[name] = {"filename": name, "status": "failed", "error": f"Indexing failed: {e}"}
+                    continue
+                open_sessions.append(session)
+                counters["pages_parsed"] += len(docs)
+                counters["chunks_total"] += session.chunks
+                if sum(len(s.pending) for s in open_sessions) >= Config.INGEST_BATCH_SIZE:
+                    await flush()
+                report(open_sessions)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        await flush()
+        for session in open_sessions:
+            try:
+                results[session.source_name] = {**await run_in_io(session.finish), "status": "done"}
+            except Exception as e:
+                results[session.source_name] = {"filename": session.source_name, "status": "failed",
+                                                "error": f"Indexing failed: {e}"}
+        report(open_sessions)
 
-            # -------------------------------------------
-            # 5. MCQ Options (A) B) etc)
-            # -------------------------------------------
-            if re.match(r'^[ABCD]\)', stripped):
-                opt = stripped[0:2]  # A)
-                text_part = stripped[2:].strip()
-                result.append(f"**{opt}** {text_part}")
-                continue
-
-            # -------------------------------------------
-            # 6. Numbered lists (1. , 2) )
-            # -------------------------------------------
-            if re.match(r'^\s*\d+[\.\)]\s', stripped):
-                num = re.findall(r'^\s*(\d+[\.\)])', stripped)[0]
-                text_part = stripped.split(num, 1)[1].strip()
-                result.append(f"- {text_part}")
-                continue
+        ordered = [results[name] for name in names]
+        done = sum(1 for r in ordered if r["status"] == "done")
+        return {
+            "message": f"Indexed {done} of {len(ordered)} files",
+            "files": ordered,
+            "succeeded": done,
+            "failed": len(ordered) - done,
+            "chunks": sum(r.get("chunks", 0) for r in ordered)
+        }
 
-            # -------------------------------------------
-            # 7. Bullet points
-            # -------------------------------------------
-            if re.match(r'^\s*[-*•]\s+', stripped):
-                clean = re.sub(r'^\s*[-*•]+\s+', '', stripped)
-                result.append(f"- {clean}")
-                continue
+    def ids_by_source(self, sources: List[str]) -> Dict[str, Set[str]]:
+        """Existing chunk ids of several files in one query (bulk upload)."""
+        if not sources:
+            return {}
+        existing = self.collection.get(where={"source": {"$in": list(sources)}}, include=["metadatas"])
+        found: Dict[str, Set[str]] = {}
+        for cid, meta in zip(existing["ids"] or [], existing["metadatas"] or []):
+            found.setdefault((meta or {}).get("source"), set()).add(cid)
+        return found
+
+    def index_documents(self, docs: List["Document"], original_filename: str,
+                        progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Index already-parsed documents in one go (see IndexSession)."""
+        session = IndexSession(self, original_filename, progress)
+        session.add(docs)
+        return session.finish()
+
+    def delete_file(self, filename: str) -> int:
+        """Remove every chunk of one file. Returns the number of chunks deleted."""
+        result = self.collection.get(where={"source": filename})
+        ids = result.get("ids", [])
+
+        if ids:
+            self.collection.delete(ids=ids)
+            get_keyword_index().remove(self.user_id, ids)
+            get_answer_cache().invalidate_user(self.user_id)
+        get_file_catalog().remove(self.user_id, filename)
+        return len(ids)
+
+    def get_file_history(self, offset: int = 0, limit: int = Config.FILES_PAGE_SIZE) -> Dict[str, Any]:
+        """One page of uploaded files, newest first (see app/rag/catalog.py)."""
+        catalog = get_file_catalog()
+        if not catalog.is_indexed(self.user_id):
+            catalog.rebuild(self.user_id, self.scan_files())
+        return catalog.page(self.user_id, offset, limit)
+
+    def scan_files(self) -> List[Dict[str, Any]]:
+        """Rebuild file entries from every chunk's metadata — only for the one-time catalog backfill."""
+        results = self.collection.get(include=["metadatas"])
 
-            # -------------------------------------------
-            # 8. Standalone bold lines
-            # -------------------------------------------
-            if stripped.startswith("**") and stripped.endswith("**"):
-                result.append(stripped)
+        file_map: Dict[str, Dict[str, Any]] = {}
+        for meta in results["metadatas"] or []:
+            filename = meta.get("source")
+            if not filename:
                 continue
+            uploaded_at = meta.get("uploaded_at", "Unknown")
+            uploaded_ts = parse_uploaded_at(uploaded_at)
+            entry = file_map.get(filename)
+            if entry is None:
+                entry = file_map[filename] = {
+                    "filename": filename, "uploaded_at": uploaded_at, "uploaded_ts": uploaded_ts, "chunks": 0
+                }
+            elif uploaded_ts > entry["uploaded_ts"]:
+                entry.update(uploaded_at=uploaded_at, uploaded_ts=uploaded_ts)
+            entry["chunks"] += 1
 
-            # -------------------------------------------
-            # 9. Apply inline bold cleanup
-            # -------------------------------------------
-            clean = re.sub(r'\*\*(.*?)\*\*', r'**\1**', stripped)
-
-            # Default clean line
-            result.append(clean)
-
-        # -------------------------------------------
-        # POST-PROCESS CLEANUP
-        # -------------------------------------------
-
-        final = "\n".join(result)
-
-        # Remove triple newlines → max 2
-        final = re.sub(r'\n{3,}', '\n\n', final)
-
-        # Auto space before headings
-        final = re.sub(r'([^\n])(\n##)', r'\1\n\n##', final)
-
-        # Trim trailing spaces
-        final = "\n".join(line.rstrip() for line in final.splitlines())
+        return list(file_map.values())
 
-        return final.strip()
-    
-    def markdown_to_readable_v2(self, text: str) -> str:
+    def retrieve(self, question: str, query_embedding: Optional[Any] = None,
+                 top_k: int = Config.RETRIEVAL_TOP_K) -> Dict[str, Any]:
         """
-        VERSION 2 — Advanced Markdown to Human Readable Converter
-        - Converts tables to simple grids
-        - Converts code blocks with indentation
-        - Converts nested bullets and numbered lists
-        - Converts headings to uppercase readable titles
-        - Removes markdown symbols: #, *, -, **, >, etc.
-        - Keeps clean spacing & readable formatting
+        Top `top_k` chunks in Chroma query shape. In hybrid mode, dense candidates and
+        BM25 keyword candidates are fused by reciprocal rank (app/rag/retrieval.py); chunks only
+        the keyword index found have no distance (None). Per-stage latency is in results["timings"].
         """
+        started = time.perf_counter()
+        hybrid = Config.RETRIEVAL_MODE == "hybrid"
+        candidates = max(top_k, Config.RETRIEVAL_CANDIDATES) if hybrid else top_k
+        dense = self.dense_query(question, query_embedding, candidates)
+        timings = {"dense": time.perf_counter() - started}
+        if not hybrid:
+            timings["total"] = timings["dense"]
+            get_retrieval_stats().record(timings)
+            observe_stage("retrieval", timings["total"])
+            return {**dense, "timings": {name: round(s * 1000, 2) for name, s in timings.items()}}
+
+        mark = time.perf_counter()
+        keyword_ids = [cid for cid, _ in self.keyword_search(question, candidates)]
+        timings["keyword"] = time.perf_counter() - mark
+
+        dense_ids = dense["ids"][0] if dense.get("ids") else []
+        fused = rrf_fuse(
+            [(dense_ids, Config.RETRIEVAL_DENSE_WEIGHT), (keyword_ids, Config.RETRIEVAL_KEYWORD_WEIGHT)],
+            k=Config.RETRIEVAL_RRF_K, limit=top_k
+        )
 
-        import re
-        from textwrap import fill
-
-        if not text or not isinstance(text, str):
-            return text or ""
-
-        # -----------------------------
-        # 1. Process code blocks first (```code```)
-        # -----------------------------
-        def format_code_block(match):
-            code_content = match.group(1)
-            # Indent code for readability
-            indented = "\n".join("    " + line for line in code_content.splitlines())
-            return f"\nCODE BLOCK:\n{indented}\n\n"
-
-        text = re.sub(r"```(.*?)```", lambda m: format_code_block(m), text, flags=re.S)
-
-        # -----------------------------
-        # 2. Process Markdown tables
-        # -----------------------------
-        def convert_table(table_text):
-            rows = [r.strip() for r in table_text.strip().split("\n") if "|" in r]
-            if not rows:
-                return table_text
-
-            cleaned_rows = []
-            for row in rows:
-                cols = [c.strip() for c in row.strip("|").split("|")]
-                cleaned_rows.append(" | ".join(cols))
-
-            return "\n".join(cleaned_rows) + "\n"
-
-        text = re.sub(r"((?:\|.*\n)+)", lambda m: convert_table(m.group(1)), text)
-
-        # -----------------------------
-        # 3. Convert bold/italic to text
-        # -----------------------------
-        text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)
-        text = re.sub(r"\*(.*?)\*", r"\1", text)
-        text = re.sub(r"__(.*?)__", r"\1", text)
-        text = re.sub(r"_(.*?)_", r"\1", text)
-
-        # -----------------------------
-        # 4. Headings (#, ##, ###) → UPPERCASE TITLES
-        # -----------------------------
-        def heading_to_title(match):
-            title = match.group(2).strip()
-            return "\n" + title.upper() + "\n"
-
-        text = re.sub(r"^(#{1,6})(\s+)(.*)$", heading_to_title, text, flags=re.M)
-
-        # -----------------------------
-        # 5. Horizontal rules
-        # -----------------------------
-        text = re.sub(r"^\s*[-*_]{3,}\s*$", "\n", text, flags=re.M)
-
-        # -----------------------------
-        # 6. Nested Ordered Lists
-        # -----------------------------
-        text = re.sub(r"^\s*(\d+)[\.\)]\s+", r"\1. ", text, flags=re.M)
-
-        # -----------------------------
-        # 7. Nested Unordered Lists
-        # -----------------------------
-        def convert_bullet(match):
-            indent = len(match.group(1)) // 2
-            symbol = "•" if indent == 0 else "  " * indent + "◦"
-            return f"{symbol} "
-
-        text = re.sub(r"^(\s*)[-*+]\s+", convert_bullet, text, flags=re.M)
-
-        # -----------------------------
-        # 8. Remove blockquotes
-        # -----------------------------
-        text = re.sub(r"^\s*>\s?", "", text, flags=re.M)
-
-        # -----------------------------
-        # 9. Wrap paragraphs to readable width (50–70 chars)
-        # -----------------------------
-        final_lines = []
-        for paragraph in text.split("\n"):
-            if paragraph.strip().startswith(("•", "◦", "CODE BLOCK", "TABLE")):
-                final_lines.append(paragraph)
-            else:
-                final_lines.append(fill(paragraph, width=70))
-
-        final_text = "\n".join(final_lines)
-
-        # -----------------------------
-        # 10. Clean up excess spacing
-        # -----------------------------
-        final_text = re.sub(r"\n{3,}", "\n\n", final_text).strip()
-
-        return final_text
+        found = {
+            cid: (doc, meta, dist) for cid, doc, meta, dist in zip(
+                dense_ids, dense["documents"][0], dense["metadatas"][0], dense["distances"][0]
+            )
+        } if dense_ids else {}
+        missing = [cid for cid, _ in fused if cid not in found]
+        if missing:
+            mark = time.perf_counter()
+            extra = self.collection.get(ids=missing, include=["documents", "metadatas"])
+            for cid, doc, meta in zip(extra["ids"], extra["documents"], extra["metadatas"]):
+                found[cid] = (doc, meta, None)
+            timings["fetch"] = time.perf_counter() - mark
+
+        # Ids the keyword index still lists but Chroma no longer has (mid-replace) are dropped
+        ids = [cid for cid, _ in fused if cid in found]
+        timings["total"] = time.perf_counter() - started
+        get_retrieval_stats().record(timings, keyword_only=len([cid for cid in ids if cid in missing]))
+        observe_stage("retrieval", timings["total"])
+        return {
+            "ids": [ids],
+            "documents": [[found[cid][0] for cid in ids]],
+            "metadatas": [[found[cid][1] for cid in ids]],
+            "distances": [[found[cid][2] for cid in ids]],
+            "timings": {name: round(s * 1000, 2) for name, s in timings.items()}
+        }
 
-    def ask(self, question: str, mode: str = "study") -> Dict[str, Any]:
-        try:
-            if not os.getenv("GOOGLE_API_KEY"):
-                return {"answer": "Error: Gemini API key missing.", "sources": [], "used_web": False}
+    def dense_query(self, question: str, query_embedding: Optional[Any], n_results: int) -> Dict[str, Any]:
+        """Vector search (embeds the question on the shared model, unless the caller already has its vector)."""
+        if query_embedding is None:
+            # Not query_texts: the collection's embedding function would cache the question's vector
+            query_embedding = get_embedding_function().embed_query(question)
+        return self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            include=["documents", "metadatas", "distances"]
+        )
 
-            results = self.collection.query(
-                query_texts=[question],
-                n_results=8,
-                include=["documents", "metadatas", "distances"]
-            )
+    def keyword_search(self, question: str, limit: int) -> List[Tuple[str, float]]:
+        """BM25 over the user's chunks; backfills the keyword index from Chroma the first time."""
+        index = get_keyword_index()
+        if not index.is_indexed(self.user_id):
+            index.rebuild(self.user_id, self.scan_chunks())
+        return index.search(self.user_id, question, limit)
+
+    def scan_chunks(self, batch_size: int = 1000) -> Iterator[Tuple[str, str, str]]:
+        """(chunk_id, source, text) of every stored chunk, page by page — keyword index backfill only."""
+        offset = 0
+        while True:
+            page = self.collection.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+            if not page["ids"]:
+                return
+            for cid, doc, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+                yield cid, (meta or {}).get("source", ""), doc or ""
+            offset += len(page["ids"])
+
+    def embed_and_retrieve(self, question: str, mode: str = "study") -> Tuple[Any, Dict[str, Any]]:
+        """Embed the question once — the vector feeds both retrieval and the answer cache."""
+        with stage("query_embed"):
+            vector = get_embedding_function().embed_query(question)
+        reranker = get_reranker()
+        if reranker is None or not reranker.enabled:
+            return vector, self.retrieve(question, vector)
+        results = self.retrieve(question, vector, max(Config.RERANK_CANDIDATES, Config.RETRIEVAL_TOP_K))
+        return vector, self.rerank(question, mode, results)
+
+    def rerank(self, question: str, mode: str, results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Over-fetched candidates rescored by the cross-encoder (app/rag/rerank.py): only the relevant
+        ones are kept, best first, up to the mode's RERANK_KEEP. Without a usable model the plain
+        top RETRIEVAL_TOP_K is returned.
+        """
+        docs = results["documents"][0] if results.get("documents") else []
+        with stage("rerank"):
+            outcome = get_reranker().rerank(question, docs, mode) if docs else None
+        if outcome is None:
+            top_k = Config.RETRIEVAL_TOP_K
+            return {
+                **results,
+                **{key: [results[key][0][:top_k]] for key in ("ids", "documents", "metadatas", "distances")
+                   if results.get(key)}
+            }
 
-            docs = results["documents"][0] if results["documents"] and results["documents"][0] else []
-            context = "\n\n".join(docs) if docs else "No relevant notes found."
+        kept, report = outcome
+        profiling.note("rerank", report)
+        return {
+            **results,
+            **{key: [[results[key][0][i] for i in kept]] for key in ("ids", "documents", "metadatas", "distances")
+               if results.get(key)},
+            "timings": {**results.get("timings", {}), "rerank": report["ms"]},
+            "rerank": report
+        }
 
-            # UNIVERSAL PROMPTS — FOR EVERY LEARNER IN THE WORLD
-            MODE_PROMPTS = {
-                "study": """
+    def cached_answer(self, mode: str, vector: Any, results: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        ids = results["ids"][0] if results.get("ids") else []
+        cached = get_answer_cache().get(self.user_id, mode, ids, vector)
+        if cached:
+            profiling.note("answer_cache", "hit")  # ask, aask and astream_ask alike
+        return cached
+
+    def cache_answer(self, mode: str, vector: Any, results: Dict[str, Any],
+                     response: Dict[str, Any], generation: int) -> None:
+        ids = results["ids"][0] if results.get("ids") else []
+        get_answer_cache().put(self.user_id, mode, ids, vector, response, generation)
+
+    def build_prompt(self, question: str, mode: str, results: Dict[str, Any]) -> str:
+        docs = results["documents"][0] if results["documents"] and results["documents"][0] else []
+        metas = results["metadatas"][0] if results.get("metadatas") and results["metadatas"][0] else []
+        # Overlapping neighbours merged, near-duplicates dropped, packed to the mode's token budget
+        with stage("context"):
+            context, report = build_context(docs, metas, token_budget(mode))
+        results["context"] = report
+        get_context_stats().record(report)
+        context = context or "No relevant notes found."
+
+        # UNIVERSAL PROMPTS — FOR EVERY LEARNER IN THE WORLD
+        MODE_PROMPTS = {
+            "study": """
     You are FocusForge — a world-class personal tutor.
     Explain the topic clearly with real-world examples, key concepts, and intuition.
     Use simple language. Add analogies if helpful.
     If not in notes → say "Not in notes yet"
     """,
 
-                "quick": """
+            "quick": """
     Give only the most important points in crisp bullet form.
     Max 10 lines. No fluff.
     If not in notes → reply "Not in notes yet"
     """,
 
-                "quiz": """
+            "quiz": """
     Generate 3 high-quality practice questions (MCQ or short answer).
     Include correct answer + brief explanation.
     Only use content from uploaded notes.
     If topic not in notes → reply "Not in notes yet"
     """,
 
-                "roadmap": """
+            "roadmap": """
     Create a practical 7–14 day learning roadmap for mastering this topic.
     Include daily goals, practice tips, and recommended resources.
     You can give general advice even without notes.
     """,
 
-                "doubt": """
+            "doubt": """
     Act as a patient mentor. Clear the confusion step by step.
     Explain common misconceptions and the correct way to think.
     You can answer from general knowledge — no need for notes.
     """,
 
-                "strategy": """
+            "strategy": """
     You are an expert coach for exams AND job interviews.
     Give smart, actionable tips:
     • How to explain this concept in an interview
@@ -459,28 +737,26 @@ class FocusForgeRAG:
     • Red flags to avoid
     Always answer — even without notes. This is universal advice.
     """,
-            }
-
-            system_prompt = MODE_PROMPTS.get(mode, MODE_PROMPTS["study"])
+        }
 
-            # THIS IS WHERE THE MAGIC HAPPENS
-            strict_context_modes = ["study", "quick", "quiz"]
+        system_prompt = MODE_PROMPTS.get(mode, MODE_PROMPTS["study"])
 
-            if mode in strict_context_modes:
-                rules = """
+        # THIS IS WHERE THE MAGIC HAPPENS
+        if mode in STRICT_CONTEXT_MODES:
+            rules = """
     Rules:
     • Answer using ONLY the context from uploaded notes
     • If topic not found in notes → reply exactly: "Not in notes yet"
     • Never hallucinate or make up information"""
-            else:
-                rules = """
+        else:
+            rules = """
     Rules:
     • Be helpful, practical, and real-world focused
     • You may use general knowledge when notes are missing or incomplete
     • Always encourage the learner"""
 
-            # FINAL PROMPT
-            prompt = f"""{system_prompt}
+        # FINAL PROMPT
+        prompt = f"""{system_prompt}
  
     {rules}
 
@@ -491,30 +767,171 @@ class FocusForgeRAG:
 
     Answer:"""
 
+        profiling.note("retrieved", {"chunks": len(docs), "chars": sum(len(d or "") for d in docs)})
+        profiling.note("context", report)
+        profiling.note("prompt", {"chars": len(prompt), "tokens_est": estimate_tokens(prompt)})
+        return prompt
+
+    def prepare_ask(self, question: str, mode: str) -> Tuple[Any, Dict[str, Any], Optional[Dict[str, Any]], str]:
+        """
+        Everything before the LLM call, as one blocking step (aask / astream_ask run it on the
+        I/O pool): embed + retrieve, answer cache, relevance gate, context packing.
+        Returns (vector, results, early, prompt): `early` is a cached or relevance-gated response
+        that needs no LLM, otherwise None and `prompt` is ready to send.
+        """
+        vector, results = self.embed_and_retrieve(question, mode)
+        early = self.cached_answer(mode, vector, results) or self.gated_answer(mode, results)
+        if early:
+            return vector, results, early, ""
+        return vector, results, None, self.build_prompt(question, mode, results)
+
+    def gated_answer(self, mode: str, results: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        "Not in notes yet" without an LLM call when the relevance gate (app/rag/relevance.py) finds
+        nothing close enough to the question in a notes-only mode; None means ask the LLM.
+        """
+        reason = relevance_check(mode, results)
+        if reason is None:
+            return None
+        profiling.note("relevance_gate", {"skipped": reason, "best_distance": best_distance(results)})
+        return self.finalize_answer(NOT_IN_NOTES, results)
+
+    def finalize_answer(self, answer_raw: str, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Format the raw LLM text and attach sources."""
+        if not answer_raw:
+            return {"answer": "All models failed. Try again later.", "sources": [], "used_web": False}
+
+        with stage("format"):
+            final_answer = format_answer(answer_raw)
+
+        response = {
+            "answer": final_answer,
+            "sources": results["metadatas"][0] if results["metadatas"] and results["metadatas"][0] else [],
+            "used_web": False
+        }
+
+        # Hide sources only when truly not found
+        if "not in notes yet" in final_answer.lower():
+            response["sources"] = []
+
+        return response
+
+    @staticmethod
+    def error_response(e: Exception) -> Dict[str, Any]:
+        # Your error handling
+        error_str = str(e).lower()
+        if "api key" in error_str:
+            return {"answer": "Invalid API key!", "sources": [], "used_web": False}
+        elif "rate limit" in error_str:
+            return {"answer": "Rate limit reached. Try again in 1 minute.", "sources": [], "used_web": False}
+        else:
+            return {"answer": f"Error: {e}", "sources": [], "used_web": False}
+
+    def ask(self, question: str, mode: str = "study") -> Dict[str, Any]:
+        try:
+            if not os.getenv("GOOGLE_API_KEY"):
+                return {"answer": "Error: Gemini API key missing.", "sources": [], "used_web": False}
+
+            generation = get_answer_cache().generation(self.user_id)
+            vector, results, early, prompt = self.prepare_ask(question, mode)
+            if early:
+                return early
+
             answer_raw = self.run_llm(prompt)
-            if not answer_raw:
-                return {"answer": "All models failed. Try again later.", "sources": [], "used_web": False}
+            response = self.finalize_answer(answer_raw, results)
+            if answer_raw and answer_raw != ALL_MODELS_FAILED:
+                self.cache_answer(mode, vector, results, response, generation)
+            return response
 
-            final_answer = self.markdown_to_readable_v2(self.format_gemini_response(answer_raw))
+        except Exception as e:
+            return self.error_response(e)
 
-            response = {
-                "answer": final_answer,
-                "sources": results["metadatas"][0] if results["metadatas"] and results["metadatas"][0] else [],
-                "used_web": False
-            }
+    async def aask(self, question: str, mode: str = "study") -> Dict[str, Any]:
+        """Same as ask(), but never blocks the event loop: Chroma + formatting run on the
+        I/O pool and the LLM call is real async I/O (ainvoke)."""
+        try:
+            if not os.getenv("GOOGLE_API_KEY"):
+                return {"answer": "Error: Gemini API key missing.", "sources": [], "used_web": False}
 
-            # Hide sources only when truly not found
-            if "not in notes yet" in final_answer.lower():
-                response["sources"] = []
+            generation = get_answer_cache().generation(self.user_id)
+            vector, results, early, prompt = await run_in_io(self.prepare_ask, question, mode)
+            if early:
+                return early
 
+            answer_raw = await self.arun_llm(prompt)
+            response = await run_in_io(self.finalize_answer, answer_raw, results)
+            if answer_raw and answer_raw != ALL_MODELS_FAILED:
+                self.cache_answer(mode, vector, results, response, generation)
             return response
 
         except Exception as e:
-            # Your error handling
-            error_str = str(e).lower()
-            if "api key" in error_str:
-                return {"answer": "Invalid API key!", "sources": [], "used_web": False}
-            elif "rate limit" in error_str:
-                return {"answer": "Rate limit reached. Try again in 1 minute.", "sources": [], "used_web": False}
-            else:
-                return {"answer": f"Error: {e}", "sources": [], "used_web": False}
\ No newline at end of file
+            return self.error_response(e)
+
+    async def astream_ask(self, question: str, mode: str = "study") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming ask(). Yields events:
+        - {"event": "sources", "sources": [...]}   as soon as retrieval finishes
+        - {"event": "token", "text": "..."}        formatted text, line by line
+        - {"event": "done", "answer", "sources", "used_web"}  same payload as ask()
+        A cached or relevance-gated answer arrives as one token event.
+        """
+        if not os.getenv("GOOGLE_API_KEY"):
+            yield {"event": "done", "answer": "Error: Gemini API key missing.", "sources": [], "used_web": False}
+            return
+
+        try:
+            generation = get_answer_cache().generation(self.user_id)
+            vector, results, early, prompt = await run_in_io(self.prepare_ask, question, mode)
+        except Exception as e:
+            yield {"event": "done", **self.error_response(e)}
+            return
+
+        if early:
+            # A gated answer carries no sources ("Not in notes yet" hides them)
+            yield {"event": "sources", "sources": early["sources"]}
+            yield {"event": "token", "text": early["answer"]}
+            yield {"event": "done", **early}
+            return
+
+        sources = results["metadatas"][0] if results["metadatas"] and results["metadatas"][0] else []
+        yield {"event": "sources", "sources": sources}
+
+        formatter = StreamingFormatter()
+        answer_parts = []
+        failed = False
+        streamed_at = time.perf_counter()
+        format_s = 0.0
+
+        try:
+            async for delta in self.astream_llm(prompt):
+                failed = failed or delta in (ALL_MODELS_FAILED, ANSWER_INTERRUPTED)
+                mark = time.perf_counter()
+                text = formatter.feed(delta)
+                format_s += time.perf_counter() - mark
+                if text:
+                    answer_parts.append(text)
+                    yield {"event": "token", "text": text}
+        except Exception as e:
+            yield {"event": "done", **self.error_response(e)}
+            return
+        finally:
+            # Whole stream, minus the formatter's share (which goes to "format")
+            observe_stage("llm", time.perf_counter() - streamed_at - format_s)
+
+        mark = time.perf_counter()
+        tail = formatter.finish()
+        observe_stage("format", format_s + time.perf_counter() - mark)
+        if tail:
+            answer_parts.append(tail)
+            yield {"event": "token", "text": tail}
+
+        final_answer = "".join(answer_parts)
+
+        # Hide sources only when truly not found
+        if "not in notes yet" in final_answer.lower():
+            sources = []
+
+        response = {"answer": final_answer, "sources": sources, "used_web": False}
+        if not failed:
+            self.cache_answer(mode, vector, results, response, generation)
+        yield {"event": "done", **response}
@@ -0,0 +1,239 @@
+# backend/app/rag/registry.py
+# Bounded LRU registry of per-user FocusForgeRAG instances (replaces the old global dict)
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.config import Config
+from app.executor import run_in_io
+from app.rag.pipeline import FocusForgeRAG
+
+
+class _Entry:
+    __slots__ = ("rag", "last_used", "leases")
+
+    def __init__(self, rag: FocusForgeRAG):
+        self.rag = rag
+        self.last_used = time.monotonic()
+        self.leases = 0
+
+
+class RAGRegistry:
+    """
+    Keeps at most `max_size` open users, least-recently-used first out.
+    - Users idle longer than `idle_ttl` seconds are evicted on the next sweep
+    - Evicted instances are closed (Chroma released) and parked in a small warm pool,
+      so a returning user only re-opens their store instead of a full cold construction
+    - Instances leased through `session()` are never closed while a request is using them
+    Opening and closing Chroma happen outside the registry lock, under a per-user lock:
+    Chroma caches one System per path, so a close must never interleave with an open of the
+    same user (it would stop the System the new instance is using).
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], FocusForgeRAG] = FocusForgeRAG,
+        max_size: int = Config.RAG_REGISTRY_MAX_USERS,
+        idle_ttl: float = Config.RAG_REGISTRY_IDLE_TTL,
+        warm_size: int = Config.RAG_REGISTRY_WARM_POOL
+    ):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.warm_size = warm_size
+
+        self._active: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._warm: "OrderedDict[str, FocusForgeRAG]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Held while a user's store is opened or closed; dropped once nobody holds it
+        self._user_locks: "weakref.WeakValueDictionary[str, Any]" = weakref.WeakValueDictionary()
+
+        self.hits = 0
+        self.misses = 0
+        self.warm_reopens = 0
+        self.evictions_lru = 0
+        self.evictions_idle = 0
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._active
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    @contextmanager
+    def session(self, user_id: str) -> Iterator[FocusForgeRAG]:
+        """Lease the user's instance for the duration of a request."""
+        rag = self._acquire(user_id, lease=True)
+        try:
+            yield rag
+        finally:
+            self._release(user_id, rag)
+
+    @asynccontextmanager
+    async def asession(self, user_id: str) -> AsyncIterator[FocusForgeRAG]:
+        """session() for async endpoints — a cold open runs on the I/O pool, not the event loop."""
+        rag = await run_in_io(self._acquire, user_id, True)
+        try:
+            yield rag
+        finally:
+            self._release(user_id, rag)
+
+    def sweep(self) -> int:
+        """Evict idle users now (blocking: closes their stores). Returns how many were evicted."""
+        with self._lock:
+            evicted = self._evict_locked()
+        self._close_evicted(evicted)
+        return len(evicted)
+
+    def close_all(self) -> None:
+        """Close every open instance (process shutdown)."""
+        with self._lock:
+            entries = list(self._active.values())
+            self._active.clear()
+            self._warm.clear()
+        for entry in entries:
+            entry.rag.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.warm_reopens
+        return {
+            "active": len(self._active),
+            "max_size": self.max_size,
+            "idle_ttl_s": self.idle_ttl,
+            "warm_pool": len(self._warm),
+            "hits": self.hits,
+            "misses": self.misses,
+            "warm_reopens": self.warm_reopens,
+            "evictions_lru": self.evictions_lru,
+            "evictions_idle": self.evictions_idle,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
+
+    # -----------------------------
+    # Internals
+    # -----------------------------
+    def _acquire(self, user_id: str, lease: bool) -> FocusForgeRAG:
+        """Blocking (may open or close Chroma stores) — asession() runs it on the I/O pool."""
+        with self._lock:
+            entry = self._active.get(user_id)
+            if entry is not None:
+                self.hits += 1
+                self._touch_locked(user_id, entry, lease)
+                rag = entry.rag
+                evicted = self._evict_locked()
+            else:
+                rag = None
+                user_lock = self._user_lock_locked(user_id)
+
+        if rag is None:
+            # Open outside the registry lock — Chroma start-up must not stall other users.
+            # The user lock is held until the instance is in _active, so a close of this
+            # user's previous instance either finished before or sees the new one and skips.
+            with user_lock:
+                with self._lock:
+                    entry = self._active.get(user_id)
+                    parked = self._warm.pop(user_id, None) if entry is None else None
+                if entry is None:
+                    if parked is not None:
+                        parked.open()
+                        candidate, warm = parked, True
+                    else:
+                        candidate, warm = self.factory(user_id), False
+
+                with self._lock:
+                    if entry is not None:
+                        # Another request opened it while we waited for the user lock
+                        self.hits += 1
+                    else:
+                        if warm:
+                            self.warm_reopens += 1
+                        else:
+                            self.misses += 1
+                        entry = _Entry(candidate)
+                        self._active[user_id] = entry
+                    self._touch_locked(user_id, entry, lease)
+                    rag = entry.rag
+                    evicted = self._evict_locked()
+
+        self._close_evicted(evicted)
+        return rag
+
+    def _release(self, user_id: str, rag: FocusForgeRAG) -> None:
+        with self._lock:
+            entry = self._active.get(user_id)
+            if entry is not None and entry.rag is rag:
+                entry.leases = max(0, entry.leases - 1)
+                # Keep _active ordered by last use — the idle sweep stops at the first fresh entry
+                self._touch_locked(user_id, entry, lease=False)
+
+    def _touch_locked(self, user_id: str, entry: _Entry, lease: bool) -> None:
+        entry.last_used = time.monotonic()
+        if lease:
+            entry.leases += 1
+        self._active.move_to_end(user_id)
+
+    def _user_lock_locked(self, user_id: str) -> Any:
+        user_lock = self._user_locks.get(user_id)
+        if user_lock is None:
+            user_lock = self._user_locks[user_id] = threading.Lock()
+        return user_lock
+
+    def _evict_locked(self) -> List[Tuple[str, FocusForgeRAG, Any]]:
+        """
+        Take idle / overflow users out of _active. Returns (user_id, rag, user lock) for
+        _close_evicted(), which closes them after the registry lock is released.
+        """
+        evicted: List[Tuple[str, FocusForgeRAG, Any]] = []
+        now = time.monotonic()
+
+        # 1. Idle TTL — the dict is ordered by last use, so stop at the first fresh entry
+        if self.idle_ttl > 0:
+            for user_id, entry in list(self._active.items()):
+                if now - entry.last_used < self.idle_ttl:
+                    break
+                if entry.leases:
+                    continue
+                del self._active[user_id]
+                self.evictions_idle += 1
+                evicted.append((user_id, entry.rag, self._user_lock_locked(user_id)))
+
+        # 2. Capacity — least recently used, skipping instances still in use
+        if len(self._active) > self.max_size:
+            for user_id, entry in list(self._active.items()):
+                if len(self._active) <= self.max_size:
+                    break
+                if entry.leases:
+                    continue
+                del self._active[user_id]
+                self.evictions_lru += 1
+                evicted.append((user_id, entry.rag, self._user_lock_locked(user_id)))
+
+        return evicted
+
+    def _close_evicted(self, evicted: List[Tuple[str, FocusForgeRAG, Any]]) -> None:
+        """Close evicted instances (outside the registry lock) and park them in the warm pool."""
+        for user_id, rag, user_lock in evicted:
+            with user_lock:
+                with self._lock:
+                    reopened = user_id in self._active
+                if reopened:
+                    # The user came back and already holds a new instance on the same
+                    # cached Chroma System — closing ours would stop it. Just drop ours.
+                    continue
+                rag.close()
+                with self._lock:
+                    if user_id not in self._active:
+                        self._park_locked(user_id, rag)
+
+    def _park_locked(self, user_id: str, rag: FocusForgeRAG) -> None:
+        if self.warm_size > 0:
+            self._warm[user_id] = rag
+            self._warm.move_to_end(user_id)
+            while len(self._warm) > self.warm_size:
+                self._warm.popitem(last=False)
@@ -0,0 +1,116 @@
+# backend/app/rag/relevance.py
+# Relevance gate — in the notes-only modes, a question whose retrieved chunks are all far from it
+# (Chroma's cosine distance) is answered "Not in notes yet" without an LLM round trip.
+# Thresholds come from benchmarks/relevance_gate.py run over labelled questions.
+import threading
+from typing import Any, Dict, Optional
+
+from app import metrics
+from app.config import Config
+
+# Modes whose prompt says "answer ONLY from the notes" — the others may use general knowledge
+STRICT_CONTEXT_MODES = ("study", "quick", "quiz")
+NOT_IN_NOTES = "Not in notes yet"
+
+
+def parse_thresholds(spec: str) -> Dict[str, float]:
+    """"study:0.9,quick:0.85" → {"study": 0.9, "quick": 0.85}; malformed entries are ignored."""
+    thresholds = {}
+    for item in spec.split(","):
+        mode, _, value = item.partition(":")
+        try:
+            thresholds[mode.strip()] = float(value)
+        except ValueError:
+            continue
+    return {mode: value for mode, value in thresholds.items() if mode}
+
+
+_THRESHOLDS = parse_thresholds(Config.RELEVANCE_MAX_DISTANCE)
+
+
+def max_distance(mode: str) -> Optional[float]:
+    """The mode's threshold, or None when the gate does not apply to it."""
+    if mode not in STRICT_CONTEXT_MODES:
+        return None
+    return _THRESHOLDS.get(mode)
+
+
+def best_distance(results: Dict[str, Any]) -> Optional[float]:
+    """Smallest cosine distance among the retrieved chunks (None if none has one)."""
+    distances = results["distances"][0] if results.get("distances") else []
+    known = [d for d in distances if d is not None]
+    return min(known) if known else None
+
+
+def skip_reason(mode: str, results: Dict[str, Any]) -> Optional[str]:
+    """
+    "empty" (nothing retrieved) or "distance" (no dense chunk within the mode's threshold) when the
+    LLM can be skipped, else None. Decided on the dense candidates only: in hybrid retrieval the
+    keyword-only chunks have no distance, and BM25 matches common words for almost any question,
+    so counting them as relevant would keep the gate from ever firing.
+    """
+    threshold = max_distance(mode)
+    if threshold is None:
+        return None
+    distances = results["distances"][0] if results.get("distances") else []
+    if not distances:
+        return "empty"
+    best = best_distance(results)
+    if best is not None and best <= threshold:
+        return None
+    return "distance"
+
+
+class RelevanceGateStats:
+    """Questions checked and LLM calls skipped per mode, for /health."""
+
+    def __init__(self):
+        self.checked: Dict[str, int] = {}
+        self.skipped: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, mode: str, reason: Optional[str]) -> None:
+        with self._lock:
+            self.checked[mode] = self.checked.get(mode, 0) + 1
+            if reason:
+                per_mode = self.skipped.setdefault(mode, {})
+                per_mode[reason] = per_mode.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            checked = dict(self.checked)
+            skipped = {mode: dict(reasons) for mode, reasons in self.skipped.items()}
+        total_checked = sum(checked.values())
+        total_skipped = sum(sum(reasons.values()) for reasons in skipped.values())
+        return {
+            "max_distance": {mode: _THRESHOLDS[mode] for mode in STRICT_CONTEXT_MODES if mode in _THRESHOLDS},
+            "checked": checked,
+            "skipped": skipped,
+            "llm_calls_skipped": total_skipped,
+            "skipped_ratio": round(total_skipped / total_checked, 3) if total_checked else 0.0
+        }
+
+
+_shared: Optional[RelevanceGateStats] = None
+_shared_lock = threading.Lock()
+
+
+def get_relevance_stats() -> RelevanceGateStats:
+    """Return the process-wide relevance gate stats."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = RelevanceGateStats()
+    return _shared
+
+
+def check(mode: str, results: Dict[str, Any]) -> Optional[str]:
+    """skip_reason(), counted in /health and focusforge_llm_calls_skipped_total."""
+    if max_distance(mode) is None:
+        return None
+    reason = skip_reason(mode, results)
+    get_relevance_stats().record(mode, reason)
+    if reason:
+        metrics.LLM_CALLS_SKIPPED.inc(mode=mode, reason=reason)
+    return reason
@@ -0,0 +1,209 @@
+# backend/app/rag/rerank.py
+# Optional cross-encoder rerank — score (question, passage) pairs over an over-fetched candidate set
+# and keep only the relevant ones, up to a per-mode count, so prompts get shorter
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from app.config import Config
+from app.logs import get_logger
+from app.rag.context import estimate_tokens, parse_budgets
+
+log = get_logger(__name__)
+
+_KEEP = parse_budgets(Config.RERANK_KEEP)
+
+
+def keep_limit(mode: str) -> int:
+    return _KEEP.get(mode, Config.RETRIEVAL_TOP_K)
+
+
+def select(scores: Sequence[float], limit: int, min_score: float = Config.RERANK_MIN_SCORE,
+           min_keep: int = Config.RERANK_MIN_KEEP) -> List[int]:
+    """
+    Candidate positions to keep, best first: everything scoring at least min_score, at most `limit`
+    of them — but never fewer than min_keep (the best ones, even below the cutoff).
+    """
+    order = sorted(range(len(scores)), key=lambda i: -scores[i])
+    kept = [i for i in order if scores[i] >= min_score][:limit]
+    if len(kept) < min_keep:
+        kept = order[:min(min_keep, limit)]
+    return kept
+
+
+class CrossEncoderReranker:
+    """
+    One sentence-transformers CrossEncoder per process, loaded on first use (double-checked lock)
+    and serialized like the embedding model — torch already uses every core per call.
+    With one output label it applies a sigmoid, so scores are relevance probabilities in 0..1.
+    If the model cannot be loaded (e.g. no torch on an onnx-only host), reranking switches itself
+    off and retrieval falls back to the plain top RETRIEVAL_TOP_K.
+    """
+
+    def __init__(self, model_name: str, device: str = "cpu", batch_size: int = 16):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._predict_lock = threading.Lock()
+        self.load_time_s: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.error is None
+
+    def _load(self):
+        if self._model is not None:
+            return self._model
+
+        with self._load_lock:
+            if self._model is None:
+                start = time.perf_counter()
+                from sentence_transformers import CrossEncoder
+
+                model = CrossEncoder(self.model_name, device=self.device, max_length=512)
+                self.load_time_s = round(time.perf_counter() - start, 3)
+                log.info("rerank model loaded", extra={
+                    "model": self.model_name, "device": self.device, "load_s": self.load_time_s
+                })
+                self._model = model
+
+        return self._model
+
+    def score(self, question: str, passages: Sequence[str]) -> Optional[List[float]]:
+        """Relevance per passage, or None when reranking is unavailable."""
+        if not passages or not self.enabled:
+            return None
+        try:
+            model = self._load()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            log.error("rerank model failed to load; reranking disabled", extra={
+                "model": self.model_name, "error": self.error
+            })
+            return None
+        with self._predict_lock:
+            scores = model.predict(
+                [(question, passage or "") for passage in passages],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+        return [float(s) for s in scores]
+
+    def rerank(self, question: str, docs: Sequence[str], mode: str) -> Optional[Tuple[List[int], Dict[str, Any]]]:
+        """
+        (positions of the kept candidates, best first, report) — or None when reranking is
+        unavailable. tokens_saved compares the kept passages with the RETRIEVAL_TOP_K the prompt
+        would have received without reranking.
+        """
+        start = time.perf_counter()
+        scores = self.score(question, docs)
+        if scores is None:
+            return None
+        seconds = time.perf_counter() - start
+
+        kept = select(scores, keep_limit(mode))
+        baseline = sum(estimate_tokens(d or "") for d in docs[:Config.RETRIEVAL_TOP_K])
+        tokens = sum(estimate_tokens(docs[i] or "") for i in kept)
+        report = {
+            "candidates": len(docs),
+            "kept": len(kept),
+            "limit": keep_limit(mode),
+            "top_score": round(max(scores), 4),
+            "cutoff_score": round(scores[kept[-1]], 4) if kept else None,
+            "tokens_baseline": baseline,
+            "tokens": tokens,
+            "tokens_saved": baseline - tokens,
+            "ms": round(seconds * 1000, 2)
+        }
+        get_rerank_stats().record(report, seconds)
+        return kept, report
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "device": self.device,
+            "loaded": self._model is not None,
+            "load_time_s": self.load_time_s,
+            "error": self.error
+        }
+
+
+class RerankStats:
+    """Rolling rerank latency plus running totals of candidates kept and prompt tokens saved, for /health."""
+
+    def __init__(self, window: int = 500):
+        self.requests = 0
+        self.candidates = 0
+        self.kept = 0
+        self.tokens_baseline = 0
+        self.tokens = 0
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, report: Dict[str, Any], seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.candidates += report["candidates"]
+            self.kept += report["kept"]
+            self.tokens_baseline += report["tokens_baseline"]
+            self.tokens += report["tokens"]
+            self._latencies.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ordered = sorted(self._latencies)
+        latency = None
+        if ordered:
+            p50 = ordered[round(0.5 * (len(ordered) - 1))]
+            p95 = ordered[round(0.95 * (len(ordered) - 1))]
+            latency = {"p50_ms": round(p50 * 1000, 2), "p95_ms": round(p95 * 1000, 2)}
+        saved = self.tokens_baseline - self.tokens
+        return {
+            "enabled": bool(Config.RERANK_MODEL),
+            "candidates": Config.RERANK_CANDIDATES,
+            "keep": {**_KEEP, "default": Config.RETRIEVAL_TOP_K},
+            "min_score": Config.RERANK_MIN_SCORE,
+            "requests": self.requests,
+            "avg_kept": round(self.kept / self.requests, 2) if self.requests else None,
+            "avg_candidates": round(self.candidates / self.requests, 2) if self.requests else None,
+            "tokens_saved": saved,
+            "saved_ratio": round(saved / self.tokens_baseline, 3) if self.tokens_baseline else 0.0,
+            "latency": latency,
+            "model": _shared.stats() if _shared is not None else None
+        }
+
+
+_shared: Optional[CrossEncoderReranker] = None
+_shared_lock = threading.Lock()
+_stats: Optional[RerankStats] = None
+
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """Return the process-wide reranker, or None when RERANK_MODEL is unset."""
+    global _shared
+    if not Config.RERANK_MODEL:
+        return None
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = CrossEncoderReranker(
+                    Config.RERANK_MODEL,
+                    device=Config.RERANK_DEVICE,
+                    batch_size=Config.RERANK_BATCH_SIZE
+                )
+    return _shared
+
+
+def get_rerank_stats() -> RerankStats:
+    """Return the process-wide rerank stats."""
+    global _stats
+    if _stats is None:
+        with _shared_lock:
+            if _stats is None:
+                _stats = RerankStats()
+    return _stats
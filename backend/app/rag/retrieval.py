@@ -0,0 +1,80 @@
+# backend/app/rag/retrieval.py
+# Hybrid retrieval helpers — reciprocal-rank fusion of dense + keyword results, and latency stats
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from app.config import Config
+
+STAGES = ("dense", "keyword", "fetch", "total")
+
+
+def rrf_fuse(rankings: Sequence[Tuple[Sequence[str], float]], k: int = Config.RETRIEVAL_RRF_K,
+             limit: int = Config.RETRIEVAL_TOP_K) -> List[Tuple[str, float]]:
+    """
+    Reciprocal-rank fusion: each ranking adds weight / (k + rank) to every id it contains.
+    Only ranks matter, so cosine distances and BM25 scores never have to be put on one scale.
+    Ties keep the order of the first ranking (dense first).
+    """
+    scores: Dict[str, float] = {}
+    for ids, weight in rankings:
+        if weight <= 0:
+            continue
+        for rank, cid in enumerate(ids, start=1):
+            scores[cid] = scores.get(cid, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])[:limit]
+
+
+class RetrievalStats:
+    """Rolling per-stage latencies (dense query, keyword search, fetch of keyword-only chunks, total)."""
+
+    def __init__(self, window: int = 500):
+        self.queries = 0
+        self.keyword_only = 0  # fused chunks that dense search alone would have missed
+        self._latencies: Dict[str, Deque[float]] = {stage: deque(maxlen=window) for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def record(self, timings: Dict[str, float], keyword_only: int = 0) -> None:
+        with self._lock:
+            self.queries += 1
+            self.keyword_only += keyword_only
+            for stage, seconds in timings.items():
+                if stage in self._latencies:
+                    self._latencies[stage].append(seconds)
+
+    def percentile(self, stage: str, pct: float) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self._latencies[stage])
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))]
+
+    def stats(self) -> Dict[str, Any]:
+        latency = {}
+        for stage in STAGES:
+            p50, p95 = self.percentile(stage, 50), self.percentile(stage, 95)
+            if p50 is not None:
+                latency[stage] = {"p50_ms": round(p50 * 1000, 2), "p95_ms": round(p95 * 1000, 2)}
+        return {
+            "mode": Config.RETRIEVAL_MODE,
+            "top_k": Config.RETRIEVAL_TOP_K,
+            "candidates": Config.RETRIEVAL_CANDIDATES,
+            "weights": {"dense": Config.RETRIEVAL_DENSE_WEIGHT, "keyword": Config.RETRIEVAL_KEYWORD_WEIGHT},
+            "queries": self.queries,
+            "keyword_only_hits": self.keyword_only,
+            "latency": latency
+        }
+
+
+_shared: Optional[RetrievalStats] = None
+_shared_lock = threading.Lock()
+
+
+def get_retrieval_stats() -> RetrievalStats:
+    """Return the process-wide retrieval stats."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = RetrievalStats()
+    return _shared
@@ -0,0 +1,111 @@
+# backend/app/rag/store.py
+# Chroma storage layout — one PersistentClient per user (default) or one shared, multi-tenant client
+# chromadb is imported on the first open, so the API can start (and answer /health) without it
+import hashlib
+import os
+import threading
+from typing import Any, Optional, Tuple
+
+from app.config import Config
+from app.rag.embeddings import get_embedding_function
+
+PER_USER = "per_user"
+SHARED = "shared"
+
+# Collection name inside a per-user directory
+COLLECTION_NAME = "notes"
+
+_shared_client: Optional[Any] = None
+_shared_lock = threading.Lock()
+
+
+def storage_mode() -> str:
+    return SHARED if Config.CHROMA_STORAGE == SHARED else PER_USER
+
+
+def user_db_path(user_id: str) -> str:
+    return os.path.join(Config.CHROMA_DB_PATH, user_id)
+
+
+def tenant_collection_name(user_id: str) -> str:
+    """Collection of one tenant in the shared store. Hashed: Chroma names allow only [a-zA-Z0-9._-], max 63."""
+    return "notes_" + hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:40]
+
+
+def get_shared_client():
+    """The one PersistentClient behind every tenant (created on first call)."""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                import chromadb
+                from chromadb.config import Settings
+
+                os.makedirs(Config.CHROMA_SHARED_PATH, exist_ok=True)
+                settings = Settings()
+                if Config.CHROMA_SHARED_CACHE_MB > 0:
+                    # Keep only recently used tenants' HNSW indexes in memory
+                    settings = Settings(
+                        chroma_segment_cache_policy="LRU",
+                        chroma_memory_limit_bytes=Config.CHROMA_SHARED_CACHE_MB * 1024 * 1024
+                    )
+                _shared_client = chromadb.PersistentClient(path=Config.CHROMA_SHARED_PATH, settings=settings)
+    return _shared_client
+
+
+def tenant_collection(client: Any, user_id: str):
+    """`user_id`'s collection inside the shared client (created if missing)."""
+    return client.get_or_create_collection(
+        name=tenant_collection_name(user_id),
+        embedding_function=get_embedding_function(),
+        metadata={"hnsw:space": "cosine", "user_id": user_id}
+    )
+
+
+def open_store(user_id: str) -> Tuple[Any, Any]:
+    """(client, collection) holding `user_id`'s chunks in the configured storage mode."""
+    if storage_mode() == SHARED:
+        client = get_shared_client()
+        return client, tenant_collection(client, user_id)
+
+    import chromadb
+
+    path = user_db_path(user_id)
+    os.makedirs(path, exist_ok=True)
+    client = chromadb.PersistentClient(path=path)
+    collection = client.get_or_create_collection(
+        name=COLLECTION_NAME,
+        embedding_function=get_embedding_function(),
+        metadata={"hnsw:space": "cosine"}
+    )
+    return client, collection
+
+
+def close_client(client: Any) -> None:
+    """
+    Release a per-user client (SQLite handles + HNSW index). The shared client is left open —
+    it outlives every tenant and is closed by shutdown().
+    """
+    if client is None or client is _shared_client:
+        return
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    # PersistentClient caches one System per path — stop it and drop it from the cache
+    identifier = client._identifier
+    system = SharedSystemClient._identifier_to_system.pop(identifier, None)
+    if system is not None:
+        system.stop()
+
+
+def shutdown() -> None:
+    """Stop the shared client (process shutdown)."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            return
+        client, _shared_client = _shared_client, None
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    system = SharedSystemClient._identifier_to_system.pop(client._identifier, None)
+    if system is not None:
+        system.stop()
@@ -0,0 +1,187 @@
+# backend/app/startup.py
+# Cold start — how long the API took to import and bind, an optional pre-warm that runs once it
+# already accepts connections, and a per-import profile of `import main`.
+#
+#   python -m app.startup                 # top imports by cumulative time (python -X importtime)
+#   python -m app.startup --top 40 --json
+#   GET /api/startup                      # marks + pre-warm timings of the running server
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import Config
+from app.logs import get_logger
+
+STARTED = time.perf_counter()
+
+log = get_logger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use, never by `import main` — /api/startup shows which are in memory
+HEAVY_MODULES = (
+    "chromadb", "sentence_transformers", "torch", "langchain_core", "langchain_text_splitters",
+    "langchain_community", "langchain_google_genai", "langchain_groq", "langchain_openai", "pypdf", "requests"
+)
+
+_marks: Dict[str, float] = {}
+_prewarm: Dict[str, Any] = {}
+
+
+def mark(name: str) -> None:
+    """Record seconds since this module was imported (the first thing main.py does)."""
+    _marks[name] = round(time.perf_counter() - STARTED, 3)
+
+
+def _warm_chroma() -> None:
+    from app.rag import store
+
+    if store.storage_mode() == store.SHARED:
+        store.get_shared_client()
+    else:
+        import chromadb  # noqa: F401
+
+
+def _warm_embeddings() -> None:
+    from app.rag.embeddings import get_embedding_function
+
+    get_embedding_function().embed_query("warm up")  # uncached: a cache hit would skip the model load
+
+
+def _warm_reranker() -> None:
+    from app.rag.rerank import get_reranker
+
+    reranker = get_reranker()
+    if reranker is not None:
+        reranker.score("warm up", ["warm up"])
+
+
+def _warm_llm() -> None:
+    from app.rag.llm_pool import get_llm_pool
+
+    get_llm_pool()
+
+
+def _warm_loaders() -> None:
+    from app.rag.pipeline import get_splitter
+
+    get_splitter()
+    from langchain_community.document_loaders import PyPDFLoader, TextLoader  # noqa: F401
+
+
+PREWARM_STEPS: Dict[str, Callable[[], None]] = {
+    "chroma": _warm_chroma,
+    "embeddings": _warm_embeddings,
+    "reranker": _warm_reranker,
+    "llm": _warm_llm,
+    "loaders": _warm_loaders
+}
+
+
+async def prewarm(steps: List[str]) -> None:
+    """Run each step on the I/O pool, one after another, timing it. Failures are recorded, not raised."""
+    from app.executor import run_in_io
+
+    for name in steps:
+        step = PREWARM_STEPS.get(name)
+        if step is None:
+            _prewarm[name] = {"error": "unknown step"}
+            continue
+        start = time.perf_counter()
+        try:
+            await run_in_io(step)
+            _prewarm[name] = {"seconds": round(time.perf_counter() - start, 3)}
+        except Exception as e:
+            _prewarm[name] = {"seconds": round(time.perf_counter() - start, 3), "error": str(e)}
+            log.warning("pre-warm step failed", extra={"step": name, "error": str(e)})
+    mark("prewarmed")
+
+
+def start_prewarm() -> Optional["asyncio.Task"]:
+    """
+    Schedule PREWARM steps without awaiting them — called from the startup hook, so they run
+    once the server is already accepting connections. /health answers the whole time.
+    """
+    steps = [s.strip() for s in Config.PREWARM.split(",") if s.strip()]
+    if not steps:
+        return None
+    return asyncio.get_running_loop().create_task(prewarm(steps))
+
+
+def report() -> Dict[str, Any]:
+    return {
+        "marks_s": dict(_marks),
+        "prewarm": {"steps": Config.PREWARM, **_prewarm},
+        "heavy_modules_loaded": sorted(m for m in HEAVY_MODULES if m in sys.modules)
+    }
+
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\| ( *)(\S+)")
+
+
+def import_profile(target: str = "main", top: int = 25) -> Dict[str, Any]:
+    """
+    `python -X importtime -c "import <target>"` in a fresh interpreter. Returns the total and the
+    `top` slowest imports by cumulative time (depth = nesting level under the target).
+    """
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+
+    rows = []
+    for line in out.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append({
+                "module": module,
+                "depth": len(indent) // 2,
+                "self_ms": round(int(self_us) / 1000, 1),
+                "cumulative_ms": round(int(cumulative_us) / 1000, 1)
+            })
+    target_row = next((r for r in rows if r["module"] == target), None)
+    return {
+        "target": target,
+        "ok": out.returncode == 0,
+        "error": out.stderr.strip().splitlines()[-1] if out.returncode != 0 and out.stderr.strip() else None,
+        "wall_s": round(wall, 3),
+        "import_ms": target_row["cumulative_ms"] if target_row else None,
+        "modules": len(rows),
+        "heavy_imported": sorted({r["module"].split(".")[0] for r in rows} & set(HEAVY_MODULES)),
+        "slowest": sorted(rows, key=lambda r: -r["cumulative_ms"])[:top]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-import cold-start profile of the API")
+    parser.add_argument("--target", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--json", action="store_true", help="print the raw report")
+    args = parser.parse_args()
+
+    profile = import_profile(args.target, args.top)
+    if args.json:
+        print(json.dumps(profile, indent=2))
+        return
+    if not profile["ok"]:
+        sys.exit(f"import {args.target} failed: {profile['error']}")
+
+    print(f"import {args.target}: {profile['import_ms']} ms ({profile['modules']} modules, "
+          f"{profile['wall_s']} s wall with interpreter start)")
+    print(f"heavy modules imported: {', '.join(profile['heavy_imported']) or 'none'}")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for row in profile["slowest"]:
+        print(f"{row['cumulative_ms']:>14} {row['self_ms']:>9}  {'  ' * row['depth']}{row['module']}")
+
+
+if __name__ == "__main__":
+    main()
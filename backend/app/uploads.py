@@ -0,0 +1,354 @@
+# backend/app/uploads.py
+# Receiving uploads — /api/upload is parsed as it streams in (type, content and size checked on the
+# way, nothing buffered whole); bulk uploads (many files and/or zip archives) land in one directory per batch
+import codecs
+import hashlib
+import os
+import zipfile
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+from werkzeug.utils import secure_filename
+
+from app.config import Config
+from app.executor import run_in_io
+
+COPY_BLOCK = 1024 * 1024
+SNIFF_BYTES = 1024  # PDF readers accept "%PDF-" anywhere in the first 1 KB
+MULTIPART_OVERHEAD = 64 * 1024  # boundaries + part headers on top of the file itself
+
+
+class UploadRejected(Exception):
+    """One file of an upload cannot be accepted (type, content, size, archive limits)."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def extension(filename: str) -> str:
+    return filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+
+
+def allowed_file(filename: str) -> bool:
+    return extension(filename) in Config.ALLOWED_EXTENSIONS
+
+
+def sniff(filename: str, head: bytes) -> Optional[str]:
+    """Why the first bytes do not match the extension, or None if they do."""
+    if extension(filename) == "pdf":
+        return None if b"%PDF-" in head[:SNIFF_BYTES] else "File does not look like a PDF"
+    if b"\x00" in head:
+        return "Text file contains binary data"
+    return None
+
+
+def too_large(limit: int) -> UploadRejected:
+    return UploadRejected(f"File is larger than {limit // (1024 * 1024)} MB", 413)
+
+
+def copy_limited(src: BinaryIO, dst_path: str, limit: int, head: bytes = b"") -> int:
+    """
+    Copy in 1 MB blocks (after `head`, bytes already read from `src`), giving up and removing
+    the partial file once `limit` bytes are exceeded.
+    """
+    size = 0
+    try:
+        with open(dst_path, "wb") as dst:
+            for block in iter(lambda: head or src.read(COPY_BLOCK), b""):
+                head = b""
+                size += len(block)
+                if size > limit:
+                    raise too_large(limit)
+                dst.write(block)
+    except BaseException:
+        try:
+            os.remove(dst_path)
+        except OSError:
+            pass
+        raise
+    return size
+
+
+class _Batch:
+    """Names, count and total size of one bulk upload, checked as files are written."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.saved: List[str] = []
+        self.rejected: List[Dict[str, str]] = []
+        self.total_bytes = 0
+
+    def reject(self, filename: str, error: str) -> None:
+        self.rejected.append({"filename": filename, "error": error})
+
+    def save(self, filename: str, src: BinaryIO) -> None:
+        name = secure_filename(filename)
+        if not name or not allowed_file(name):
+            allowed = ", ".join(sorted(Config.ALLOWED_EXTENSIONS))
+            raise UploadRejected(f"Unsupported file type (allowed: {allowed})", 415)
+        if name in self.saved:
+            raise UploadRejected("Another file in this upload has the same name")
+        if len(self.saved) >= Config.BULK_MAX_FILES:
+            raise UploadRejected(f"Too many files (max {Config.BULK_MAX_FILES} per upload)", 413)
+
+        head = src.read(SNIFF_BYTES)
+        mismatch = sniff(name, head)
+        if mismatch:
+            raise UploadRejected(mismatch, 415)
+
+        remaining = Config.BULK_MAX_BYTES - self.total_bytes
+        limit = min(Config.MAX_CONTENT_LENGTH, remaining)
+        try:
+            self.total_bytes += copy_limited(src, os.path.join(self.directory, name), limit, head)
+        except UploadRejected:
+            if limit == remaining:
+                raise UploadRejected(f"Upload exceeds {Config.BULK_MAX_BYTES // (1024 * 1024)} MB in total", 413)
+            raise
+        self.saved.append(name)
+
+    def expand_zip(self, archive_name: str, src: BinaryIO) -> None:
+        """Every supported file in the archive, flattened to its base name; folders and dotfiles are skipped."""
+        try:
+            archive = zipfile.ZipFile(src)
+        except zipfile.BadZipFile:
+            self.reject(archive_name, "Not a valid zip archive")
+            return
+        with archive:
+            for info in archive.infolist():
+                base = os.path.basename(info.filename)
+                if info.is_dir() or not base or base.startswith(".") or info.filename.startswith("__MACOSX/"):
+                    continue
+                label = f"{archive_name}/{info.filename}"
+                try:
+                    with archive.open(info) as member:
+                        self.save(base, member)
+                except UploadRejected as e:
+                    self.reject(label, str(e))
+                except (RuntimeError, zipfile.BadZipFile, OSError) as e:  # encrypted / corrupt member
+                    self.reject(label, f"Could not extract: {e}")
+
+
+def save_batch(uploads: Sequence[Any], directory: str) -> Tuple[List[str], List[Dict[str, str]]]:
+    """
+    Write a bulk upload (FastAPI UploadFiles) into `directory`, one file per name; zip archives
+    are expanded. Returns (saved filenames, rejected [{"filename", "error"}]) — a rejected file
+    never stops the rest of the batch.
+    """
+    os.makedirs(directory, exist_ok=True)
+    batch = _Batch(directory)
+    for upload in uploads:
+        filename = upload.filename or ""
+        if extension(filename) == "zip":
+            batch.expand_zip(filename, upload.file)
+            continue
+        try:
+            batch.save(filename, upload.file)
+        except UploadRejected as e:
+            batch.reject(filename, str(e))
+    return batch.saved, batch.rejected
+
+
+def batch_files(directory: str) -> List[Tuple[str, str]]:
+    """(path, filename) of every file saved by save_batch."""
+    return [(os.path.join(directory, name), name) for name in sorted(os.listdir(directory))]
+
+
+class ReceivedUpload:
+    """
+    One file arriving from the request stream.
+    - extension checked from the part header, before any content is read
+    - first SNIFF_BYTES checked against the extension (PDF magic, no NULs in text); text must be UTF-8
+    - aborted as soon as it passes MAX_CONTENT_LENGTH
+    - text up to TEXT_INLINE_MAX_BYTES stays in memory (`text`), anything else is written to `path`
+    """
+
+    def __init__(self, filename: str, directory: str, prefix: str):
+        self.filename = secure_filename(filename)
+        if not self.filename:
+            raise UploadRejected("No file selected")
+        if not allowed_file(self.filename):
+            allowed = ", ".join(sorted(Config.ALLOWED_EXTENSIONS))
+            raise UploadRejected(f"Unsupported file type (allowed: {allowed})", 415)
+
+        self.is_text = extension(self.filename) != "pdf"
+        self.path = os.path.join(directory, f"{prefix}_{self.filename}")
+        self.text: Optional[str] = None
+        self.size = 0
+        self.complete = False
+
+        self._digest = hashlib.sha256()
+        self._decoder = codecs.getincrementaldecoder("utf-8")() if self.is_text else None
+        self._buffer = bytearray()
+        self._sniffed = False
+        self._file: Optional[BinaryIO] = None
+
+    @property
+    def content_hash(self) -> str:
+        return self._digest.hexdigest()
+
+    @property
+    def on_disk(self) -> bool:
+        return not self.is_text or self.size > Config.TEXT_INLINE_MAX_BYTES
+
+    async def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > Config.MAX_CONTENT_LENGTH:
+            raise too_large(Config.MAX_CONTENT_LENGTH)
+        self._digest.update(data)
+        self._buffer += data
+        if self._decoder is not None:
+            self._check_utf8(data)
+        if not self._sniffed and len(self._buffer) >= SNIFF_BYTES:
+            self._sniff()
+        if self.on_disk and len(self._buffer) >= COPY_BLOCK:
+            await self._spill()
+
+    async def close(self) -> None:
+        if self.size == 0:
+            raise UploadRejected("File is empty")
+        if not self._sniffed:
+            self._sniff()
+        if self._decoder is not None:
+            self._check_utf8(b"", final=True)
+        if self.on_disk:
+            await self._spill()
+            await run_in_io(self._file.close)
+        else:
+            self.text = self._buffer.decode("utf-8")
+            self._buffer = bytearray()
+        self.complete = True
+
+    def discard(self) -> None:
+        """Drop a rejected or interrupted upload (partial file included)."""
+        self._buffer = bytearray()
+        if self._file is not None:
+            self._file.close()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def _sniff(self) -> None:
+        mismatch = sniff(self.filename, bytes(self._buffer[:SNIFF_BYTES]))
+        if mismatch:
+            raise UploadRejected(mismatch, 415)
+        self._sniffed = True
+
+    def _check_utf8(self, data: bytes, final: bool = False) -> None:
+        try:
+            self._decoder.decode(data, final)
+        except UnicodeDecodeError:
+            raise UploadRejected("Text file is not UTF-8", 415)
+
+    async def _spill(self) -> None:
+        if not self._buffer:
+            return
+        block, self._buffer = bytes(self._buffer), bytearray()
+        if self._file is None:
+            self._file = await run_in_io(open, self.path, "wb")
+        await run_in_io(self._file.write, block)
+
+
+def _multipart():
+    """python-multipart's streaming parser (renamed to python_multipart in 0.0.13)."""
+    try:
+        import python_multipart as multipart
+        from python_multipart.multipart import parse_options_header
+    except ImportError:
+        import multipart
+        from multipart.multipart import parse_options_header
+    return multipart, parse_options_header
+
+
+class _PartEvents:
+    """Collects python-multipart callbacks; receive_upload() acts on them between parser writes."""
+
+    def __init__(self):
+        self.events: List[Tuple[str, Any]] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._field = b""
+        self._value = b""
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end
+        }
+
+    def take(self) -> List[Tuple[str, Any]]:
+        events, self.events = self.events, []
+        return events
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._field.lower()] = self._value
+        self._field, self._value = b"", b""
+
+    def on_headers_finished(self) -> None:
+        self.events.append(("part", self._headers))
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        self.events.append(("data", data[start:end]))
+
+    def on_part_end(self) -> None:
+        self.events.append(("end", None))
+
+
+async def receive_upload(request: Any, directory: str, prefix: str, field: str = "file") -> ReceivedUpload:
+    """
+    Read a multipart/form-data request chunk by chunk and receive its `field` file part.
+    Raises UploadRejected (status 400 / 413 / 415) as soon as a check fails — the rest of the body
+    is never read, and nothing of a rejected file stays on disk.
+    """
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > Config.MAX_CONTENT_LENGTH + MULTIPART_OVERHEAD:
+        raise too_large(Config.MAX_CONTENT_LENGTH)
+
+    multipart, parse_options_header = _multipart()
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadRejected(f"Expected multipart/form-data with a '{field}' file")
+
+    parts = _PartEvents()
+    parser = multipart.MultipartParser(params[b"boundary"], parts.callbacks())
+    upload: Optional[ReceivedUpload] = None
+    receiving = False
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, value in parts.take():
+                if kind == "part":
+                    _, options = parse_options_header(value.get(b"content-disposition", b""))
+                    receiving = options.get(b"name") == field.encode() and upload is None
+                    if receiving:
+                        filename = options.get(b"filename", b"").decode("utf-8", "replace")
+                        upload = ReceivedUpload(filename, directory, prefix)
+                elif kind == "data" and receiving:
+                    await upload.write(value)
+                elif kind == "end" and receiving:
+                    await upload.close()
+                    receiving = False
+        parser.finalize()
+    except BaseException:
+        if upload is not None:
+            upload.discard()
+        raise
+
+    if upload is None or not upload.complete:
+        if upload is not None:
+            upload.discard()
+        raise UploadRejected("No file selected")
+    return upload
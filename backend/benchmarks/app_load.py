@@ -0,0 +1,246 @@
+# backend/benchmarks/app_load.py
+# End-to-end load test of the FastAPI app with a local fake LLM (benchmarks/fake_llm.py):
+# starts main.py under uvicorn in a fresh directory, uploads the synthetic corpus for every
+# simulated user through /api/upload, then drives /api/ask (or /api/ask/stream) at each
+# concurrency level and reports throughput and p50/p95/p99 latency. Offline: no API keys needed.
+#
+#   pip install -r benchmarks/requirements.txt   (httpx)
+#   python benchmarks/app_load.py
+#   python benchmarks/app_load.py --concurrency 1,8,32 --requests 128 --endpoint stream --out load.json
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from corpus import QUESTIONS, write_corpus
+from timing import percentile, run_info
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def serve(port: int, latency: float, tokens_per_s: float, answer_kb: float) -> None:
+    """Run the app with the fake LLM in this process (invoked through --serve)."""
+    sys.path.insert(0, BACKEND_DIR)
+    import uvicorn
+
+    import fake_llm
+
+    fake_llm.install(latency, tokens_per_s, answer_kb)
+    from main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(client: httpx.AsyncClient, url: str, server: subprocess.Popen, timeout: float) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            if (await client.get(f"{url}/health")).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"server not ready after {timeout}s")
+
+
+async def upload(client: httpx.AsyncClient, url: str, user_id: str, path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        r = await client.post(f"{url}/api/upload", params={"user_id": user_id},
+                              files={"file": (os.path.basename(path), f.read())})
+    r.raise_for_status()
+    job = r.json()
+    while job["status"] in ("queued", "running"):
+        await asyncio.sleep(0.2)
+        job = (await client.get(f"{url}/api/jobs/{job['job_id']}", params={"user_id": user_id})).json()
+    if job["status"] != "done":
+        raise RuntimeError(f"ingest of {path} for {user_id} failed: {job.get('error')}")
+    return job["result"]
+
+
+async def seed(client: httpx.AsyncClient, url: str, users: int, files: List[str]) -> Dict[str, Any]:
+    """Every user uploads the whole corpus, users in parallel (like a class at the start of term)."""
+    start = time.perf_counter()
+
+    async def one_user(u: int) -> int:
+        chunks = 0
+        for path in files:
+            chunks += (await upload(client, url, f"loadtest_{u}", path)).get("chunks", 0)
+        return chunks
+
+    chunks = await asyncio.gather(*(one_user(u) for u in range(users)))
+    elapsed = time.perf_counter() - start
+    return {
+        "users": users,
+        "files": users * len(files),
+        "chunks": sum(chunks),
+        "seconds": round(elapsed, 2),
+        "files_per_s": round(users * len(files) / elapsed, 2) if elapsed else None
+    }
+
+
+async def ask_once(client: httpx.AsyncClient, url: str, endpoint: str, payload: Dict[str, Any]) -> Optional[float]:
+    """Time to first token in ms for the stream endpoint (None for /api/ask)."""
+    if endpoint == "ask":
+        r = await client.post(f"{url}/api/ask", json=payload)
+        r.raise_for_status()
+        return None
+
+    start = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", f"{url}/api/ask/stream", json=payload) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if first_token is None and line == "event: token":
+                first_token = (time.perf_counter() - start) * 1000
+    return first_token
+
+
+async def run_level(client: httpx.AsyncClient, url: str, endpoint: str, concurrency: int, requests: int,
+                    users: int, mode: str) -> Dict[str, Any]:
+    latencies: List[float] = []
+    first_tokens: List[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        payload = {"question": QUESTIONS[i % len(QUESTIONS)], "mode": mode, "user_id": f"loadtest_{i % users}"}
+        async with sem:
+            start = time.perf_counter()
+            try:
+                first_token = await ask_once(client, url, endpoint, payload)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if first_token is not None:
+                    first_tokens.append(first_token)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - start
+
+    result = {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1)
+    }
+    if first_tokens:
+        result.update(
+            first_token_p50_ms=round(percentile(first_tokens, 50), 1),
+            first_token_p95_ms=round(percentile(first_tokens, 95), 1)
+        )
+    return result
+
+
+async def run(args: argparse.Namespace, url: str, server: subprocess.Popen, files: List[str]) -> Dict[str, Any]:
+    levels = [int(c) for c in args.concurrency.split(",")]
+    users = args.users or max(levels)
+    endpoints = ["ask", "stream"] if args.endpoint == "both" else [args.endpoint]
+    limits = httpx.Limits(max_connections=max(levels) + 8)
+    async with httpx.AsyncClient(timeout=300, limits=limits) as client:
+        startup_s = await wait_ready(client, url, server, args.startup_timeout)
+        print(f"server ready in {startup_s:.1f}s, seeding {users} users x {len(files)} files")
+        ingest = await seed(client, url, users, files)
+        print(f"ingest: {ingest['files']} files / {ingest['chunks']} chunks in {ingest['seconds']}s")
+
+        # One untimed request per user: opens every store before the first level is measured
+        await run_level(client, url, "ask", min(users, 8), users, users, args.mode)
+
+        results = []
+        for endpoint in endpoints:
+            for level in levels:
+                res = await run_level(client, url, endpoint, level, args.requests, users, args.mode)
+                ttft = f" ttft p50={res['first_token_p50_ms']}ms" if "first_token_p50_ms" in res else ""
+                print(f"{endpoint:>6} c={level:<4} p50={res['p50_ms']}ms p95={res['p95_ms']}ms "
+                      f"p99={res['p99_ms']}ms rps={res['throughput_rps']} errors={res['errors']}{ttft}")
+                results.append(res)
+
+        health = (await client.get(f"{url}/health")).json()
+    return {"startup_s": round(startup_s, 2), "ingest": ingest, "levels": results, "health": health}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test with a fake LLM provider")
+    parser.add_argument("--concurrency", default="1,4,16,32", help="comma separated levels")
+    parser.add_argument("--requests", type=int, default=64, help="requests per level")
+    parser.add_argument("--users", type=int, default=0, help="simulated users (default: the highest level)")
+    parser.add_argument("--endpoint", default="ask", choices=("ask", "stream", "both"))
+    parser.add_argument("--mode", default="study")
+    parser.add_argument("--pdfs", type=int, default=1)
+    parser.add_argument("--pages", type=int, default=20, help="pages per generated PDF")
+    parser.add_argument("--notes", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake LLM seconds to first token")
+    parser.add_argument("--llm-tps", type=float, default=80.0, help="fake LLM tokens per second, 0 = instant")
+    parser.add_argument("--answer-kb", type=float, default=2.0, help="fake LLM answer size")
+    parser.add_argument("--answer-cache", action="store_true", help="keep the semantic answer cache on")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.llm_latency, args.llm_tps, args.answer_kb)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="ff_app_load_")
+    files = write_corpus(os.path.join(workdir, "corpus"), args.pdfs, args.pages, args.notes)
+
+    # Fresh stores, catalog, jobs and keyword index; identical questions must reach the LLM
+    rundir = tempfile.mkdtemp(dir=workdir)
+    env = dict(os.environ, EMBEDDING_CACHE_PATH="", ANONYMIZED_TELEMETRY="False", PREWARM="chroma,embeddings")
+    if not args.answer_cache:
+        env["ANSWER_CACHE_MAX_ENTRIES"] = "0"
+    port = free_port()
+    with open(os.path.join(workdir, "server.log"), "w") as log:
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", str(port),
+             "--llm-latency", str(args.llm_latency), "--llm-tps", str(args.llm_tps),
+             "--answer-kb", str(args.answer_kb)],
+            cwd=rundir, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        try:
+            result = asyncio.run(run(args, f"http://127.0.0.1:{port}", server, files))
+        except RuntimeError as e:
+            sys.exit(f"{e} (server log: {log.name})")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        "benchmark": "app_load",
+        "run": run_info(),
+        "corpus": {"pdfs": args.pdfs, "pages": args.pages, "notes": args.notes},
+        "fake_llm": {"latency_s": args.llm_latency, "tokens_per_s": args.llm_tps, "answer_kb": args.answer_kb},
+        "answer_cache": args.answer_cache,
+        **result
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps({k: v for k, v in report.items() if k != "health"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# backend/benchmarks/ask_load.py
+# Concurrent /api/ask load test against a running server — latency should stay flat as concurrency grows
+# (benchmarks/app_load.py starts its own server with a fake LLM)
+#
+#   pip install -r benchmarks/requirements.txt   (httpx)
+#   python benchmarks/ask_load.py --url http://localhost:8000 --concurrency 1,4,16,32
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from timing import percentile
+
+
+async def run_level(client: httpx.AsyncClient, url: str, concurrency: int, requests: int,
+                    question: str, mode: str) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with sem:
+            start = time.perf_counter()
+            try:
+                r = await client.post(f"{url}/api/ask", json={
+                    "question": question,
+                    "mode": mode,
+                    "user_id": f"loadtest_{i % concurrency}"
+                })
+                r.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "mean_ms": round(statistics.mean(latencies), 1) if latencies else 0
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Concurrent /api/ask latency test")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", default="1,4,16,32", help="comma separated levels")
+    parser.add_argument("--requests", type=int, default=64, help="requests per level")
+    parser.add_argument("--question", default="Explain normalization")
+    parser.add_argument("--mode", default="study")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    results = []
+    async with httpx.AsyncClient(timeout=120) as client:
+        for level in levels:
+            res = await run_level(client, args.url, level, args.requests, args.question, args.mode)
+            print(f"c={level:<4} p50={res['p50_ms']}ms p95={res['p95_ms']}ms "
+                  f"rps={res['throughput_rps']} errors={res['errors']}")
+            results.append(res)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"benchmark": "ask_load", "url": args.url, "levels": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
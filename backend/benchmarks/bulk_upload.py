@@ -0,0 +1,102 @@
+# backend/benchmarks/bulk_upload.py
+# Many small notes — one aadd_or_replace_file per file (50 /api/upload calls) vs one bulk ingest
+# (/api/upload/batch). Each mode runs in a fresh process and Chroma directory, embedding cache off.
+#
+#   python benchmarks/bulk_upload.py                    # 50 generated notes of ~2 KB
+#   python benchmarks/bulk_upload.py --files 200 --kb 8 --out bulk.json
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+from corpus import write_notes
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_child(mode: str, notes_dir: str) -> Dict[str, Any]:
+    """One ingest of every note in this process (invoked through --child)."""
+    sys.path.insert(0, BACKEND_DIR)
+    from app.rag.pipeline import FocusForgeRAG
+    from app.uploads import batch_files
+    from app import executor
+
+    files = batch_files(notes_dir)
+    rag = FocusForgeRAG(f"bench_{mode}")
+    rag.collection.count()  # open / warm the store outside the timed part
+    rag.embed_and_retrieve("warm up the embedding model")
+
+    async def ingest():
+        if mode == "sequential":
+            return [await rag.aadd_or_replace_file(path, name) for path, name in files]
+        return (await rag.aadd_or_replace_files(files))["files"]
+
+    start = time.perf_counter()
+    results = asyncio.run(ingest())
+    elapsed = time.perf_counter() - start
+
+    stored = rag.collection.count()
+    executor.shutdown()
+    return {
+        "mode": mode,
+        "files": len(files),
+        "chunks": sum(r.get("chunks", 0) for r in results),
+        "stored_chunks": stored,
+        "failed": sum(1 for r in results if r.get("status") == "failed"),
+        "seconds": round(elapsed, 2),
+        "files_per_s": round(len(files) / elapsed, 1) if elapsed else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk upload throughput: per-file calls vs one batch")
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--kb", type=int, default=2, help="size of each generated note")
+    parser.add_argument("--modes", default="sequential,bulk")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--notes", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.notes)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="ff_bulk_bench_")
+    notes_dir = os.path.join(workdir, "notes")
+    os.makedirs(notes_dir)
+    write_notes(notes_dir, args.files, args.kb)
+
+    env = dict(os.environ, EMBEDDING_CACHE_PATH="", ANONYMIZED_TELEMETRY="False")
+    results = []
+    for mode in args.modes.split(","):
+        rundir = tempfile.mkdtemp(dir=workdir)  # fresh Chroma dir, catalog and keyword index
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", mode, "--notes", notes_dir],
+            cwd=rundir, env=env, capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            sys.exit(f"{mode} run failed:\n{out.stderr[-2000:]}")
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{mode:>10}: {result['files']} files / {result['chunks']} chunks in {result['seconds']}s "
+              f"→ {result['files_per_s']} files/s")
+
+    report = {"files": args.files, "kb_per_file": args.kb, "cpu_count": os.cpu_count(), "results": results}
+    if len(results) == 2 and results[1]["seconds"]:
+        report["speedup"] = round(results[0]["seconds"] / results[1]["seconds"], 2)
+        print(f"speedup: {report['speedup']}x")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# backend/benchmarks/compare.py
+# Diff two benchmark reports (any --out JSON from this directory): every latency / throughput
+# number present in both, with the relative change; changes past --threshold in the wrong
+# direction are regressions (exit 1 with --fail, for CI).
+#
+#   python benchmarks/compare.py base.json head.json
+#   python benchmarks/compare.py base.json head.json --threshold 5 --fail
+import argparse
+import json
+import sys
+from typing import Any, Dict, Optional
+
+# List entries are matched by the first of these keys they carry (else by position)
+ID_KEYS = ("name", "mode", "backend", "endpoint", "concurrency", "kb")
+SKIP = ("run", "health")  # run header and server stats snapshot are context, not results
+
+
+def flatten(value: Any, prefix: str = "", out: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """{"results.retrieve.p95_ms": 12.3, "levels[ask/16].throughput_rps": 40.1, ...}"""
+    out = {} if out is None else out
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if not prefix and key in SKIP:
+                continue
+            flatten(item, f"{prefix}.{key}" if prefix else key, out)
+    elif isinstance(value, list):
+        for position, item in enumerate(value):
+            label = str(position)
+            if isinstance(item, dict):
+                ids = [str(item[k]) for k in ID_KEYS if k in item]
+                label = "/".join(ids) or label
+            flatten(item, f"{prefix}[{label}]", out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = float(value)
+    return out
+
+
+def direction(key: str) -> int:
+    """+1 higher is better, -1 lower is better, 0 not a performance number."""
+    name = key.rsplit(".", 1)[-1]
+    if name.endswith(("_per_s", "_rps")) or name in ("speedup",):
+        return 1
+    if name.endswith(("_ms", "_s", "_mb")) or name in ("seconds", "errors", "failed"):
+        return -1
+    return 0
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    a, b = flatten(base), flatten(head)
+    rows, regressions = [], []
+    for key in sorted(a.keys() & b.keys()):
+        sign = direction(key)
+        if not sign:
+            continue
+        old, new = a[key], b[key]
+        change = (new - old) / old * 100 if old else (0.0 if new == old else float("inf"))
+        row = {"metric": key, "base": old, "head": new, "change_pct": round(change, 1)}
+        rows.append(row)
+        if change * sign < -threshold:
+            regressions.append(row)
+    return {"rows": rows, "regressions": regressions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON reports")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change that counts")
+    parser.add_argument("--all", action="store_true", help="also print changes within the threshold")
+    parser.add_argument("--fail", action="store_true", help="exit 1 if anything regressed")
+    parser.add_argument("--out", help="write the comparison as JSON to this file")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    for label, report in (("base", base), ("head", head)):
+        run = report.get("run", {})
+        dirty = " (dirty)" if run.get("dirty") else ""
+        print(f"{label}: {report.get('benchmark', '?')} @ {run.get('commit')}{dirty} {run.get('timestamp', '')}")
+
+    result = compare(base, head, args.threshold)
+    regressed = {row["metric"] for row in result["regressions"]}
+    for row in result["rows"]:
+        if not args.all and abs(row["change_pct"]) < args.threshold:
+            continue
+        flag = "REGRESSION" if row["metric"] in regressed else ""
+        print(f"{row['metric']:<60} {row['base']:>12g} → {row['head']:<12g} {row['change_pct']:+7.1f}% {flag}")
+    print(f"{len(result['rows'])} metrics compared, {len(regressed)} regressed beyond {args.threshold}%")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.fail and regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# backend/benchmarks/corpus.py
+# Synthetic study material shared by the benchmarks — text-only PDFs and markdown notes,
+# deterministic for a given seed so runs on different commits index the same content.
+#
+#   python benchmarks/corpus.py /tmp/corpus                        # 2 PDFs x 50 pages + 20 notes
+#   python benchmarks/corpus.py /tmp/corpus --pdfs 5 --pages 200 --notes 100 --kb 8
+import argparse
+import os
+import random
+from typing import List
+
+WORDS = ("normalization functional dependency relation schema key index transaction "
+         "isolation lock recovery query optimizer join tuple attribute closure").split()
+
+# Questions whose answers are in the corpus (load tests cycle through them)
+QUESTIONS = [
+    "Explain normalization and functional dependency",
+    "How does transaction isolation relate to locks?",
+    "What does the query optimizer do with a join?",
+    "Define attribute closure of a relation schema",
+    "How is recovery handled after a transaction fails?",
+    "Why does an index speed up a query?"
+]
+
+# Questions the corpus says nothing about (relevance gate calibration)
+OFF_TOPIC_QUESTIONS = [
+    "Explain photosynthesis in C4 plants",
+    "Who won the football world cup in 1998?",
+    "What were the main causes of the French Revolution?",
+    "How do I make a sourdough starter?",
+    "Describe the life cycle of a star",
+    "What is the capital of Australia?"
+]
+
+
+def write_synthetic_pdf(path: str, pages: int, lines_per_page: int = 45) -> None:
+    """Minimal text-only PDF (Helvetica, one content stream per page) — no extra dependencies."""
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in once the page tree exists
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    kids = []
+    for p in range(pages):
+        lines = []
+        for l in range(lines_per_page):
+            words = " ".join(WORDS[(p * 7 + l * 3 + w) % len(WORDS)] for w in range(12))
+            lines.append(f"({p + 1}.{l + 1} {words}) Tj T*")
+        stream = ("BT /F1 10 Tf 12 TL 50 780 Td\n" + "\n".join(lines) + "\nET").encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_obj, font, content)
+        ))
+
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids)
+    )
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            len(objects) + 1, catalog, xref
+        ))
+
+
+def write_notes(directory: str, files: int, kb: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    for n in range(files):
+        paragraphs = []
+        while sum(len(p) for p in paragraphs) < kb * 1024:
+            paragraphs.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))) + ".")
+        with open(os.path.join(directory, f"note_{n:03d}.md"), "w") as f:
+            f.write(f"# Lecture {n + 1}\n\n" + "\n\n".join(paragraphs))
+
+
+def write_corpus(directory: str, pdfs: int = 2, pages: int = 50, notes: int = 20, kb: int = 2) -> List[str]:
+    """`pdfs` PDFs of `pages` pages plus `notes` markdown notes of ~`kb` KB. Returns the file paths."""
+    os.makedirs(directory, exist_ok=True)
+    for n in range(pdfs):
+        write_synthetic_pdf(os.path.join(directory, f"lecture_{n:03d}.pdf"), pages)
+    write_notes(directory, notes, kb)
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic benchmark corpus")
+    parser.add_argument("directory")
+    parser.add_argument("--pdfs", type=int, default=2)
+    parser.add_argument("--pages", type=int, default=50, help="pages per PDF")
+    parser.add_argument("--notes", type=int, default=20)
+    parser.add_argument("--kb", type=int, default=2, help="size of each note")
+    args = parser.parse_args()
+
+    files = write_corpus(args.directory, args.pdfs, args.pages, args.notes, args.kb)
+    total = sum(os.path.getsize(path) for path in files)
+    print(f"{len(files)} files, {total // 1024} KB in {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# backend/benchmarks/embed_backends.py
+# Embedding backends on CPU — torch vs ONNX fp32 vs ONNX int8: load time, sentences/sec, peak RSS,
+# and how close each backend's vectors are to torch's (existing collections stay valid above --tolerance).
+# Each backend runs in a fresh process so RSS is comparable.
+#
+#   pip install -r benchmarks/requirements.txt   (onnx, to quantize for onnx-int8)
+#   python benchmarks/embed_backends.py
+#   python benchmarks/embed_backends.py --sentences 5000 --backends torch,onnx-int8 --out embed.json
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from timing import peak_rss_mb
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = ("normalization functional dependency relation schema key index transaction "
+         "isolation lock recovery query optimizer join tuple attribute closure gradient "
+         "descent backpropagation entropy variance eigenvalue matrix kernel").split()
+
+# Minimum cosine to torch, per backend, for the vectors to count as interchangeable
+DEFAULT_TOLERANCE = {"onnx": 0.9999, "onnx-int8": 0.98}
+
+
+def sentences(n: int, seed: int = 7) -> List[str]:
+    """Chunk-like texts from 5 to ~150 words, like real notes."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.choice((5, 12, 40, 150)))) for _ in range(n)]
+
+
+def run_child(backend: str, n: int, batch_size: int, vectors_path: str) -> Dict[str, Any]:
+    """Load one backend and embed `n` texts in this process (invoked through --child)."""
+    import numpy as np
+
+    sys.path.insert(0, BACKEND_DIR)
+    from app.rag.embeddings import SharedEmbeddingFunction
+    from app.config import Config
+
+    texts = sentences(n)
+    ef = SharedEmbeddingFunction(Config.EMBEDDING_MODEL, batch_size=batch_size, backend=backend)
+    rss_start = peak_rss_mb()
+
+    start = time.perf_counter()
+    ef._load()
+    load_s = time.perf_counter() - start
+
+    ef._encode(texts[:batch_size])  # first call pays for graph / kernel warm-up
+    start = time.perf_counter()
+    vectors = ef._encode(texts)
+    elapsed = time.perf_counter() - start
+
+    np.save(vectors_path, np.asarray(vectors, dtype=np.float32))
+    stats = ef.stats()
+    return {
+        "backend": backend,
+        "texts": n,
+        "load_s": round(load_s, 2),
+        "seconds": round(elapsed, 2),
+        "sentences_per_s": round(n / elapsed, 1) if elapsed else None,
+        "model_mb": stats["model_params_mb"],
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_load_mb": rss_start,
+        "torch_imported": "torch" in sys.modules
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backends: speed, memory and vector drift")
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--tolerance", type=float, help="min cosine to torch for every backend")
+    parser.add_argument("--threads", type=int, default=0, help="EMBEDDING_THREADS / torch threads, 0 = default")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--vectors", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.sentences, args.batch, args.vectors)))
+        return
+
+    import numpy as np
+
+    workdir = tempfile.mkdtemp(prefix="ff_embed_bench_")
+    env = dict(os.environ, EMBEDDING_CACHE_PATH="", ANONYMIZED_TELEMETRY="False")
+    if args.threads:
+        env.update(EMBEDDING_THREADS=str(args.threads), OMP_NUM_THREADS=str(args.threads))
+
+    results, vectors = [], {}
+    for backend in args.backends.split(","):
+        path = os.path.join(workdir, f"{backend}.npy")
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", backend, "--sentences", str(args.sentences),
+             "--batch", str(args.batch), "--vectors", path],
+            env=env, capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            sys.exit(f"{backend} run failed:\n{out.stderr[-2000:]}")
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        vectors[backend] = np.load(path)
+        results.append(result)
+
+    failed = []
+    if "torch" in vectors:
+        reference = vectors["torch"]
+        for result in results:
+            if result["backend"] == "torch":
+                continue
+            # Vectors are L2-normalized, so the row-wise dot product is the cosine
+            cosine = (vectors[result["backend"]] * reference).sum(axis=1)
+            tolerance = args.tolerance or DEFAULT_TOLERANCE.get(result["backend"], 0.99)
+            result.update(
+                cosine_to_torch_min=round(float(cosine.min()), 5),
+                cosine_to_torch_mean=round(float(cosine.mean()), 5),
+                tolerance=tolerance,
+                within_tolerance=bool(cosine.min() >= tolerance)
+            )
+            if not result["within_tolerance"]:
+                failed.append(result["backend"])
+
+    for r in results:
+        drift = f", min cosine to torch {r['cosine_to_torch_min']}" if "cosine_to_torch_min" in r else ""
+        print(f"{r['backend']:>10}: {r['sentences_per_s']} sentences/s, load {r['load_s']}s, "
+              f"model {r['model_mb']} MB, peak RSS {r['peak_rss_mb']} MB{drift}")
+
+    report = {"cpu_count": os.cpu_count(), "batch_size": args.batch, "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if failed:
+        sys.exit(f"Vectors drift beyond tolerance for: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
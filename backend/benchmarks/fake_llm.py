@@ -0,0 +1,79 @@
+# backend/benchmarks/fake_llm.py
+# Local stand-in for the Gemini client — fixed latency, answers streamed at a fixed token rate,
+# no network and no API key, so load tests measure FocusForge rather than the provider.
+import asyncio
+import glob
+import os
+import re
+import time
+from typing import AsyncIterator, List
+
+ANSWERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "answers")
+
+
+class FakeMessage:
+    __slots__ = ("content",)
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+def sample_answer(kb: float) -> str:
+    """~`kb` KB of real answer markdown (the formatter corpus), so formatting cost is realistic."""
+    texts = []
+    for path in sorted(glob.glob(os.path.join(ANSWERS_DIR, "*.md"))):
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+    joined = "\n\n".join(texts) or "## Answer\n\n- " + "normalization removes redundancy. " * 64
+    size = max(1, int(kb * 1024))
+    return (joined * (size // len(joined) + 1))[:size]
+
+
+class FakeChatModel:
+    """
+    Duck-types what the router uses of a langchain chat model: `model`, invoke / ainvoke
+    (message with .content) and astream (message chunks). First token after `latency` seconds,
+    then `tokens_per_s` word-sized tokens per second.
+    """
+
+    def __init__(self, latency: float = 0.5, tokens_per_s: float = 80.0, answer_kb: float = 2.0,
+                 model: str = "fake-llm"):
+        self.model = model
+        self.latency = latency
+        self.tokens_per_s = tokens_per_s
+        self.answer = sample_answer(answer_kb)
+        self.tokens: List[str] = re.findall(r"\S+\s*|\s+", self.answer)
+        self.calls = 0
+
+    @property
+    def generation_s(self) -> float:
+        return self.latency + (len(self.tokens) / self.tokens_per_s if self.tokens_per_s > 0 else 0.0)
+
+    def invoke(self, prompt: str) -> FakeMessage:
+        self.calls += 1
+        time.sleep(self.generation_s)
+        return FakeMessage(self.answer)
+
+    async def ainvoke(self, prompt: str) -> FakeMessage:
+        self.calls += 1
+        await asyncio.sleep(self.generation_s)
+        return FakeMessage(self.answer)
+
+    async def astream(self, prompt: str) -> AsyncIterator[FakeMessage]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        delay = 1.0 / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+        for token in self.tokens:
+            if delay:
+                await asyncio.sleep(delay)
+            yield FakeMessage(token)
+
+
+def install(latency: float = 0.5, tokens_per_s: float = 80.0, answer_kb: float = 2.0) -> FakeChatModel:
+    """Make the process-wide LLM pool (app/rag/llm_pool.py) use one FakeChatModel instead of Gemini."""
+    from app.rag import llm_pool
+
+    fake = FakeChatModel(latency, tokens_per_s, answer_kb)
+    llm_pool._shared = llm_pool.LLMPool(clients=[fake])
+    os.environ.setdefault("GOOGLE_API_KEY", "fake-key")  # ask() refuses to run without one
+    return fake
@@ -0,0 +1,340 @@
+# backend/benchmarks/format_answer.py
+# Answer formatting — the old two-step formatter (kept verbatim below as the reference)
+# vs app.rag.formatter. tests/test_formatter.py checks that both modes reproduce the
+# reference byte for byte; here each timed input is compared once before it is timed.
+#
+#   python benchmarks/format_answer.py                     # 10-50 KB answers
+#   python benchmarks/format_answer.py --sizes 10,20,50 --out format.json
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "answers")
+
+sys.path.insert(0, BACKEND_DIR)
+from app.rag.formatter import StreamingFormatter, format_answer  # noqa: E402
+
+
+# -----------------------------
+# Reference: FocusForgeRAG.format_gemini_response / markdown_to_readable_v2 as they shipped
+# -----------------------------
+
+def format_gemini_response(text: str) -> str:
+    """
+    UNIVERSAL MARKDOWN FORMATTER (Upgraded)
+    - Supports Headings (#, ##, ###)
+    - Converts lines ending with ":" into headings (##)
+    - Cleans bullets, numbers, spacing
+    - Preserves code blocks
+    - Converts — and --- to horizontal rules
+    - Supports bold (**text**)
+    - Mobile-friendly output
+    """
+
+    import re
+
+    if not text or not isinstance(text, str):
+        return text or ""
+
+    lines = text.splitlines()
+    result = []
+    in_code_block = False
+
+    for line in lines:
+        stripped = line.strip()
+
+        # Handle blank lines
+        if not stripped and not in_code_block:
+            result.append("")
+            continue
+
+        # Preserve code blocks
+        if stripped.startswith("```"):
+            in_code_block = not in_code_block
+            result.append(line)
+            continue
+        if in_code_block:
+            result.append(line)
+            continue
+
+        # -------------------------------------------
+        # 0. Normalize Horizontal Rules
+        # -------------------------------------------
+        if re.match(r'^[-]{3,}$', stripped):
+            result.append("---")
+            continue
+
+        # -------------------------------------------
+        # 1. True Markdown Headings (#, ##, ###)
+        # -------------------------------------------
+        if re.match(r'^\s*#{1,3}\s+', stripped):
+            result.append(stripped)
+            continue
+
+        # -------------------------------------------
+        # 2. Convert lines ending with ":" → H2 heading
+        # Example: "Key Components:" → "## Key Components"
+        # -------------------------------------------
+        if stripped.endswith(":") and len(stripped) < 80:
+            heading = stripped[:-1].strip()
+            result.append(f"## {heading}")
+            continue
+
+        # -------------------------------------------
+        # 3. Question Number Headings → **Chemical Bonding**
+        # -------------------------------------------
+        if re.match(r'^\s*\d+[\.\)]\s', stripped):
+            clean = re.sub(r'^[\s\d\.\)]+\s*', '', stripped)
+            result.append(f"**{clean}**")
+            continue
+
+        # -------------------------------------------
+        # 4. Explicit question lines
+        # -------------------------------------------
+        if any(kw in stripped.lower() for kw in ["question:", "q:", "que."]):
+            cleaned = re.sub(r'.*?(question|q)[:\s]+', '', stripped, flags=re.I).strip()
+            if cleaned:
+                result.append(f"**{cleaned}**")
+                continue
+
+        # -------------------------------------------
+        # 5. MCQ Options (A) B) etc)
+        # -------------------------------------------
+        if re.match(r'^[ABCD]\)', stripped):
+            opt = stripped[0:2]  # A)
+            text_part = stripped[2:].strip()
+            result.append(f"**{opt}** {text_part}")
+            continue
+
+        # -------------------------------------------
+        # 6. Numbered lists (1. , 2) )
+        # -------------------------------------------
+        if re.match(r'^\s*\d+[\.\)]\s', stripped):
+            num = re.findall(r'^\s*(\d+[\.\)])', stripped)[0]
+            text_part = stripped.split(num, 1)[1].strip()
+            result.append(f"- {text_part}")
+            continue
+
+        # -------------------------------------------
+        # 7. Bullet points
+        # -------------------------------------------
+        if re.match(r'^\s*[-*•]\s+', stripped):
+            clean = re.sub(r'^\s*[-*•]+\s+', '', stripped)
+            result.append(f"- {clean}")
+            continue
+
+        # -------------------------------------------
+        # 8. Standalone bold lines
+        # -------------------------------------------
+        if stripped.startswith("**") and stripped.endswith("**"):
+            result.append(stripped)
+            continue
+
+        # -------------------------------------------
+        # 9. Apply inline bold cleanup
+        # -------------------------------------------
+        clean = re.sub(r'\*\*(.*?)\*\*', r'**\1**', stripped)
+
+        # Default clean line
+        result.append(clean)
+
+    # -------------------------------------------
+    # POST-PROCESS CLEANUP
+    # -------------------------------------------
+
+    final = "\n".join(result)
+
+    # Remove triple newlines → max 2
+    final = re.sub(r'\n{3,}', '\n\n', final)
+
+    # Auto space before headings
+    final = re.sub(r'([^\n])(\n##)', r'\1\n\n##', final)
+
+    # Trim trailing spaces
+    final = "\n".join(line.rstrip() for line in final.splitlines())
+
+    return final.strip()
+
+def markdown_to_readable_v2(text: str) -> str:
+    """
+    VERSION 2 — Advanced Markdown to Human Readable Converter
+    - Converts tables to simple grids
+    - Converts code blocks with indentation
+    - Converts nested bullets and numbered lists
+    - Converts headings to uppercase readable titles
+    - Removes markdown symbols: #, *, -, **, >, etc.
+    - Keeps clean spacing & readable formatting
+    """
+
+    import re
+    from textwrap import fill
+
+    if not text or not isinstance(text, str):
+        return text or ""
+
+    # -----------------------------
+    # 1. Process code blocks first (```code```)
+    # -----------------------------
+    def format_code_block(match):
+        code_content = match.group(1)
+        # Indent code for readability
+        indented = "\n".join("    " + line for line in code_content.splitlines())
+        return f"\nCODE BLOCK:\n{indented}\n\n"
+
+    text = re.sub(r"```(.*?)```", lambda m: format_code_block(m), text, flags=re.S)
+
+    # -----------------------------
+    # 2. Process Markdown tables
+    # -----------------------------
+    def convert_table(table_text):
+        rows = [r.strip() for r in table_text.strip().split("\n") if "|" in r]
+        if not rows:
+            return table_text
+
+        cleaned_rows = []
+        for row in rows:
+            cols = [c.strip() for c in row.strip("|").split("|")]
+            cleaned_rows.append(" | ".join(cols))
+
+        return "\n".join(cleaned_rows) + "\n"
+
+    text = re.sub(r"((?:\|.*\n)+)", lambda m: convert_table(m.group(1)), text)
+
+    # -----------------------------
+    # 3. Convert bold/italic to text
+    # -----------------------------
+    text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)
+    text = re.sub(r"\*(.*?)\*", r"\1", text)
+    text = re.sub(r"__(.*?)__", r"\1", text)
+    text = re.sub(r"_(.*?)_", r"\1", text)
+
+    # -----------------------------
+    # 4. Headings (#, ##, ###) → UPPERCASE TITLES
+    # -----------------------------
+    def heading_to_title(match):
+        title = match.group(2).strip()
+        return "\n" + title.upper() + "\n"
+
+    text = re.sub(r"^(#{1,6})(\s+)(.*)$", heading_to_title, text, flags=re.M)
+
+    # -----------------------------
+    # 5. Horizontal rules
+    # -----------------------------
+    text = re.sub(r"^\s*[-*_]{3,}\s*$", "\n", text, flags=re.M)
+
+    # -----------------------------
+    # 6. Nested Ordered Lists
+    # -----------------------------
+    text = re.sub(r"^\s*(\d+)[\.\)]\s+", r"\1. ", text, flags=re.M)
+
+    # -----------------------------
+    # 7. Nested Unordered Lists
+    # -----------------------------
+    def convert_bullet(match):
+        indent = len(match.group(1)) // 2
+        symbol = "•" if indent == 0 else "  " * indent + "◦"
+        return f"{symbol} "
+
+    text = re.sub(r"^(\s*)[-*+]\s+", convert_bullet, text, flags=re.M)
+
+    # -----------------------------
+    # 8. Remove blockquotes
+    # -----------------------------
+    text = re.sub(r"^\s*>\s?", "", text, flags=re.M)
+
+    # -----------------------------
+    # 9. Wrap paragraphs to readable width (50–70 chars)
+    # -----------------------------
+    final_lines = []
+    for paragraph in text.split("\n"):
+        if paragraph.strip().startswith(("•", "◦", "CODE BLOCK", "TABLE")):
+            final_lines.append(paragraph)
+        else:
+            final_lines.append(fill(paragraph, width=70))
+
+    final_text = "\n".join(final_lines)
+
+    # -----------------------------
+    # 10. Clean up excess spacing
+    # -----------------------------
+    final_text = re.sub(r"\n{3,}", "\n\n", final_text).strip()
+
+    return final_text
+
+
+def legacy_format(text: str) -> str:
+    return markdown_to_readable_v2(format_gemini_response(text))
+
+
+def stream_format(text: str, seed: int = 0) -> str:
+    """Feed in random token-sized pieces, like astream_ask does."""
+    rnd = random.Random(seed)
+    formatter = StreamingFormatter()
+    out, pos = [], 0
+    while pos < len(text):
+        step = rnd.randint(1, 24)
+        out.append(formatter.feed(text[pos:pos + step]))
+        pos += step
+    out.append(formatter.finish())
+    return "".join(out)
+
+
+def load_corpus() -> Dict[str, str]:
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.md"))):
+        with open(path, encoding="utf-8") as f:
+            corpus[os.path.basename(path)] = f.read()
+    return corpus
+
+
+def best_ms(fn: Callable[[str], str], text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer formatter: legacy two-step vs single-pass engine")
+    parser.add_argument("--sizes", default="10,20,30,40,50", help="answer sizes in KB")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+
+    # Big answers = the corpus repeated, so the mix of headings / lists / code / tables is real
+    joined = "\n\n".join(corpus.values())
+    results: List[Dict[str, Any]] = []
+    for kb in (int(s) for s in args.sizes.split(",")):
+        text = (joined * (kb * 1024 // len(joined) + 1))[:kb * 1024]
+        if format_answer(text) != legacy_format(text):
+            sys.exit(f"Output differs from the reference formatter at {kb} KB — run tests/test_formatter.py")
+        legacy_ms = best_ms(legacy_format, text, args.repeat)
+        new_ms = best_ms(format_answer, text, args.repeat)
+        result = {
+            "kb": kb,
+            "legacy_ms": legacy_ms,
+            "format_answer_ms": new_ms,
+            "streaming_ms": best_ms(stream_format, text, max(1, args.repeat // 3)),
+            "speedup": round(legacy_ms / new_ms, 2) if new_ms else None
+        }
+        results.append(result)
+        print(f"{kb:>4} KB: legacy {legacy_ms} ms → format_answer {new_ms} ms "
+              f"({result['speedup']}x), streaming {result['streaming_ms']} ms")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"corpus": sorted(corpus), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
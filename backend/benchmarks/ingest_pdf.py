@@ -0,0 +1,109 @@
+# backend/benchmarks/ingest_pdf.py
+# PDF ingestion throughput — old "load everything, split everything, one add" path
+# vs the streaming page-batch pipeline. Each run is a fresh process so peak RSS is comparable.
+#
+#   python benchmarks/ingest_pdf.py --generate 400          # synthetic 400-page PDF
+#   python benchmarks/ingest_pdf.py --pdf notes.pdf --out ingest.json
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+from corpus import write_synthetic_pdf
+from timing import peak_rss_mb
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_child(mode: str, pdf: str) -> Dict[str, Any]:
+    """One ingest in this process (invoked through --child)."""
+    sys.path.insert(0, BACKEND_DIR)
+    from app.rag.loaders import load_documents, pdf_page_count
+    from app.rag.pipeline import FocusForgeRAG
+    from app import executor
+
+    pages = pdf_page_count(pdf)
+    rag = FocusForgeRAG(f"bench_{mode}")
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    if mode == "legacy":
+        # The pre-streaming path: every page in memory, every chunk in memory, one add
+        docs = load_documents(pdf)
+        chunks = rag.splitter.split_documents(docs)
+        rag.collection.add(
+            documents=[c.page_content for c in chunks],
+            metadatas=[{"source": "bench.pdf", "page": c.metadata.get("page", 0)} for c in chunks],
+            ids=[f"bench_{i}" for i in range(len(chunks))]
+        )
+        n_chunks = len(chunks)
+    else:
+        n_chunks = asyncio.run(rag.aadd_or_replace_file(pdf, "bench.pdf"))["chunks"]
+    elapsed = time.perf_counter() - start
+
+    executor.shutdown()
+    return {
+        "mode": mode,
+        "pages": pages,
+        "chunks": n_chunks,
+        "seconds": round(elapsed, 2),
+        "pages_per_s": round(pages / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_ingest_mb": rss_before
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF ingestion throughput: legacy vs streaming")
+    parser.add_argument("--pdf", help="PDF to ingest (default: a generated one)")
+    parser.add_argument("--generate", type=int, default=200, help="pages in the generated PDF")
+    parser.add_argument("--modes", default="legacy,streaming")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.pdf)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="ff_ingest_bench_")
+    pdf = os.path.abspath(args.pdf) if args.pdf else os.path.join(workdir, "bench.pdf")
+    if not args.pdf:
+        write_synthetic_pdf(pdf, args.generate)
+
+    # Fresh Chroma dir per run, and no embedding cache — otherwise the second run is free
+    env = dict(os.environ, EMBEDDING_CACHE_PATH="", ANONYMIZED_TELEMETRY="False")
+    results = []
+    for mode in args.modes.split(","):
+        rundir = tempfile.mkdtemp(dir=workdir)
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", mode, "--pdf", pdf],
+            cwd=rundir, env=env, capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            sys.exit(f"{mode} run failed:\n{out.stderr[-2000:]}")
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{mode:>10}: {result['pages']} pages in {result['seconds']}s "
+              f"→ {result['pages_per_s']} pages/s, peak RSS {result['peak_rss_mb']} MB")
+
+    report = {
+        "pdf": pdf,
+        "cpu_count": os.cpu_count(),
+        "cpu_workers": int(os.getenv("EXECUTOR_CPU_WORKERS", "2")),
+        "results": results
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
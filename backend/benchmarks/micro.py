@@ -0,0 +1,174 @@
+# backend/benchmarks/micro.py
+# Micro-benchmarks of the hot paths, on the synthetic corpus (benchmarks/corpus.py):
+# add_or_replace_file (PDF / markdown), get_file_history, collection.query, hybrid retrieve,
+# the cross-encoder rerank (when RERANK_MODEL is set) and both answer formatters (one-shot format_answer, StreamingFormatter).
+# Runs in a fresh process and Chroma directory with the embedding cache off; --out writes JSON
+# that benchmarks/compare.py can diff against another run.
+#
+#   python benchmarks/micro.py
+#   python benchmarks/micro.py --pdfs 4 --pages 100 --notes 50 --repeat 200 --out micro.json
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from corpus import QUESTIONS, write_corpus
+from timing import peak_rss_mb, run_info, summarize
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def sample(fn: Callable[[], Any], repeat: int, warmup: int = 3) -> List[float]:
+    """Wall time of `repeat` calls in ms, after `warmup` untimed ones."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run_child(corpus_dir: str, repeat: int) -> Dict[str, Any]:
+    """Every micro-benchmark in this process (invoked through --child)."""
+    sys.path.insert(0, BACKEND_DIR)
+    from app.config import Config
+    from app.rag.embeddings import get_embedding_function
+    from app.rag.pipeline import FocusForgeRAG
+    from app.rag.rerank import get_reranker
+    from app import executor
+    from format_answer import load_corpus, stream_format
+    from app.rag.formatter import format_answer
+
+    rag = FocusForgeRAG("bench_micro")
+    embed = get_embedding_function()
+    embed(["warm up the embedding model"])
+    results: Dict[str, Any] = {}
+
+    # Ingest — one sample per file, split by type (PDF pages vs markdown notes)
+    ingest: Dict[str, List[float]] = {"pdf": [], "md": []}
+    chunks = 0
+    for name in sorted(os.listdir(corpus_dir)):
+        start = time.perf_counter()
+        chunks += rag.add_or_replace_file(os.path.join(corpus_dir, name), name)["chunks"]
+        ingest["pdf" if name.endswith(".pdf") else "md"].append((time.perf_counter() - start) * 1000)
+    for kind, samples in ingest.items():
+        results[f"add_or_replace_file_{kind}"] = summarize(samples)
+    # Re-upload of an unchanged file (the replace path)
+    replace_name = sorted(os.listdir(corpus_dir))[-1]
+    results["add_or_replace_file_replace"] = summarize(sample(
+        lambda: rag.add_or_replace_file(os.path.join(corpus_dir, replace_name), replace_name),
+        max(1, repeat // 20), warmup=0
+    ))
+
+    results["get_file_history"] = summarize(sample(rag.get_file_history, repeat))
+
+    vectors = embed(QUESTIONS)
+    turn = {"n": 0}
+
+    def next_question() -> int:
+        turn["n"] += 1
+        return turn["n"] % len(QUESTIONS)
+
+    results["embed_question"] = summarize(sample(lambda: embed([QUESTIONS[next_question()]]), repeat))
+    n_results = Config.RETRIEVAL_CANDIDATES
+    results["collection_query"] = summarize(sample(
+        lambda: rag.collection.query(
+            query_embeddings=[vectors[next_question()]], n_results=n_results,
+            include=["documents", "metadatas", "distances"]
+        ),
+        repeat
+    ))
+
+    def retrieve_one():
+        i = next_question()
+        return rag.retrieve(QUESTIONS[i], vectors[i])
+
+    results["retrieve"] = summarize(sample(retrieve_one, repeat))
+
+    reranker = get_reranker()
+    if reranker is not None:
+        candidates = [
+            rag.retrieve(q, v, Config.RERANK_CANDIDATES)["documents"][0] for q, v in zip(QUESTIONS, vectors)
+        ]
+
+        def rerank_one():
+            i = next_question()
+            return reranker.rerank(QUESTIONS[i], candidates[i], "study")
+
+        results["rerank"] = summarize(sample(rerank_one, max(1, repeat // 5)))
+
+    # Formatters on a ~20 KB answer built from the golden corpus (benchmarks/answers)
+    joined = "\n\n".join(load_corpus().values())
+    answer = (joined * (20 * 1024 // len(joined) + 1))[:20 * 1024]
+    results["format_answer_20kb"] = summarize(sample(lambda: format_answer(answer), repeat))
+    results["streaming_formatter_20kb"] = summarize(sample(lambda: stream_format(answer), max(1, repeat // 3)))
+
+    stored = rag.collection.count()
+    executor.shutdown()
+    return {
+        "files": sum(len(s) for s in ingest.values()),
+        "chunks": chunks,
+        "stored_chunks": stored,
+        "retrieval_mode": Config.RETRIEVAL_MODE,
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks: ingest, file history, query, formatters")
+    parser.add_argument("--pdfs", type=int, default=2)
+    parser.add_argument("--pages", type=int, default=50, help="pages per generated PDF")
+    parser.add_argument("--notes", type=int, default=20)
+    parser.add_argument("--kb", type=int, default=2, help="size of each generated note")
+    parser.add_argument("--repeat", type=int, default=100, help="timed calls per benchmark")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--corpus", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.corpus, args.repeat)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="ff_micro_bench_")
+    corpus_dir = os.path.join(workdir, "corpus")
+    write_corpus(corpus_dir, args.pdfs, args.pages, args.notes, args.kb)
+
+    # Fresh Chroma dir, catalog and keyword index; no embedding cache — otherwise re-ingest is free
+    rundir = tempfile.mkdtemp(dir=workdir)
+    env = dict(os.environ, EMBEDDING_CACHE_PATH="", ANONYMIZED_TELEMETRY="False")
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--corpus", corpus_dir, "--repeat", str(args.repeat)],
+        cwd=rundir, env=env, capture_output=True, text=True
+    )
+    if out.returncode != 0:
+        sys.exit(f"micro-benchmarks failed:\n{out.stderr[-2000:]}")
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+
+    for name, stats in result["results"].items():
+        if not stats["n"]:
+            continue
+        print(f"{name:>28}: p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms (n={stats['n']})")
+
+    report = {
+        "benchmark": "micro",
+        "run": run_info(),
+        "corpus": {"pdfs": args.pdfs, "pages": args.pages, "notes": args.notes, "kb_per_note": args.kb},
+        **result
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
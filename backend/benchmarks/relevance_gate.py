@@ -0,0 +1,168 @@
+# backend/benchmarks/relevance_gate.py
+# Calibrate RELEVANCE_MAX_DISTANCE: index a set of notes, retrieve for questions labelled answerable
+# or off-topic, and sweep the cosine-distance limit — LLM calls the gate would save on off-topic
+# questions vs answerable ones it would wrongly turn away with "Not in notes yet".
+# Defaults to the synthetic corpus with corpus.QUESTIONS / corpus.OFF_TOPIC_QUESTIONS; for a real
+# calibration pass your own notes and a JSONL file of {"question": "...", "relevant": true|false}.
+# Retrieval runs as configured (RETRIEVAL_MODE, RERANK_MODEL, ...), in a fresh Chroma directory.
+#
+#   python benchmarks/relevance_gate.py
+#   python benchmarks/relevance_gate.py --notes ~/course_notes --questions labelled.jsonl --out gate.json
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from corpus import OFF_TOPIC_QUESTIONS, QUESTIONS, write_corpus
+from timing import run_info
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_child(notes_dir: str, questions_path: str) -> Dict[str, Any]:
+    """Index the notes and retrieve for every question in this process (invoked through --child)."""
+    sys.path.insert(0, BACKEND_DIR)
+    from app.rag.pipeline import FocusForgeRAG
+    from app.rag.relevance import best_distance
+    from app import executor
+
+    with open(questions_path) as f:
+        labelled = json.load(f)
+
+    rag = FocusForgeRAG("bench_relevance")
+    for name in sorted(os.listdir(notes_dir)):
+        path = os.path.join(notes_dir, name)
+        if os.path.isfile(path) and name.rsplit(".", 1)[-1].lower() in ("pdf", "txt", "md"):
+            rag.add_or_replace_file(path, name)
+
+    rows = []
+    for item in labelled:
+        _, results = rag.embed_and_retrieve(item["question"])
+        distances = results["distances"][0] if results.get("distances") else []
+        rows.append({
+            "question": item["question"],
+            "relevant": bool(item["relevant"]),
+            "chunks": len(distances),
+            "best_distance": best_distance(results),
+            "keyword_only": any(d is None for d in distances)
+        })
+    executor.shutdown()
+    return {"stored_chunks": rag.collection.count(), "questions": rows}
+
+
+def gated(row: Dict[str, Any], limit: float) -> bool:
+    """Would app/rag/relevance.py skip the LLM for this question at this limit?"""
+    if not row["chunks"]:
+        return True
+    return row["best_distance"] is None or row["best_distance"] > limit
+
+
+def sweep(rows: List[Dict[str, Any]], step: float, top: float) -> List[Dict[str, Any]]:
+    relevant = [r for r in rows if r["relevant"]]
+    off_topic = [r for r in rows if not r["relevant"]]
+    points = []
+    for i in range(int(round(top / step)) + 1):
+        limit = round(i * step, 4)
+        saved = sum(gated(r, limit) for r in off_topic)
+        wrong = sum(gated(r, limit) for r in relevant)
+        points.append({
+            "max_distance": limit,
+            "off_topic_skipped": saved,
+            "off_topic_skipped_ratio": round(saved / len(off_topic), 3) if off_topic else None,
+            "relevant_skipped": wrong,
+            "relevant_skipped_ratio": round(wrong / len(relevant), 3) if relevant else None
+        })
+    return points
+
+
+def recommend(rows: List[Dict[str, Any]], margin: float) -> Optional[float]:
+    """Lowest limit that turns away no answerable question, plus a safety margin (2 decimals, rounded up)."""
+    distances = [r["best_distance"] for r in rows if r["relevant"] and r["best_distance"] is not None]
+    if not distances:
+        return None
+    return math.ceil((max(distances) + margin) * 100) / 100
+
+
+def load_questions(path: Optional[str]) -> List[Dict[str, Any]]:
+    if not path:
+        return ([{"question": q, "relevant": True} for q in QUESTIONS] +
+                [{"question": q, "relevant": False} for q in OFF_TOPIC_QUESTIONS])
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the relevance gate's cosine-distance limit")
+    parser.add_argument("--notes", help="directory of .pdf/.md/.txt notes (default: synthetic corpus)")
+    parser.add_argument("--questions", help="JSONL of {\"question\", \"relevant\"} (default: corpus questions)")
+    parser.add_argument("--margin", type=float, default=0.05, help="added to the farthest answerable question")
+    parser.add_argument("--step", type=float, default=0.05, help="sweep step")
+    parser.add_argument("--max", type=float, default=1.2, help="largest limit in the sweep")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--labelled", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.notes, args.labelled)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="ff_relevance_gate_")
+    notes_dir = os.path.abspath(os.path.expanduser(args.notes)) if args.notes else os.path.join(workdir, "corpus")
+    if not args.notes:
+        write_corpus(notes_dir, pdfs=1, pages=20, notes=10)
+    labelled = load_questions(args.questions)
+    labelled_path = os.path.join(workdir, "questions.json")
+    with open(labelled_path, "w") as f:
+        json.dump(labelled, f)
+
+    rundir = tempfile.mkdtemp(dir=workdir)
+    env = dict(os.environ, EMBEDDING_CACHE_PATH="", ANONYMIZED_TELEMETRY="False")
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--notes", notes_dir, "--labelled", labelled_path],
+        cwd=rundir, env=env, capture_output=True, text=True
+    )
+    if out.returncode != 0:
+        sys.exit(f"relevance gate evaluation failed:\n{out.stderr[-2000:]}")
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+
+    rows = result["questions"]
+    for row in sorted(rows, key=lambda r: (not r["relevant"], r["best_distance"] or 0.0)):
+        label = "answerable" if row["relevant"] else "off-topic"
+        distance = "-" if row["best_distance"] is None else f"{row['best_distance']:.3f}"
+        keyword = " (+keyword-only hits, ignored by the gate)" if row["keyword_only"] else ""
+        print(f"{label:>10}  best={distance:>6}{keyword}  {row['question']}")
+
+    points = sweep(rows, args.step, args.max)
+    suggested = recommend(rows, args.margin)
+    print(f"\n{'limit':>6} {'off-topic skipped':>18} {'answerable skipped':>19}")
+    for p in points:
+        print(f"{p['max_distance']:>6.2f} {p['off_topic_skipped']:>18} {p['relevant_skipped']:>19}")
+    if suggested is None:
+        print("\nno answerable question with a distance — cannot suggest a limit")
+    else:
+        saved = sum(gated(r, suggested) for r in rows if not r["relevant"])
+        print(f"\nsuggested: RELEVANCE_MAX_DISTANCE=study:{suggested},quick:{suggested},quiz:{suggested} "
+              f"(skips {saved}/{sum(not r['relevant'] for r in rows)} off-topic questions here)")
+
+    report = {
+        "benchmark": "relevance_gate",
+        "run": run_info(),
+        "notes": args.notes or "synthetic",
+        "margin": args.margin,
+        "suggested_max_distance": suggested,
+        "stored_chunks": result["stored_chunks"],
+        "sweep": points,
+        "questions": rows
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# backend/benchmarks/store_tenants.py
+# Chroma storage layout at many tenants — one PersistentClient directory per user vs one shared
+# client with a collection per user. Populates N users with random vectors (the embedding model is
+# never loaded), then, in a fresh process per mode, measures cold open latency, query latency and peak RSS.
+#
+#   python benchmarks/store_tenants.py --users 1000
+#   python benchmarks/store_tenants.py --users 1000,10000 --chunks 50 --out tenants.json
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from timing import peak_rss_mb, percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIMS = 384  # all-MiniLM-L6-v2
+
+
+def vectors(rng: random.Random, n: int) -> List[List[float]]:
+    return [[rng.uniform(-1.0, 1.0) for _ in range(DIMS)] for _ in range(n)]
+
+
+def timing(values: List[float]) -> Dict[str, float]:
+    return {
+        "mean_ms": round(statistics.mean(values) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2)
+    }
+
+
+def populate(users: int, chunks: int, seed: int) -> Dict[str, Any]:
+    """Write `chunks` random chunks for each of `users` tenants through open_store()."""
+    sys.path.insert(0, BACKEND_DIR)
+    from app.rag import store
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for u in range(users):
+        user_id = f"user_{u:05d}"
+        client, collection = store.open_store(user_id)
+        collection.add(
+            ids=[f"{user_id}_{i}" for i in range(chunks)],
+            embeddings=vectors(rng, chunks),
+            documents=[f"chunk {i} of {user_id}" for i in range(chunks)],
+            metadatas=[{"source": "bench.txt", "page": i} for i in range(chunks)]
+        )
+        store.close_client(client)
+    store.shutdown()
+    return {"populate_s": round(time.perf_counter() - start, 1)}
+
+
+def measure(users: int, sample: int, queries: int, seed: int) -> Dict[str, Any]:
+    """Open `sample` random tenants cold (as the registry does on a miss) and query each."""
+    sys.path.insert(0, BACKEND_DIR)
+    from app.rag import store
+
+    rng = random.Random(seed)
+    picked = rng.sample(range(users), min(sample, users))
+    rss_start = peak_rss_mb()
+
+    opens, first_queries, warm_queries = [], [], []
+    for u in picked:
+        user_id = f"user_{u:05d}"
+        t0 = time.perf_counter()
+        client, collection = store.open_store(user_id)
+        opens.append(time.perf_counter() - t0)
+
+        for q in range(queries):
+            t0 = time.perf_counter()
+            result = collection.query(query_embeddings=vectors(rng, 1), n_results=5)
+            (first_queries if q == 0 else warm_queries).append(time.perf_counter() - t0)
+            assert all(i.startswith(user_id + "_") for i in result["ids"][0]), "tenant isolation broken"
+        store.close_client(client)
+
+    store.shutdown()
+    report = {
+        "opened": len(picked),
+        "open": timing(opens),
+        "first_query": timing(first_queries),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_opens_mb": rss_start
+    }
+    if warm_queries:
+        report["warm_query"] = timing(warm_queries)
+    return report
+
+
+def disk_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return round(total / (1024 * 1024), 1)
+
+
+def run(phase: str, mode: str, rundir: str, args: argparse.Namespace, users: int) -> Dict[str, Any]:
+    env = dict(
+        os.environ,
+        CHROMA_STORAGE=mode,
+        CHROMA_DB_PATH=os.path.join(rundir, "chroma_db"),
+        CHROMA_SHARED_PATH=os.path.join(rundir, "chroma_shared"),
+        ANONYMIZED_TELEMETRY="False"
+    )
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", phase, "--users", str(users),
+         "--chunks", str(args.chunks), "--sample", str(args.sample),
+         "--queries", str(args.queries), "--seed", str(args.seed)],
+        cwd=rundir, env=env, capture_output=True, text=True
+    )
+    if out.returncode != 0:
+        sys.exit(f"{mode} {phase} failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-user Chroma directories vs one shared multi-tenant store")
+    parser.add_argument("--users", default="1000", help="comma-separated tenant counts, e.g. 1000,10000")
+    parser.add_argument("--chunks", type=int, default=50, help="chunks per tenant")
+    parser.add_argument("--sample", type=int, default=200, help="tenants opened in the measure phase")
+    parser.add_argument("--queries", type=int, default=3, help="queries per opened tenant")
+    parser.add_argument("--modes", default="per_user,shared")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        users = int(args.users)
+        if args.child == "populate":
+            result = populate(users, args.chunks, args.seed)
+        else:
+            result = measure(users, args.sample, args.queries, args.seed)
+        print(json.dumps(result))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="ff_store_bench_")
+    results = []
+    for users in (int(n) for n in args.users.split(",")):
+        for mode in args.modes.split(","):
+            rundir = tempfile.mkdtemp(dir=workdir)
+            result = {"mode": mode, "users": users, "chunks_per_user": args.chunks}
+            result.update(run("populate", mode, rundir, args, users))
+            result["disk_mb"] = disk_mb(rundir)
+            result.update(run("measure", mode, rundir, args, users))
+            results.append(result)
+            print(f"{mode:>9} @ {users:>6} users: open p95 {result['open']['p95_ms']} ms, "
+                  f"first query p95 {result['first_query']['p95_ms']} ms, "
+                  f"peak RSS {result['peak_rss_mb']} MB, disk {result['disk_mb']} MB")
+
+    report = {"cpu_count": os.cpu_count(), "workdir": workdir, "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# backend/benchmarks/timing.py
+# Helpers shared by the benchmarks — percentiles, peak RSS and the run header every JSON report carries
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Settings that change the numbers — recorded with every run when set
+CONFIG_PREFIXES = ("EMBEDDING_", "RETRIEVAL_", "CONTEXT_", "CHROMA_", "EXECUTOR_", "INGEST_", "LLM_", "ANSWER_CACHE_")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, Any]:
+    """n / p50 / p95 / p99 / mean / min of latency samples in milliseconds."""
+    if not samples_ms:
+        return {"n": 0}
+    return {
+        "n": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "mean_ms": round(sum(samples_ms) / len(samples_ms), 3),
+        "min_ms": round(min(samples_ms), 3)
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args: str) -> str:
+        return subprocess.run(["git", *args], cwd=BENCH_DIR, capture_output=True, text=True).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD") or None, "dirty": bool(git("status", "--porcelain"))}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+
+def run_info() -> Dict[str, Any]:
+    """Where and on what the numbers were taken, so two reports can be compared fairly."""
+    return {
+        **git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {k: v for k, v in sorted(os.environ.items()) if k.startswith(CONFIG_PREFIXES)}
+    }
@@ -1,16 +1,35 @@
 # backend/main.py
-from fastapi import FastAPI, File, UploadFile, HTTPException, Query
+from app import startup  # first: its clock measures the imports below
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 import os
+import json
 import uuid
-from werkzeug.utils import secure_filename
-from app.rag.pipeline import FocusForgeRAG
+from app.rag.embeddings import get_embedding_function
+from app.rag.answer_cache import get_answer_cache
+from app.rag.catalog import get_file_catalog
+from app.rag.keyword_index import get_keyword_index
+from app.rag.retrieval import get_retrieval_stats
+from app.rag.context import get_context_stats
+from app.rag.rerank import get_rerank_stats
+from app.rag.relevance import get_relevance_stats
+from app.rag.llm_router import get_llm_router
+from app.rag.llm_pool import pool_stats
+from app.config import Config
+from app.rag.registry import RAGRegistry
+from app.rag import store
+from app import executor, logs, metrics, profiling
+from app.jobs import JobQueue
+from app.uploads import UploadRejected, batch_files, receive_upload, save_batch
 from typing import Dict, List
 import shutil
 
-# Global user cache (same as before)
-user_rags: Dict[str, FocusForgeRAG] = {}
+startup.mark("imported")
+logs.configure()
+
+# Per-user RAG instances — bounded LRU with idle eviction (see app/rag/registry.py)
+rag_registry = RAGRegistry()
 
 app = FastAPI(title="FocusForge API", version="2.0")
 
@@ -27,55 +46,194 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+# Outermost: request id + access log + HTTP latency for every request, streamed ones included
+app.add_middleware(logs.RequestContextMiddleware)
 
 UPLOAD_FOLDER = "./uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-def get_rag(user_id: str) -> FocusForgeRAG:
-    if user_id not in user_rags:
-        user_rags[user_id] = FocusForgeRAG(user_id)
-    return user_rags[user_id]
+async def ingest_upload(user_id: str, temp_path: str, filename: str, progress) -> Dict:
+    async with rag_registry.asession(user_id) as rag:
+        if os.path.isdir(temp_path):
+            # Bulk upload: a directory of files, embedded and written in shared batches
+            result = await rag.aadd_or_replace_files(batch_files(temp_path), progress)
+            if result["files"] and not result["succeeded"]:
+                raise RuntimeError(f"No file could be indexed ({result['files'][0]['error']})")
+            return result
+        return await rag.aadd_or_replace_file(temp_path, filename, progress)
+
+# Background ingestion — uploads return a job id, progress via /api/jobs/{id}
+job_queue = JobQueue(ingest_upload)
+
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+    startup.mark("ready")
+    # Runs after this hook returns, i.e. while the server is already answering
+    startup.start_prewarm()
+
+@app.on_event("shutdown")
+async def close_user_rags():
+    await job_queue.stop()
+    rag_registry.close_all()
+    store.shutdown()
+    executor.shutdown()
 
 @app.get("/")
 async def home():
-    return {"message": "FocusForge API LIVE", "version": "2.0", "active_users": len(user_rags)}
+    return {"message": "FocusForge API LIVE", "version": "2.0", "active_users": len(rag_registry)}
+
+def health_snapshot() -> Dict:
+    """Blocking: the catalog, keyword index, job and embedding-cache stats query SQLite."""
+    return {
+        "status": "healthy",
+        "users_online": len(rag_registry),
+        "storage": store.storage_mode(),
+        "embeddings": get_embedding_function().stats(),
+        "answer_cache": get_answer_cache().stats(),
+        "file_catalog": get_file_catalog().stats(),
+        "retrieval": {**get_retrieval_stats().stats(), "keyword_index": get_keyword_index().stats()},
+        "rerank": get_rerank_stats().stats(),
+        "relevance_gate": get_relevance_stats().stats(),
+        "context": get_context_stats().stats(),
+        "llm_router": get_llm_router().stats(),
+        "user_registry": rag_registry.stats(),
+        "executor": executor.stats(),
+        "jobs": job_queue.stats()
+    }
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "users_online": len(user_rags)}
+    # Liveness probe — never touch SQLite (or open the embedding cache) on the event loop
+    return await executor.run_in_io(health_snapshot)
+
+@app.get("/api/startup")
+async def startup_report():
+    """Cold-start timings of this process (per-import profile: python -m app.startup)."""
+    return startup.report()
+
+def collect_gauges() -> None:
+    """Queue depths, open user instances and cache sizes for /metrics (from the /health snapshots)."""
+    registry = rag_registry.stats()
+    metrics.ACTIVE_USERS.set(registry["active"], state="active")
+    metrics.ACTIVE_USERS.set(registry["warm_pool"], state="warm")
+
+    jobs = job_queue.stats()
+    metrics.QUEUE_DEPTH.set(jobs["by_status"].get("queued", 0), queue="ingest_jobs")
+    metrics.IN_FLIGHT.set(jobs["running"], kind="ingest_jobs")
+    metrics.QUEUE_DEPTH.set(executor.stats()["io_queue"], queue="io_executor")
+    for provider, slots in pool_stats().items():
+        metrics.QUEUE_DEPTH.set(slots["queued_now"], queue=f"llm:{provider}")
+        metrics.IN_FLIGHT.set(slots["in_flight"], kind=f"llm:{provider}")
+
+    metrics.CACHE_ENTRIES.set(get_answer_cache().stats()["entries"], cache="answer")
+    embedding_cache = get_embedding_function().stats()["cache"]
+    if embedding_cache is not None:
+        metrics.CACHE_ENTRIES.set(embedding_cache["entries"], cache="embedding")
+    metrics.CACHE_ENTRIES.set(get_keyword_index().stats()["chunks"], cache="keyword_index_chunks")
+
+metrics.on_collect(collect_gauges)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: stage / LLM / HTTP histograms and queue, user and cache gauges."""
+    body = await executor.run_in_io(metrics.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.post("/api/upload")
-async def upload_file(
-    file: UploadFile = File(...),
+async def upload_file(request: Request, user_id: str = Query("demo")):
+    """
+    Multipart field "file", read as it arrives: wrong type, wrong content or more than
+    MAX_CONTENT_LENGTH is refused (415 / 413) without reading the rest of the body.
+    Small text/markdown is indexed right away (status "done"); everything else becomes a job.
+    """
+    try:
+        with metrics.stage("upload_receive"):
+            upload = await receive_upload(request, UPLOAD_FOLDER, f"{user_id}_{uuid.uuid4()}")
+    except UploadRejected as e:
+        metrics.UPLOADS_REJECTED.inc(status=e.status_code)
+        raise HTTPException(e.status_code, detail=str(e))
+
+    if profiling.requested(request.headers, user_id):
+        return await profiled_upload(upload, user_id)
+
+    if upload.text is not None:
+        async with rag_registry.asession(user_id) as rag:
+            result = await rag.aadd_or_replace_text(upload.text, upload.filename, upload.size, upload.content_hash)
+        return {"job_id": None, "status": "done", "filename": upload.filename, "result": result}
+
+    job_id = await job_queue.submit(user_id, upload.filename, upload.path)
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "filename": upload.filename}
+    )
+
+async def profiled_upload(upload, user_id: str) -> JSONResponse:
+    """Index in the request (no job) with the sync add_or_replace_file() under the profiler."""
+    async with rag_registry.asession(user_id) as rag:
+        if upload.text is not None:
+            call = (rag.add_or_replace_text, upload.text, upload.filename, upload.size, upload.content_hash)
+        else:
+            call = (rag.add_or_replace_file, upload.path, upload.filename)
+        try:
+            result, profile_id = await executor.run_in_io(
+                profiling.run_profiled, "upload", upload.filename, user_id, *call
+            )
+        except profiling.ProfilerBusy as e:
+            raise HTTPException(409, detail=str(e))
+        finally:
+            if upload.text is None and os.path.exists(upload.path):
+                os.remove(upload.path)
+    return JSONResponse(
+        {"job_id": None, "status": "done", "filename": upload.filename, "result": result},
+        headers={"X-Profile-Id": profile_id}
+    )
+
+@app.post("/api/upload/batch")
+async def upload_batch(
+    files: List[UploadFile] = File(...),
     user_id: str = Query("demo")
 ):
-    if not file.filename:
-        raise HTTPException(400, detail="No file selected")
+    """Many files and/or zip archives in one request → one background job with per-file results."""
+    batch_dir = os.path.join(UPLOAD_FOLDER, f"{user_id}_{uuid.uuid4()}_batch")
+    with metrics.stage("upload_receive"):
+        saved, rejected = await executor.run_in_io(save_batch, files, batch_dir)
+    if not saved:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise HTTPException(400, detail={"message": "No supported files in this upload", "rejected": rejected})
 
-    rag = get_rag(user_id)
-    filename = secure_filename(file.filename)
-    temp_path = os.path.join(UPLOAD_FOLDER, f"{user_id}_{uuid.uuid4()}_{filename}")
+    job_id = await job_queue.submit(user_id, f"{len(saved)} files", batch_dir)
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "files": saved, "rejected": rejected}
+    )
 
-    with open(temp_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, user_id: str = Query("demo")):
+    job = await executor.run_in_io(job_queue.store.get, job_id)
+    if not job or job["user_id"] != user_id:
+        raise HTTPException(404, detail="Job not found")
+    job.pop("temp_path", None)
+    return job
 
-    try:
-        result = rag.add_or_replace_file(temp_path, filename)
-        os.remove(temp_path)
-        return result
-    except Exception as e:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        raise HTTPException(500, detail=f"Processing failed: {str(e)}")
+async def file_page(user_id: str, offset: int = 0, limit: int = Config.FILES_PAGE_SIZE) -> Dict:
+    catalog = get_file_catalog()
+    if await executor.run_in_io(catalog.is_indexed, user_id):
+        # Catalog is complete — no need to open the user's Chroma store at all
+        return await executor.run_in_io(catalog.page, user_id, offset, limit)
+    async with rag_registry.asession(user_id) as rag:
+        return await executor.run_in_io(rag.get_file_history, offset, limit)
 
 @app.get("/api/files")
-async def get_files(user_id: str = Query("demo")):
-    rag = get_rag(user_id)
-    files = rag.get_file_history()
-    return {"files": files}
+async def get_files(
+    user_id: str = Query("demo"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(Config.FILES_PAGE_SIZE, ge=1, le=Config.FILES_PAGE_MAX)
+):
+    return await file_page(user_id, offset, limit)
 
 @app.post("/api/ask")
-async def ask_question(data: Dict):
+async def ask_question(data: Dict, request: Request):
     user_id = data.get("user_id", "demo")
     question = data.get("question", "").strip()
     mode = data.get("mode", "study")
@@ -83,10 +241,75 @@ async def ask_question(data: Dict):
     if not question:
         return {"answer": "Please type a question!", "sources": [], "used_web": False}
 
-    rag = get_rag(user_id)
-    result = rag.ask(question, mode=mode)
+    if profiling.requested(request.headers, user_id):
+        # Sync ask() in one pool thread, so the whole request is in the profile
+        async with rag_registry.asession(user_id) as rag:
+            try:
+                result, profile_id = await executor.run_in_io(
+                    profiling.run_profiled, "ask", question, user_id, rag.ask, question, mode
+                )
+            except profiling.ProfilerBusy as e:
+                raise HTTPException(409, detail=str(e))
+        return JSONResponse(result, headers={"X-Profile-Id": profile_id})
+
+    async with rag_registry.asession(user_id) as rag:
+        result = await rag.aask(question, mode=mode)
     return result
 
+def require_profile_admin(request: Request) -> None:
+    if not profiling.is_admin(request.headers):
+        raise HTTPException(403, detail="X-Profile-Token required")
+
+@app.get("/api/profiles")
+async def list_profiles(request: Request):
+    """Saved request profiles, newest first (admin token)."""
+    require_profile_admin(request)
+    return await executor.run_in_io(profiling.get_profile_store().list)
+
+@app.get("/api/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request):
+    """Summary: stage breakdown, context / prompt sizes and the top functions by cumulative time."""
+    require_profile_admin(request)
+    summary = await executor.run_in_io(profiling.get_profile_store().get, profile_id)
+    if summary is None:
+        raise HTTPException(404, detail="Profile not found")
+    return summary
+
+@app.get("/api/profiles/{profile_id}/download")
+async def download_profile(profile_id: str, request: Request):
+    """Raw pstats dump — open with `python -m pstats` or snakeviz."""
+    require_profile_admin(request)
+    path = profiling.get_profile_store().prof_path(profile_id)
+    if path is None:
+        raise HTTPException(404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/ask/stream")
+async def ask_question_stream(data: Dict):
+    """Server-Sent Events version of /api/ask: sources → token* → done."""
+    user_id = data.get("user_id", "demo")
+    question = data.get("question", "").strip()
+    mode = data.get("mode", "study")
+
+    async def events():
+        if not question:
+            yield sse_event("done", {"answer": "Please type a question!", "sources": [], "used_web": False})
+            return
+
+        async with rag_registry.asession(user_id) as rag:
+            async for event in rag.astream_ask(question, mode=mode):
+                name = event.pop("event")
+                yield sse_event(name, event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/delete_file")
 async def delete_file(data: Dict):
     user_id = data.get("user_id", "demo")
@@ -94,12 +317,7 @@ async def delete_file(data: Dict):
     if not filename:
         raise HTTPException(400, detail="Filename required")
 
-    rag = get_rag(user_id)
-    result = rag.collection.get(where={"source": filename})
-    ids = result.get("ids", [])
-    
-    if ids:
-        rag.collection.delete(ids=ids)
-
-    updated_files = rag.get_file_history()
-    return {"success": True, "message": "Deleted", "files": updated_files}
\ No newline at end of file
+    async with rag_registry.asession(user_id) as rag:
+        await executor.run_in_io(rag.delete_file, filename)
+    page = await file_page(user_id)
+    return {"success": True, "message": "Deleted", **page}
\ No newline at end of file
@@ -0,0 +1,104 @@
+# backend/scripts/migrate_store.py
+# Copy per-user Chroma directories (./chroma_db/<user_id>) into the shared multi-tenant store.
+# Vectors are copied as they are — nothing is re-embedded. Safe to re-run (upsert by chunk id).
+#
+#   python scripts/migrate_store.py                      # every user under CHROMA_DB_PATH
+#   python scripts/migrate_store.py --users alice,bob --dry-run
+#   then start the API with CHROMA_STORAGE=shared
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import chromadb  # noqa: E402
+
+from app.config import Config  # noqa: E402
+from app.rag.store import COLLECTION_NAME, close_client, get_shared_client, tenant_collection  # noqa: E402
+
+
+def list_user_dirs(source: str) -> List[str]:
+    if not os.path.isdir(source):
+        return []
+    shared = os.path.abspath(Config.CHROMA_SHARED_PATH)
+    return sorted(
+        name for name in os.listdir(source)
+        if os.path.isdir(os.path.join(source, name))
+        and os.path.abspath(os.path.join(source, name)) != shared
+        and os.path.exists(os.path.join(source, name, "chroma.sqlite3"))
+    )
+
+
+def migrate_user(source: str, user_id: str, batch_size: int, dry_run: bool) -> Dict[str, Any]:
+    client = chromadb.PersistentClient(path=os.path.join(source, user_id))
+    try:
+        try:
+            collection = client.get_collection(COLLECTION_NAME)
+        except Exception:
+            return {"user_id": user_id, "chunks": 0, "copied": 0, "skipped": "no collection"}
+
+        total = collection.count()
+        if dry_run or total == 0:
+            return {"user_id": user_id, "chunks": total, "copied": 0}
+
+        target = tenant_collection(get_shared_client(), user_id)
+        copied = 0
+        for offset in range(0, total, batch_size):
+            page = collection.get(
+                limit=batch_size,
+                offset=offset,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            if not page["ids"]:
+                break
+            target.upsert(
+                ids=page["ids"],
+                embeddings=page["embeddings"],
+                documents=page["documents"],
+                metadatas=page["metadatas"]
+            )
+            copied += len(page["ids"])
+
+        return {"user_id": user_id, "chunks": total, "copied": copied, "in_target": target.count()}
+    finally:
+        close_client(client)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate per-user Chroma directories into the shared store")
+    parser.add_argument("--source", default=Config.CHROMA_DB_PATH, help="directory holding one folder per user")
+    parser.add_argument("--users", help="comma-separated user ids (default: every user directory)")
+    parser.add_argument("--batch", type=int, default=500, help="chunks copied per request")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be copied")
+    args = parser.parse_args()
+
+    users = args.users.split(",") if args.users else list_user_dirs(args.source)
+    if not users:
+        sys.exit(f"No per-user stores found under {args.source}")
+
+    print(f"{'Counting' if args.dry_run else 'Migrating'} {len(users)} user(s) "
+          f"from {args.source} → {Config.CHROMA_SHARED_PATH}")
+    start = time.perf_counter()
+    chunks = copied = 0
+    mismatched = []
+    for i, user_id in enumerate(users, start=1):
+        result = migrate_user(args.source, user_id, args.batch, args.dry_run)
+        chunks += result["chunks"]
+        copied += result["copied"]
+        if not args.dry_run and result.get("in_target", result["chunks"]) < result["chunks"]:
+            mismatched.append(user_id)
+        note = f" ({result['skipped']})" if "skipped" in result else ""
+        print(f"[{i}/{len(users)}] {user_id}: {result['chunks']} chunks, {result['copied']} copied{note}")
+
+    print(f"Done in {time.perf_counter() - start:.1f}s — {chunks} chunks, {copied} copied")
+    if mismatched:
+        sys.exit(f"Target has fewer chunks than the source for: {', '.join(mismatched)}")
+    if not args.dry_run:
+        print("Source directories were left in place. Set CHROMA_STORAGE=shared and restart the API.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+# Tests import the app the way main.py does ("from app..."), so run from anywhere with backend/ on sys.path
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,28 @@
+# backend/tests/test_embeddings.py
+import numpy as np
+
+from app.rag.embedding_cache import EmbeddingCache
+from app.rag.embeddings import SharedEmbeddingFunction
+
+
+class FakeModel:
+    def __init__(self):
+        self.texts = []
+
+    def encode(self, texts, **_):
+        self.texts.extend(texts)
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_questions_skip_the_chunk_cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=100)
+    ef = SharedEmbeddingFunction("fake-model", cache=cache)
+    ef._model = FakeModel()
+
+    ef(["chunk one", "chunk two"])
+    assert cache.stats()["entries"] == 2
+
+    vector = ef.embed_query("what is a join?")
+    assert list(vector) == [15.0, 1.0]
+    assert cache.stats()["entries"] == 2  # the question was not written
+    assert ef._model.texts[-1] == "what is a join?"
@@ -0,0 +1,45 @@
+# backend/tests/test_formatter.py
+# format_answer and StreamingFormatter must reproduce the old two-step formatter byte for byte
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from format_answer import legacy_format, load_corpus, stream_format  # noqa: E402
+
+from app.rag.formatter import format_answer  # noqa: E402
+
+CORPUS = load_corpus()
+EDGE_CASES = {
+    "empty": "",
+    "blank_before_bullets": "Intro\n\n- one\n- two\n\n> quoted\n\n---\nafter",
+    "numbered_and_options": "1. First\n2) Second\nQuestion: what?\nA) yes\nB) no",
+    "unclosed_fence": "text\n```python\nprint('x')",
+    "table": "| a | b |\n|---|---|\n| 1 | 2 |\nend",
+    "crlf_and_long_lines": "Heading:\r\n" + "word " * 60 + "\r\n\r\n\r\n\r\n## Next\r\ntail   ",
+}
+CASES = {**CORPUS, **EDGE_CASES}
+
+
+def test_corpus_is_present():
+    assert CORPUS, "benchmarks/answers/*.md missing"
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_one_shot_matches_reference(name):
+    assert format_answer(CASES[name]) == legacy_format(CASES[name])
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_streaming_matches_reference(name, seed):
+    assert stream_format(CASES[name], seed) == legacy_format(CASES[name])
+
+
+def test_large_mixed_answer():
+    joined = "\n\n".join(CORPUS.values())
+    text = (joined * (20 * 1024 // len(joined) + 1))[:20 * 1024]
+    expected = legacy_format(text)
+    assert format_answer(text) == expected
+    assert stream_format(text) == expected
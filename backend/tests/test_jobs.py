@@ -0,0 +1,87 @@
+# backend/tests/test_jobs.py
+import asyncio
+import logging
+import os
+
+from app.jobs import DONE, FAILED, JobQueue, JobStore
+
+
+async def wait_finished(store: JobStore, job_ids, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        jobs = [store.get(job_id) for job_id in job_ids]
+        if all(job["status"] in (DONE, FAILED) for job in jobs):
+            return jobs
+        assert asyncio.get_running_loop().time() < deadline, f"jobs still pending: {jobs}"
+        await asyncio.sleep(0.01)
+
+
+def test_workers_survive_done_and_failed_jobs(tmp_path, caplog):
+    # INFO so "job done" is actually built into a LogRecord (that is where reserved keys blew up)
+    caplog.set_level(logging.INFO, logger="app")
+
+    async def ingest(user_id, temp_path, filename, progress):
+        if filename == "broken.pdf":
+            raise ValueError("bad xref table")
+        progress({"pages_total": 2, "pages_parsed": 1})
+        # Ingest also reports from pool threads (write_chunks); the newest values must win
+        await asyncio.to_thread(progress, {"pages_parsed": 2, "chunks_embedded": 3})
+        return {"chunks": 3}
+
+    def upload(name: str) -> str:
+        path = tmp_path / name
+        path.write_text("notes")
+        return str(path)
+
+    async def scenario():
+        store = JobStore(str(tmp_path / "jobs.sqlite3"))
+        queue = JobQueue(ingest, store=store, workers=1, per_user_limit=1)
+        await queue.start()
+        try:
+            ok = await queue.submit("u1", "notes.md", upload("notes.md"))
+            bad = await queue.submit("u1", "broken.pdf", upload("broken.pdf"))
+            first = await wait_finished(store, [ok, bad])
+            # The single worker must still be alive to take the next job
+            again = await queue.submit("u1", "more.md", upload("more.md"))
+            second = await wait_finished(store, [again])
+        finally:
+            await queue.stop()
+            store.close()
+        return first + second
+
+    done, failed, again = asyncio.run(scenario())
+
+    assert done["status"] == DONE and done["result"] == {"chunks": 3}
+    assert (done["pages_total"], done["pages_parsed"], done["chunks_embedded"]) == (2, 2, 3)
+    assert failed["status"] == FAILED and "bad xref table" in failed["error"]
+    assert again["status"] == DONE
+    assert not any(name.endswith((".md", ".pdf")) for name in os.listdir(tmp_path))
+    sources = [getattr(r, "source", None) for r in caplog.records if r.getMessage() in ("job done", "job failed")]
+    assert sorted(sources) == ["broken.pdf", "more.md", "notes.md"]
+
+
+def test_per_user_limit_holds_with_several_workers(tmp_path):
+    running = {"now": 0, "max": 0}
+
+    async def ingest(user_id, temp_path, filename, progress):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.02)
+        running["now"] -= 1
+        return {"chunks": 1}
+
+    async def scenario():
+        store = JobStore(str(tmp_path / "jobs.sqlite3"))
+        queue = JobQueue(ingest, store=store, workers=3, per_user_limit=1)
+        await queue.start()
+        try:
+            job_ids = [await queue.submit("u1", f"n{i}.md", str(tmp_path / f"n{i}.md")) for i in range(4)]
+            return await wait_finished(store, job_ids)
+        finally:
+            await queue.stop()
+            store.close()
+
+    jobs = asyncio.run(scenario())
+
+    assert all(job["status"] == DONE for job in jobs)
+    assert running["max"] == 1
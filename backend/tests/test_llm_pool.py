@@ -0,0 +1,24 @@
+# backend/tests/test_llm_pool.py
+# Reading LLM capacity (/health, /metrics) must not build the pool — that imports the provider SDKs
+from app.rag import llm_pool
+from app.rag.llm_router import LLMRouter
+
+
+def test_stats_do_not_build_the_pool(monkeypatch):
+    def build():
+        raise AssertionError("stats() built the LLM clients")
+
+    monkeypatch.setattr(llm_pool, "_shared", None)
+    monkeypatch.setattr(llm_pool, "build_llm_clients", build)
+
+    assert llm_pool.pool_stats() == {}
+    assert LLMRouter().stats()["capacity"] == {}
+    assert llm_pool._shared is None
+
+
+def test_stats_read_an_existing_pool(monkeypatch):
+    pool = llm_pool.LLMPool(clients=[])
+    pool.slots("gemini")
+    monkeypatch.setattr(llm_pool, "_shared", pool)
+
+    assert llm_pool.pool_stats()["gemini"]["in_flight"] == 0
@@ -0,0 +1,15 @@
+# backend/tests/test_logs.py
+import json
+import logging
+
+from app.logs import JsonFormatter, get_logger
+
+
+def test_reserved_extra_keys_are_renamed(caplog):
+    caplog.set_level(logging.INFO, logger="app")
+    get_logger("app.test").info("saved", extra={"filename": "a.pdf", "module": "x", "user_id": "u1"})
+
+    record = caplog.records[-1]
+    assert record.extra_filename == "a.pdf" and record.extra_module == "x" and record.user_id == "u1"
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["extra_filename"] == "a.pdf" and entry["msg"] == "saved"
@@ -0,0 +1,35 @@
+# backend/tests/test_profiling.py
+import threading
+
+import pytest
+
+from app import profiling
+
+
+def test_overlapping_profiled_calls_are_refused(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "_shared", profiling.ProfileStore(str(tmp_path)))
+    inside, release = threading.Event(), threading.Event()
+    outcome = {}
+
+    def slow_ask():
+        inside.set()
+        release.wait(5)
+        return "answer"
+
+    def first():
+        outcome["first"] = profiling.run_profiled("ask", "q1", "u1", slow_ask)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    assert inside.wait(5)
+    try:
+        with pytest.raises(profiling.ProfilerBusy):
+            profiling.run_profiled("ask", "q2", "u2", lambda: "other")
+    finally:
+        release.set()
+        thread.join(5)
+
+    assert outcome["first"][0] == "answer"
+    # Free again once the first call is saved
+    result, profile_id = profiling.run_profiled("ask", "q3", "u1", lambda: "again")
+    assert result == "again" and (tmp_path / f"{profile_id}.json").exists()
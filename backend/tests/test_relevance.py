@@ -0,0 +1,35 @@
+# backend/tests/test_relevance.py
+import pytest
+
+from app.rag import relevance
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(relevance, "_THRESHOLDS", relevance.parse_thresholds("study:0.6,doubt:0.6"))
+
+
+def results(*distances):
+    return {"distances": [list(distances)]}
+
+
+def test_gate_is_off_without_limits():
+    assert relevance.parse_thresholds("") == {}
+    assert relevance.skip_reason("study", results()) is None
+
+
+def test_skips_when_nothing_or_only_far_chunks(limits):
+    assert relevance.skip_reason("study", results()) == "empty"
+    assert relevance.skip_reason("study", results(0.8, 0.95)) == "distance"
+    assert relevance.skip_reason("study", results(0.8, 0.55)) is None
+
+
+def test_keyword_only_hits_do_not_keep_the_llm_call(limits):
+    assert relevance.skip_reason("study", results(None, 0.9)) == "distance"
+    assert relevance.skip_reason("study", results(None, None)) == "distance"
+    assert relevance.skip_reason("study", results(None, 0.5)) is None
+
+
+def test_only_notes_only_modes_are_gated(limits):
+    assert relevance.skip_reason("doubt", results()) is None
+    assert relevance.skip_reason("quick", results()) is None  # no limit configured for it
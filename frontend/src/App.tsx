@@ -17,6 +17,14 @@ interface UploadedFile {
   uploaded_at: string;
 }
 
+// One page of /api/files — newest first; `total` counts every file the user has
+interface FilePage {
+  files: UploadedFile[];
+  total: number;
+  offset: number;
+  limit: number;
+}
+
 // PRIVATE USER ID — EVERY USER HAS THEIR OWN NOTES
 const getUserId = (): string => {
   let id = localStorage.getItem('focusforge_user_id');
@@ -35,6 +43,8 @@ const userId = getUserId();
 export default function App() {
   const [messages, setMessages] = useState<Message[]>([]);
   const [uploadedFiles, setUploadedFiles] = useState<UploadedFile[]>([]);
+  const [filesTotal, setFilesTotal] = useState(0);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [autoSpeak, setAutoSpeak] = useState(false); // default ON (most users love it)
   const modeLabels: Record<string, string> = {
     study: "Study Focus",
@@ -167,18 +177,16 @@ export default function App() {
   useEffect(() => {
     const initialize = async () => {
       try {
-        const res = await axios.get(`${API_URL}/api/files`, { params: { user_id: userId } })
-        const files = res.data.files || [];
-
-        setUploadedFiles(files);
+        const res = await axios.get<FilePage>(`${API_URL}/api/files`, { params: { user_id: userId } })
+        const total = showFilePage(res.data);
 
-        if (files.length === 0) {
+        if (total === 0) {
           setMessages([
             { type: 'system', text: 'No notes uploaded yet. Upload a PDF or text file first!' }
           ]);
         } else {
           setMessages([
-            { type: 'system', text: `Welcome back! You have ${files.length} note(s) ready.` }
+            { type: 'system', text: `Welcome back! You have ${total} note(s) ready.` }
           ]);
         }
       } catch (err) {
@@ -210,16 +218,41 @@ export default function App() {
     scrollToBottom();
   }, [messages]);
 
+  // First page of the list (upload, delete and start all reset to it); returns the total
+  function showFilePage(page: FilePage): number {
+    const total = page.total ?? (page.files || []).length;
+    setUploadedFiles(page.files || []);
+    setFilesTotal(total);
+    return total;
+  }
+
   // Load file history for THIS user only
   const loadFileHistory = async () => {
     try {
-      const res = await axios.get(`${API_URL}/api/files`, { params: { user_id: userId } })
-      setUploadedFiles(res.data.files || []);
+      const res = await axios.get<FilePage>(`${API_URL}/api/files`, { params: { user_id: userId } })
+      showFilePage(res.data);
     } catch (err) {
       console.log("No files yet for this user");
     }
   };
 
+  // Next page of /api/files, appended below the ones already shown
+  const loadMoreFiles = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await axios.get<FilePage>(`${API_URL}/api/files`, {
+        params: { user_id: userId, offset: uploadedFiles.length }
+      });
+      const seen = new Set(uploadedFiles.map(f => f.filename));
+      setUploadedFiles(prev => [...prev, ...(res.data.files || []).filter(f => !seen.has(f.filename))]);
+      setFilesTotal(res.data.total);
+    } catch (err) {
+      console.log("Could not load more files");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // useEffect(() => {
   //   loadFileHistory();
   // }, []);
@@ -249,8 +282,22 @@ export default function App() {
         timeout: 300000
       });
 
-      const { filename, action } = response.data;
-      const actionText = action === "replaced" ? "Updated" : "Uploaded";
+      // Ingestion runs in the background — poll the job until it settles
+      const { job_id, filename } = response.data;
+      let job = response.data;
+      while (job.status === "queued" || job.status === "running") {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const jobRes = await axios.get(`${API_URL}/api/jobs/${job_id}`, {
+          params: { user_id: userId }
+        });
+        job = jobRes.data;
+      }
+
+      if (job.status === "failed") {
+        throw new Error(job.error || "Processing failed");
+      }
+
+      const actionText = job.result?.action === "replaced" ? "Updated" : "Uploaded";
 
       setMessages(prev => [...prev, { type: "system", text: `${actionText}: ${filename}` }]);
       loadFileHistory()
@@ -344,7 +391,7 @@ export default function App() {
               <h3 className={`text-xs font-semibold text-purple-300 uppercase tracking-wider transition-all duration-300 ${
                 isSearchOpen ? 'opacity-0 translate-x-[-20px]' : 'opacity-100'
               }`}>
-                Your Notes ({uploadedFiles.length})
+                Your Notes ({filesTotal})
               </h3>
 
               {/* Search Icon */}
@@ -420,6 +467,17 @@ export default function App() {
                 ))}
               </div>
             )}
+
+            {/* LOAD MORE — /api/files is paged */}
+            {uploadedFiles.length < filesTotal && (
+              <button
+                onClick={loadMoreFiles}
+                disabled={loadingMore}
+                className="w-full mt-3 mb-4 py-2 text-xs text-purple-300 bg-white/5 hover:bg-white/10 rounded-xl transition disabled:opacity-50"
+              >
+                {loadingMore ? 'Loading...' : `Load more (${filesTotal - uploadedFiles.length} left)`}
+              </button>
+            )}
           </div>
         </div>
 
@@ -460,7 +518,7 @@ export default function App() {
                         user_id: userId,
                         filename: deleteCandidate.filename
                       });
-                      setUploadedFiles(res.data.files || []);  // THIS LINE FIXES EVERYTHING
+                      showFilePage(res.data);  // THIS LINE FIXES EVERYTHING
                       setMessages(p => [...p, { type: 'system', text: `Deleted: ${deleteCandidate.filename}` }]);
                     } catch {
                       alert("Delete failed");
@@ -481,12 +539,12 @@ export default function App() {
         <div className="flex-1 flex flex-col">
           <div className="flex-1 overflow-y-auto px-6 py-8">
             <div className="max-w-4xl mx-auto space-y-6">
-              {uploadedFiles.length > 0 ? (
+              {filesTotal > 0 ? (
                 <div className="text-center py-20">
                   <Sparkles className="w-16 h-16 mx-auto mb-6 text-purple-400 opacity-80" />
                   <p className="text-2xl font-bold text-purple-300">Welcome back!</p>
                   <p className="text-lg text-gray-300 mt-2">
-                    You have <span className="text-purple-400 font-bold">{uploadedFiles.length}</span> note{uploadedFiles.length > 1 ? 's' : ''} ready
+                    You have <span className="text-purple-400 font-bold">{filesTotal}</span> note{filesTotal > 1 ? 's' : ''} ready
                   </p>
                   <p className="text-md text-gray-400 mt-4">Ask anything — I'm ready!</p>
                 </div>